@@ -1,35 +1,22 @@
 import streamlit as st
 import os
-import operator
-from typing import List, Annotated
-from typing_extensions import TypedDict
-from pydantic import BaseModel, Field
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
-from langchain_tavily import TavilySearch
-from langchain_community.document_loaders import WikipediaLoader
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.constants import Send
 import time
 import base64
+import functools
 import re
-from io import BytesIO
-try:
-    import weasyprint
-    from weasyprint import HTML, CSS
-    WEASYPRINT_AVAILABLE = True
-except ImportError:
-    WEASYPRINT_AVAILABLE = False
-    
-# Fallback imports for reportlab
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+import uuid
+from research_graph import (
+    REPORT_NODES, make_backends, replace_analysts, stream_graph, use_async_graph, with_checkpointer,
+)
+from resources import check_credentials, get_chat_model, get_research_graph, get_tavily_search
+from checkpoint_store import get_checkpointer, incomplete_runs
+from jobs import QueueFullError, get_job_executor, run_research
+from pdf_cache import get_pdf_cache
+from progress import describe_analyst
+from rate_limit import RateLimitError, RetriesExhaustedError
+from report_pdf import PdfRenderError, fallback_pdf, pdf_renderer, render_pdf, render_pdf_with_renderer
+from session_store import get_session_store
+from speculation import speculate
 
 # Configure the page
 st.set_page_config(
@@ -422,49 +409,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# EXACT MODELS FROM NOTEBOOK (unchanged)
-class Analyst(BaseModel):
-    affiliation: str = Field(description="Primary affiliation of the analyst.")
-    name: str = Field(description="Name of the analyst.")
-    role: str = Field(description="Role of the analyst in the context of the topic.")
-    description: str = Field(description="Description of the analyst focus, concerns, and motives.")
-    
-    @property
-    def persona(self) -> str:
-        return f"Name: {self.name}\nRole: {self.role}\nAffiliation: {self.affiliation}\nDescription: {self.description}\n"
-
-class Perspectives(BaseModel):
-    analysts: List[Analyst] = Field(description="Comprehensive list of analysts with their roles and affiliations.")
-
-class SearchQuery(BaseModel):
-    search_query: str = Field(None, description="Search query for retrieval.")
-
-# EXACT STATE DEFINITIONS FROM NOTEBOOK (unchanged)
-class GenerateAnalystsState(TypedDict):
-    topic: str
-    max_analysts: int
-    human_analyst_feedback: str
-    analysts: List[Analyst]
-
-class InterviewState(MessagesState):
-    max_num_turns: int
-    context: Annotated[list, operator.add]
-    analyst: Analyst
-    interview: str
-    sections: list
-
-class ResearchGraphState(TypedDict):
-    topic: str
-    max_analysts: int
-    human_analyst_feedback: str
-    analysts: List[Analyst]
-    sections: Annotated[list, operator.add]
-    introduction: str
-    content: str
-    conclusion: str
-    final_report: str
-
 # Initialize session state
+if 'session_id' not in st.session_state:
+    # Key for this session's texts, checkpoints and runs. It is kept in the URL so a
+    # refresh or a server restart finds the session's unfinished runs again.
+    session_id = st.query_params.get("session", "")
+    st.session_state.session_id = session_id if re.fullmatch(r"[0-9a-f]{32}", session_id) else uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 if 'api_keys_set' not in st.session_state:
@@ -479,31 +430,37 @@ if 'current_analysts' not in st.session_state:
     st.session_state.current_analysts = None
 if 'show_analysts' not in st.session_state:
     st.session_state.show_analysts = False
-if 'last_report_content' not in st.session_state:
-    st.session_state.last_report_content = None
 if 'current_thread' not in st.session_state:
     st.session_state.current_thread = None
 if 'current_graph' not in st.session_state:
     st.session_state.current_graph = None
-
-def check_api_keys():
+if 'current_job_id' not in st.session_state:
+    st.session_state.current_job_id = None
+if 'speculation' not in st.session_state:
+    st.session_state.speculation = None
+# Names of the analysts kept when the team is regenerated
+if 'pinned_analysts' not in st.session_state:
+    st.session_state.pinned_analysts = set()
+
+# Seconds between progress refreshes while a background research job runs
+JOB_POLL_INTERVAL = float(os.getenv("RESEARCH_JOB_POLL_INTERVAL", "1.0"))
+
+def check_api_keys(revalidate: bool = False):
     """Check if API keys are available"""
     anthropic_key = os.getenv("ANTHROPIC_API_KEY")
     tavily_key = os.getenv("TAVILY_API_KEY")
     
     if anthropic_key and tavily_key:
-        try:
+        # Validated once per key pair and cached, so reruns make no network calls
+        status = check_credentials(force=revalidate)
+        if status.ok:
             st.session_state.api_keys_set = True
-            st.session_state.llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", temperature=0)
-            st.session_state.tavily_search = TavilySearch(max_results=3)
-            
-            # Test the connections
-            test_response = st.session_state.llm.invoke([HumanMessage(content="test")])
+            st.session_state.llm = get_chat_model()
+            st.session_state.tavily_search = get_tavily_search()
             return True
-        except Exception as e:
-            st.session_state.api_keys_set = False
-            st.error(f"API Connection failed: {str(e)}")
-            return False
+        st.session_state.api_keys_set = False
+        st.error(f"API Connection failed: {status.error}")
+        return False
     return False
 
 def setup_api_keys():
@@ -529,7 +486,7 @@ def setup_api_keys():
             if anthropic_key and tavily_key:
                 os.environ["ANTHROPIC_API_KEY"] = anthropic_key
                 os.environ["TAVILY_API_KEY"] = tavily_key
-                if check_api_keys():
+                if check_api_keys(revalidate=True):
                     st.success("Connected successfully!")
                     time.sleep(1)
                     st.rerun()
@@ -538,170 +495,62 @@ def setup_api_keys():
             else:
                 st.error("Please provide both API keys.")
 
-def add_message(role: str, content: str):
-    """Add a message to the chat"""
-    st.session_state.messages.append({"role": role, "content": content})
+# Longer messages are kept in the session store; session state holds a reference
+INLINE_MESSAGE_CHARS = 2000
 
-def generate_pdf_weasyprint(content: str, topic: str) -> bytes:
-    """Generate PDF using WeasyPrint (HTML to PDF)"""
-    try:
-        # Clean content and convert markdown-style to HTML
-        import html
-        content = html.unescape(content)
-        content = re.sub(r'\*Research completed.*?\*', '', content, flags=re.DOTALL)
-        
-        # Convert markdown-style formatting to HTML
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Research Report: {topic}</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    margin: 40px;
-                    color: #333;
-                }}
-                h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-                h2 {{ color: #34495e; margin-top: 30px; }}
-                h3 {{ color: #7f8c8d; }}
-                p {{ margin-bottom: 15px; }}
-                .sources {{ background: #f8f9fa; padding: 15px; border-left: 4px solid #3498db; }}
-            </style>
-        </head>
-        <body>
-            <h1>Research Report: {topic}</h1>
-        """
-        
-        # Process content line by line
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line or line == '---':
-                continue
-                
-            if line.startswith('# '):
-                html_content += f"<h1>{line[2:]}</h1>\n"
-            elif line.startswith('## '):
-                html_content += f"<h2>{line[3:]}</h2>\n"
-            elif line.startswith('### '):
-                html_content += f"<h3>{line[4:]}</h3>\n"
-            elif line.startswith('[') and ']' in line:
-                html_content += f'<p class="sources">{line}</p>\n'
-            elif line and len(line) > 1:
-                html_content += f"<p>{line}</p>\n"
-        
-        html_content += "</body></html>"
-        
-        # Generate PDF from HTML
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        return pdf_bytes
-        
-    except Exception as e:
-        print(f"WeasyPrint PDF generation error: {e}")
-        raise e
+REPORT_MESSAGE = """Here's your comprehensive research report on **{topic}**:
 
-def generate_pdf_reportlab(content: str, topic: str) -> bytes:
-    """Generate PDF using ReportLab (fallback)"""
-    try:
-        if not REPORTLAB_AVAILABLE:
-            raise Exception("ReportLab not available")
-            
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72,
-                               topMargin=72, bottomMargin=18)
-        
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Add title
-        story.append(Paragraph(f"Research Report: {topic}", styles['Title']))
-        story.append(Spacer(1, 20))
-        
-        # Process content
-        if content and content.strip():
-            import html
-            content = html.unescape(content)
-            content = re.sub(r'\*Research completed.*?\*', '', content, flags=re.DOTALL)
-            
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
-                if line and len(line) > 1:
-                    if line.startswith('# '):
-                        story.append(Paragraph(line[2:], styles['Heading1']))
-                    elif line.startswith('## '):
-                        story.append(Paragraph(line[3:], styles['Heading2']))
-                    elif line.startswith('### '):
-                        story.append(Paragraph(line[4:], styles['Heading3']))
-                    else:
-                        story.append(Paragraph(line, styles['Normal']))
-                    story.append(Spacer(1, 6))
-        else:
-            story.append(Paragraph("No content available for this report.", styles['Normal']))
-        
-        doc.build(story)
-        buffer.seek(0)
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        return pdf_data
-        
-    except Exception as e:
-        print(f"ReportLab PDF generation error: {e}")
-        raise e
+<div class="report-content">
 
-def generate_pdf(content: str, topic: str) -> bytes:
-    """Generate PDF - try WeasyPrint first, fallback to ReportLab"""
-    try:
-        if WEASYPRINT_AVAILABLE:
-            return generate_pdf_weasyprint(content, topic)
-        elif REPORTLAB_AVAILABLE:
-            return generate_pdf_reportlab(content, topic)
-        else:
-            # Simple text-based PDF as last resort
-            return create_simple_text_pdf(content, topic)
-    except Exception as e:
-        print(f"All PDF generation methods failed: {e}")
-        return create_simple_text_pdf(content, topic)
+{report}
 
-def create_simple_text_pdf(content: str, topic: str) -> bytes:
-    """Create a simple text-based PDF as last resort"""
-    try:
-        # Use a simple approach to create minimal PDF
-        if REPORTLAB_AVAILABLE:
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = [
-                Paragraph(f"Research Report: {topic}", styles['Title']),
-                Spacer(1, 20),
-                Paragraph("Content preview - full formatting not available", styles['Normal']),
-                Spacer(1, 10)
-            ]
-            
-            # Add basic content
-            if content:
-                clean_content = re.sub(r'<[^>]+>', '', content)  # Remove HTML
-                clean_content = re.sub(r'[^\w\s\n\.]', '', clean_content)  # Keep only basic chars
-                story.append(Paragraph(clean_content[:1000] + "...", styles['Normal']))
-            
-            doc.build(story)
-            buffer.seek(0)
-            return buffer.getvalue()
-        else:
-            # Return minimal PDF bytes if nothing else works
-            return b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>\nendobj\nxref\n0 4\n0000000000 65535 f \n0000000009 00000 n \n0000000058 00000 n \n0000000115 00000 n \ntrailer\n<< /Size 4 /Root 1 0 R >>\nstartxref\n181\n%%EOF"
-    except:
-        # Return absolute minimal PDF if everything fails
-        return b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\nxref\n0 2\ntrailer\n<< /Size 2 /Root 1 0 R >>\nstartxref\n0\n%%EOF"
+</div>
 
-def create_download_button(pdf_bytes: bytes, filename: str, key: str):
-    """Create a Streamlit download button for PDF"""
+*Research completed using multi-agent AI analysis with real-time web search and expert knowledge synthesis.*
+"""
+
+def add_message(role: str, content: str, topic: str = None):
+    """Add a message to the chat; ``topic`` marks ``content`` as the report on that topic"""
+    message = {"role": role}
+    if topic is not None:
+        message["topic"] = topic
+    store = get_session_store()
+    if store is not None and len(content) > INLINE_MESSAGE_CHARS:
+        message["ref"] = store.put(st.session_state.session_id, content, "report" if topic is not None else "message")
+    else:
+        message["content"] = content
+    st.session_state.messages.append(message)
+
+def message_text(message: dict, session_id: str) -> str:
+    """Content of a chat message, loaded from the session store when it was offloaded"""
+    if "content" in message:
+        return message["content"]
+    store = get_session_store()
+    text = store.get(session_id, message["ref"]) if store is not None else None
+    return text if text is not None else "*This message is no longer available.*"
+
+def get_message_pdf(message: dict, session_id: str) -> bytes:
+    """PDF for a report message; runs when its download button is clicked"""
+    return get_report_pdf(message_text(message, session_id), message["topic"])
+
+def get_report_pdf(content: str, topic: str) -> bytes:
+    """PDF for a report, rendered on the first download and reused after that"""
+    cache = get_pdf_cache()
+    if cache is None:
+        return render_pdf(content, topic)
+    try:
+        return cache.get_or_render(content, topic, pdf_renderer(),
+                                   lambda: render_pdf_with_renderer(content, topic))
+    except PdfRenderError as e:
+        # Serve the ReportLab fallback, but keep it out of the cache
+        print(f"PDF worker rendering failed, falling back to ReportLab: {e}")
+        return fallback_pdf(content, topic)
+
+def create_download_button(pdf, filename: str, key: str):
+    """Create a Streamlit download button for PDF (bytes, or a callable run on click)"""
     return st.download_button(
         label="📄 Download PDF",
-        data=pdf_bytes,
+        data=pdf,
         file_name=filename,
         mime="application/pdf",
         key=key,
@@ -714,40 +563,39 @@ def display_messages():
         if message["role"] == "user":
             st.markdown(f"""
             <div class="message user-message">
-                <div class="user-message-content">{message["content"]}</div>
+                <div class="user-message-content">{message_text(message, st.session_state.session_id)}</div>
             </div>
             """, unsafe_allow_html=True)
         else:
-            # Check if this is a report message (contains report content)
-            is_report = "comprehensive research report" in message["content"] and "report-content" in message["content"]
+            is_report = "topic" in message
+            content = message_text(message, st.session_state.session_id)
+            if is_report:
+                content = REPORT_MESSAGE.format(topic=message["topic"], report=content)
             
             st.markdown(f"""
             <div class="message assistant-message">
                 <div class="assistant-label">
                     <span>Research.ai</span>
                 </div>
-                <div class="assistant-content">{message["content"]}</div>
+                <div class="assistant-content">{content}</div>
             </div>
             """, unsafe_allow_html=True)
             
             # Add download button below the message if it's a report
-            if is_report and hasattr(st.session_state, 'last_report_topic') and st.session_state.last_report_content:
-                try:
-                    # Use the stored clean content for PDF generation
-                    pdf_bytes = generate_pdf(st.session_state.last_report_content, st.session_state.last_report_topic)
-                    
-                    # Clean filename properly - remove all problematic characters
-                    clean_topic = re.sub(r'[^\w\s-]', '', st.session_state.last_report_topic)
-                    clean_topic = re.sub(r'\s+', '_', clean_topic)
-                    clean_topic = clean_topic.strip('_')[:50]  # Limit length
-                    filename = f"research_report_{clean_topic}.pdf"
-                    
-                    # Create download button
-                    col1, col2, col3 = st.columns([1, 1, 4])
-                    with col2:
-                        create_download_button(pdf_bytes, filename, f"download_pdf_{i}")
-                except Exception as e:
-                    st.error(f"PDF generation error: {e}")
+            if is_report:
+                # The PDF is only rendered when the button is clicked, and only once per report
+                pdf = functools.partial(get_message_pdf, message, st.session_state.session_id)
+                
+                # Clean filename properly - remove all problematic characters
+                clean_topic = re.sub(r'[^\w\s-]', '', message["topic"])
+                clean_topic = re.sub(r'\s+', '_', clean_topic)
+                clean_topic = clean_topic.strip('_')[:50]  # Limit length
+                filename = f"research_report_{clean_topic}.pdf"
+                
+                # Create download button
+                col1, col2, col3 = st.columns([1, 1, 4])
+                with col2:
+                    create_download_button(pdf, filename, f"download_pdf_{i}")
 
 def display_analysts():
     """Display the research analysts for user review"""
@@ -782,485 +630,66 @@ def display_analysts():
                 placeholder="Any specific focus areas, additional expertise needed, or modifications to the research approach?",
                 height=100
             )
+            # Pinned analysts are kept as they are when the team is regenerated
+            pins = [
+                st.checkbox(f"Keep {analyst.name}", value=analyst.name in st.session_state.pinned_analysts,
+                            key=f"pin_{i}_{analyst.name}")
+                for i, analyst in enumerate(st.session_state.current_analysts)
+            ]
             
             col1, col2, col3 = st.columns([1, 1, 1])
             with col1:
                 if st.form_submit_button("Approve Team", use_container_width=True):
                     st.session_state.show_analysts = False
+                    # Feedback sends the run back to team generation, so the prefetch is unused
+                    settle_speculation(used=not feedback)
                     continue_research_with_feedback(feedback if feedback else None)
                     st.rerun()
             
             with col2:
                 if st.form_submit_button("Regenerate Team", use_container_width=True):
+                    settle_speculation(used=False)
                     # Regenerate with feedback using existing graph and thread
                     if st.session_state.current_graph and st.session_state.current_thread:
-                        regenerate_team_with_feedback(feedback if feedback else "")
+                        pinned = {i for i, pin in enumerate(pins) if pin}
+                        regenerate_team_with_feedback(feedback if feedback else "", pinned)
                     st.rerun()
             
             with col3:
                 if st.form_submit_button("Cancel", use_container_width=True):
+                    settle_speculation(used=False)
                     st.session_state.show_analysts = False
                     st.session_state.research_in_progress = False
+                    release_run()
                     st.rerun()
 
-def create_exact_research_graph():
-    """Create the EXACT research automation graph from the notebook"""
-    
-    llm = st.session_state.llm
-    tavily_search = st.session_state.tavily_search
-    
-    # EXACT ANALYST INSTRUCTIONS FROM NOTEBOOK
-    analyst_instructions = """You are tasked with creating a set of AI analyst personas. Follow these instructions carefully:
-
-1. First, review the research topic:
-{topic}
-
-2. Examine any editorial feedback that has been optionally provided to guide creation of the analysts:
-
-{human_analyst_feedback}
-
-3. Determine the most interesting themes based upon documents and / or feedback above.
-
-4. Pick the top {max_analysts} themes.
-
-5. Assign one analyst to each theme."""
-
-    def create_analysts(state: GenerateAnalystsState):
-        """Create analysts"""
-        topic = state['topic']
-        max_analysts = state['max_analysts']
-        human_analyst_feedback = state.get('human_analyst_feedback', '')
-
-        # Enforce structured output
-        structured_llm = llm.with_structured_output(Perspectives)
-
-        # System message
-        system_message = analyst_instructions.format(topic=topic,
-                                                               human_analyst_feedback=human_analyst_feedback,
-                                                               max_analysts=max_analysts)
-
-        # Generate question
-        analysts = structured_llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")])
-
-        # Write the list of analysis to state
-        return {"analysts": analysts.analysts}
-
-    def human_feedback(state: GenerateAnalystsState):
-        """No-op node that should be interrupted on"""
-        pass
-
-    # EXACT QUESTION INSTRUCTIONS FROM NOTEBOOK
-    question_instructions = """You are an analyst tasked with interviewing an expert to learn about a specific topic.
-
-Your goal is boil down to interesting and specific insights related to your topic.
-
-1. Interesting: Insights that people will find surprising or non-obvious.
-
-2. Specific: Insights that avoid generalities and include specific examples from the expert.
-
-Here is your topic of focus and set of goals: {goals}
-
-Begin by introducing yourself using a name that fits your persona, and then ask your question.
-
-Continue to ask questions to drill down and refine your understanding of the topic.
-
-When you are satisfied with your understanding, complete the interview with: "Thank you so much for your help!"
-
-Remember to stay in character throughout your response, reflecting the persona and goals provided to you."""
-
-    def generate_question(state: InterviewState):
-        """Node to generate a question"""
-        # Get state
-        analyst = state["analyst"]
-        messages = state["messages"]
-
-        # Generate question
-        system_message = question_instructions.format(goals=analyst.persona)
-        question = llm.invoke([SystemMessage(content=system_message)]+messages)
-
-        # Write messages to state
-        return {"messages": [question]}
-
-    # EXACT SEARCH INSTRUCTIONS FROM NOTEBOOK
-    search_instructions = SystemMessage(content=f"""You will be given a conversation between an analyst and an expert.
-
-Your goal is to generate a well-structured query for use in retrieval and / or web-search related to the conversation.
-
-First, analyze the full conversation.
-
-Pay particular attention to the final question posed by the analyst.
-
-Convert this final question into a well-structured web search query""")
-
-    def search_web(state: InterviewState):
-        """Retrieve docs from web search"""
-        # Search query
-        structured_llm = llm.with_structured_output(SearchQuery)
-        search_query = structured_llm.invoke([search_instructions]+state['messages'])
-
-        # Search
-        search_docs = tavily_search.invoke(search_query.search_query)
-
-        # Handle different result formats - fix for TavilySearch
-        if isinstance(search_docs, dict) and 'results' in search_docs:
-            docs = search_docs['results']
-        elif isinstance(search_docs, list):
-            docs = search_docs
-        else:
-            docs = []
-
-        # Format - keep exact same format as notebook
-        formatted_search_docs = "\n\n---\n\n".join(
-            [
-                f'<Document href="{doc.get("url", "unknown")}"/>\n{doc.get("content", doc.get("snippet", "No content"))}\n</Document>'
-                for doc in docs if isinstance(doc, dict)
-            ]
-        )
-
-        return {"context": [formatted_search_docs]}
-
-    def search_wikipedia(state: InterviewState):
-        """Retrieve docs from wikipedia"""
-        # Search query
-        structured_llm = llm.with_structured_output(SearchQuery)
-        search_query = structured_llm.invoke([search_instructions]+state['messages'])
-
-        # Search
-        search_docs = WikipediaLoader(query=search_query.search_query,
-                                      load_max_docs=2).load()
-
-        # Format
-        formatted_search_docs = "\n\n---\n\n".join(
-            [
-                f'<Document source="{doc.metadata["source"]}" page="{doc.metadata.get("page", "")}"/>\n{doc.page_content}\n</Document>'
-                for doc in search_docs
-            ]
-        )
-
-        return {"context": [formatted_search_docs]}
-
-    # EXACT ANSWER INSTRUCTIONS FROM NOTEBOOK
-    answer_instructions = """You are an expert being interviewed by an analyst.
-
-Here is analyst area of focus: {goals}.
-
-You goal is to answer a question posed by the interviewer.
-
-To answer question, use this context:
-
-{context}
-
-When answering questions, follow these guidelines:
-
-1. Use only the information provided in the context.
-
-2. Do not introduce external information or make assumptions beyond what is explicitly stated in the context.
-
-3. The context contain sources at the topic of each individual document.
-
-4. Include these sources your answer next to any relevant statements. For example, for source # 1 use [1].
-
-5. List your sources in order at the bottom of your answer. [1] Source 1, [2] Source 2, etc
-
-6. If the source is: <Document source="assistant/docs/llama3_1.pdf" page="7"/>' then just list:
-
-[1] assistant/docs/llama3_1.pdf, page 7
-
-And skip the addition of the brackets as well as the Document source preamble in your citation."""
-
-    def generate_answer(state: InterviewState):
-        """Node to answer a question"""
-        # Get state
-        analyst = state["analyst"]
-        messages = state["messages"]
-        context = state["context"]
-
-        # Answer question
-        system_message = answer_instructions.format(goals=analyst.persona, context=context)
-        answer = llm.invoke([SystemMessage(content=system_message)]+messages)
-
-        # Name the message as coming from the expert
-        answer.name = "expert"
-
-        # Append it to state
-        return {"messages": [answer]}
-
-    def save_interview(state: InterviewState):
-        """Save interviews"""
-        # Get messages
-        messages = state["messages"]
-
-        # Convert interview to a string
-        interview = get_buffer_string(messages)
-
-        # Save to interviews key
-        return {"interview": interview}
-
-    def route_messages(state: InterviewState, name: str = "expert"):
-        """Route between question and answer"""
-        # Get messages
-        messages = state["messages"]
-        max_num_turns = state.get('max_num_turns',2)
-
-        # Check the number of expert answers
-        num_responses = len(
-            [m for m in messages if isinstance(m, AIMessage) and m.name == name]
-        )
-
-        # End if expert has answered more than the max turns
-        if num_responses >= max_num_turns:
-            return 'save_interview'
-
-        # This router is run after each question - answer pair
-        # Get the last question asked to check if it signals the end of discussion
-        last_question = messages[-2]
-
-        if "Thank you so much for your help" in last_question.content:
-            return 'save_interview'
-        return "ask_question"
-
-    # EXACT SECTION WRITER INSTRUCTIONS FROM NOTEBOOK
-    section_writer_instructions = """You are an expert technical writer.
-
-Your task is to create a short, easily digestible section of a report based on a set of source documents.
-
-1. Analyze the content of the source documents:
-- The name of each source document is at the start of the document, with the <Document tag.
-
-2. Create a report structure using markdown formatting:
-- Use ## for the section title
-- Use ### for sub-section headers
-
-3. Write the report following this structure:
-a. Title (## header)
-b. Summary (### header)
-c. Sources (### header)
-
-4. Make your title engaging based upon the focus area of the analyst:
-{focus}
-
-5. For the summary section:
-- Set up summary with general background / context related to the focus area of the analyst
-- Emphasize what is novel, interesting, or surprising about insights gathered from the interview
-- Create a numbered list of source documents, as you use them
-- Do not mention the names of interviewers or experts
-- Aim for approximately 400 words maximum
-- Use numbered sources in your report (e.g., [1], [2]) based on information from source documents
-
-6. In the Sources section:
-- Include all sources used in your report
-- Provide full links to relevant websites or specific document paths
-- Separate each source by a newline. Use two spaces at the end of each line to create a newline in Markdown.
-- It will look like:
-
-### Sources
-[1] Link or Document name
-[2] Link or Document name
-
-7. Be sure to combine sources. For example this is not correct:
-
-[3] https://ai.meta.com/blog/meta-llama-3-1/
-[4] https://ai.meta.com/blog/meta-llama-3-1/
-
-There should be no redundant sources. It should simply be:
-
-[3] https://ai.meta.com/blog/meta-llama-3-1/
-
-8. Final review:
-- Ensure the report follows the required structure
-- Include no preamble before the title of the report
-- Check that all guidelines have been followed"""
+def start_speculation(topic: str, analysts):
+    """Prefetch the first interview turns of the team under review, replacing earlier speculation"""
+    settle_speculation(used=False)
+    st.session_state.speculation = speculate(topic, analysts, get_chat_model(), get_tavily_search())
 
-    def write_section(state: InterviewState):
-        """Node to answer a question"""
-        # Get state
-        interview = state["interview"]
-        context = state["context"]
-        analyst = state["analyst"]
-
-        # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
-        system_message = section_writer_instructions.format(focus=analyst.description)
-        section = llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")])
-
-        # Append it to state
-        return {"sections": [section.content]}
-
-    # EXACT INTERVIEW GRAPH FROM NOTEBOOK
-    interview_builder = StateGraph(InterviewState)
-    interview_builder.add_node("ask_question", generate_question)
-    interview_builder.add_node("search_web", search_web)
-    interview_builder.add_node("search_wikipedia", search_wikipedia)
-    interview_builder.add_node("answer_question", generate_answer)
-    interview_builder.add_node("save_interview", save_interview)
-    interview_builder.add_node("write_section", write_section)
-
-    # Flow
-    interview_builder.add_edge(START, "ask_question")
-    interview_builder.add_edge("ask_question", "search_web")
-    interview_builder.add_edge("ask_question", "search_wikipedia")
-    interview_builder.add_edge("search_web", "answer_question")
-    interview_builder.add_edge("search_wikipedia", "answer_question")
-    interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
-    interview_builder.add_edge("save_interview", "write_section")
-    interview_builder.add_edge("write_section", END)
-
-    # EXACT MAIN GRAPH FUNCTIONS FROM NOTEBOOK
-    def initiate_all_interviews(state: ResearchGraphState):
-        """This is the "map" step where we run each interview sub-graph using Send API"""
-        # Check if human feedback
-        human_analyst_feedback=state.get('human_analyst_feedback')
-        if human_analyst_feedback:
-            # Return to create_analysts
-            return "create_analysts"
-
-        # Otherwise kick off interviews in parallel via Send() API
-        else:
-            topic = state["topic"]
-            return [Send("conduct_interview", {"analyst": analyst,
-                                               "messages": [HumanMessage(
-                                                   content=f"So you said you were writing an article on {topic}?"
-                                               )
-                                                           ]}) for analyst in state["analysts"]]
-
-    # EXACT REPORT WRITER INSTRUCTIONS FROM NOTEBOOK
-    report_writer_instructions = """You are a technical writer creating a report on this overall topic:
-
-{topic}
-
-You have a team of analysts. Each analyst has done two things:
-
-1. They conducted an interview with an expert on a specific sub-topic.
-2. They write up their finding into a memo.
-
-Your task:
-
-1. You will be given a collection of memos from your analysts.
-2. Think carefully about the insights from each memo.
-3. Consolidate these into a crisp overall summary that ties together the central ideas from all of the memos.
-4. Summarize the central points in each memo into a cohesive single narrative.
-
-To format your report:
-
-1. Use markdown formatting.
-2. Include no pre-amble for the report.
-3. Use no sub-heading.
-4. Start your report with a single title header: ## Insights
-5. Do not mention any analyst names in your report.
-6. Preserve any citations in the memos, which will be annotated in brackets, for example [1] or [2].
-7. Create a final, consolidated list of sources and add to a Sources section with the `## Sources` header.
-8. List your sources in order and do not repeat.
-
-[1] Source 1
-[2] Source 2
-
-Here are the memos from your analysts to build your report from:
-
-{context}"""
-
-    def write_report(state: ResearchGraphState):
-        # Full set of sections
-        sections = state["sections"]
-        topic = state["topic"]
-
-        # Concat all sections together
-        formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-
-        # Summarize the sections into a final report
-        system_message = report_writer_instructions.format(topic=topic, context=formatted_str_sections)
-        report = llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")])
-        return {"content": report.content}
-
-    # EXACT INTRO/CONCLUSION INSTRUCTIONS FROM NOTEBOOK
-    intro_conclusion_instructions = """You are a technical writer finishing a report on {topic}
-
-You will be given all of the sections of the report.
-
-You job is to write a crisp and compelling introduction or conclusion section.
-
-The user will instruct you whether to write the introduction or conclusion.
-
-Include no pre-amble for either section.
-
-Target around 100 words, crisply previewing (for introduction) or recapping (for conclusion) all of the sections of the report.
-
-Use markdown formatting.
-
-For your introduction, create a compelling title and use the # header for the title.
-
-For your introduction, use ## Introduction as the section header.
-
-For your conclusion, use ## Conclusion as the section header.
-
-Here are the sections to reflect on for writing: {formatted_str_sections}"""
-
-    def write_introduction(state: ResearchGraphState):
-        # Full set of sections
-        sections = state["sections"]
-        topic = state["topic"]
-
-        # Concat all sections together
-        formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-
-        # Summarize the sections into a final report
-        instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)
-        intro = llm.invoke([SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report introduction")])
-        return {"introduction": intro.content}
-
-    def write_conclusion(state: ResearchGraphState):
-        # Full set of sections
-        sections = state["sections"]
-        topic = state["topic"]
-
-        # Concat all sections together
-        formatted_str_sections = "\n\n".join([f"{section}" for section in sections])
-
-        # Summarize the sections into a final report
-        instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_str_sections)
-        conclusion = llm.invoke([SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report conclusion")])
-        return {"conclusion": conclusion.content}
-
-    def finalize_report(state: ResearchGraphState):
-        """The is the "reduce" step where we gather all the sections, combine them, and reflect on them to write the intro/conclusion"""
-        # Save full final report
-        content = state["content"]
-        if content.startswith("## Insights"):
-            content = content.strip("## Insights")
-        if "## Sources" in content:
-            try:
-                content, sources = content.split("\n## Sources\n")
-            except:
-                sources = None
-        else:
-            sources = None
-
-        final_report = state["introduction"] + "\n\n---\n\n" + content + "\n\n---\n\n" + state["conclusion"]
-        if sources is not None:
-            final_report += "\n\n## Sources\n" + sources
-        return {"final_report": final_report}
-
-    # EXACT GRAPH CONSTRUCTION FROM NOTEBOOK
-    builder = StateGraph(ResearchGraphState)
-    builder.add_node("create_analysts", create_analysts)
-    builder.add_node("human_feedback", human_feedback)
-    builder.add_node("conduct_interview", interview_builder.compile())
-    builder.add_node("write_report",write_report)
-    builder.add_node("write_introduction",write_introduction)
-    builder.add_node("write_conclusion",write_conclusion)
-    builder.add_node("finalize_report",finalize_report)
+def settle_speculation(used: bool):
+    """Record the speculation for the reviewed team as used, or cancel it as wasted"""
+    speculation = st.session_state.speculation
+    st.session_state.speculation = None
+    if speculation is None:
+        return
+    if used:
+        speculation.commit()
+    else:
+        speculation.cancel()
 
-    # EXACT LOGIC FROM NOTEBOOK
-    builder.add_edge(START, "create_analysts")
-    builder.add_edge("create_analysts", "human_feedback")
-    builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
-    builder.add_edge("conduct_interview", "write_report")
-    builder.add_edge("conduct_interview", "write_introduction")
-    builder.add_edge("conduct_interview", "write_conclusion")
-    builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
-    builder.add_edge("finalize_report", END)
+def session_checkpointer():
+    """Checkpointer in the session store, so run state is not kept in memory; None when disabled"""
+    store = get_session_store()
+    return store.checkpointer() if store is not None else None
 
-    # Compile
-    memory = MemorySaver()
-    return builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+def create_exact_research_graph():
+    """Create the EXACT research automation graph from the notebook"""
+    # The compiled graph is shared process-wide; each run gets its own checkpointer:
+    # the durable one when RESEARCH_CHECKPOINT_DB is set, otherwise the session store's
+    return with_checkpointer(get_research_graph(use_async=use_async_graph()),
+                             get_checkpointer() or session_checkpointer())
 
 def conduct_research(topic: str):
     """Conduct the research process - first show analysts for approval"""
@@ -1280,11 +709,18 @@ def conduct_research(topic: str):
         
         # Create graph and start research
         graph = create_exact_research_graph()
-        thread = {"configurable": {"thread_id": f"research_{int(time.time())}"}}
+        thread = {"configurable": {"thread_id": f"research_{time.time_ns()}"}}
+        store = get_session_store()
+        if store is not None and graph.checkpointer is session_checkpointer():
+            # Deleted with the session if the run is never finished
+            store.add_thread(st.session_state.session_id, thread["configurable"]["thread_id"])
+        elif graph.checkpointer is get_checkpointer():
+            # Only this session is offered to resume the run
+            graph.checkpointer.set_owner(thread["configurable"]["thread_id"], st.session_state.session_id)
         
         # Generate analysts
         result = None
-        for event in graph.stream({
+        for event in stream_graph(graph, {
             "topic": topic,
             "max_analysts": 3
         }, thread, stream_mode="values"):
@@ -1300,13 +736,22 @@ def conduct_research(topic: str):
         
         # Store analysts and show them for review
         st.session_state.current_analysts = analysts
+        st.session_state.pinned_analysts = set()
         st.session_state.current_thread = thread
         st.session_state.current_graph = graph
         st.session_state.show_analysts = True
+        # Start the interviews' first searches while the user reviews the team
+        start_speculation(topic, analysts)
         
         # Clear progress
         progress_placeholder.empty()
         
+    except RateLimitError as e:
+        add_message("assistant", f"**Rate Limited**: {e.provider.title()} is busy right now. Please try again in a minute.")
+        st.session_state.research_in_progress = False
+    except RetriesExhaustedError as e:
+        add_message("assistant", f"**Service Unavailable**: {e.provider.title()} is not responding right now. Please try again in a few minutes.")
+        st.session_state.research_in_progress = False
     except Exception as e:
         error_msg = str(e).lower()
         if "connection" in error_msg or "network" in error_msg:
@@ -1317,189 +762,134 @@ def conduct_research(topic: str):
             add_message("assistant", f"**Research Error**: {str(e)}")
         st.session_state.research_in_progress = False
 
-def continue_research_with_feedback(feedback):
-    """Continue the research process after analyst approval"""
-    try:
-        graph = st.session_state.current_graph
-        thread = st.session_state.current_thread
-        
-        # Show progress
-        progress_placeholder = st.empty()
-        
-        with progress_placeholder:
-            st.markdown('<div class="progress-message">Conducting comprehensive multi-agent research...</div>', unsafe_allow_html=True)
-        
-        # Continue with research using the feedback
-        graph.update_state(thread, {"human_analyst_feedback": feedback}, as_node="human_feedback")
-        
-        # Track progress through nodes
-        progress_messages = {
-            "conduct_interview": "Conducting expert interviews...",
-            "write_report": "Synthesizing findings...",
-            "write_introduction": "Crafting introduction...",
-            "write_conclusion": "Writing conclusion...",
-            "finalize_report": "Finalizing report..."
-        }
-        
-        for event in graph.stream(None, thread, stream_mode="updates"):
-            node_name = next(iter(event.keys()))
-            if node_name in progress_messages:
-                with progress_placeholder:
-                    st.markdown(f'<div class="progress-message">{progress_messages[node_name]}</div>', unsafe_allow_html=True)
-                time.sleep(0.5)
-        
-        # Get final result
-        final_state = graph.get_state(thread)
-        
-        # Clear progress
-        progress_placeholder.empty()
-        
-        if 'final_report' in final_state.values:
-            report = final_state.values['final_report']
-            
-            # Store the clean report content for PDF generation
-            st.session_state.last_report_content = report
-            
-            # Add report to chat
-            add_message("assistant", f"""Here's your comprehensive research report on **{st.session_state.last_report_topic}**:
-
-<div class="report-content">
-
-{report}
+def continue_research_with_feedback(feedback, resume: bool = False):
+    """Continue the research process after analyst approval.
 
-</div>
-
-*Research completed using multi-agent AI analysis with real-time web search and expert knowledge synthesis.*
-""")
-        else:
-            add_message("assistant", "I encountered an issue while generating the final report. Please try again.")
-    
-    except Exception as e:
-        add_message("assistant", f"**Research Error**: {str(e)}")
-    
-    finally:
+    The run is submitted to the shared background executor; the page polls it with
+    ``display_job_progress``. With ``resume`` the run continues from its last checkpoint
+    without new feedback.
+    """
+    try:
+        job = get_job_executor().submit(
+            run_research, st.session_state.current_graph, st.session_state.current_thread, feedback,
+            resume=resume, topic=st.session_state.last_report_topic,
+        )
+    except QueueFullError:
+        add_message("assistant", "**Busy**: Too many research runs are in progress right now. Please try again in a few minutes.")
         st.session_state.research_in_progress = False
+        return
 
-def create_analyst_feedback_graph():
-    """Create a separate graph just for analyst generation with feedback (following notebook pattern)"""
-    llm = st.session_state.llm
-    
-    # EXACT ANALYST INSTRUCTIONS FROM NOTEBOOK
-    analyst_instructions = """You are tasked with creating a set of AI analyst personas. Follow these instructions carefully:
-
-1. First, review the research topic:
-{topic}
-
-2. Examine any editorial feedback that has been optionally provided to guide creation of the analysts:
-
-{human_analyst_feedback}
-
-3. Determine the most interesting themes based upon documents and / or feedback above.
-
-4. Pick the top {max_analysts} themes.
-
-5. Assign one analyst to each theme."""
-
-    def create_analysts(state: GenerateAnalystsState):
-        """Create analysts"""
-        topic = state['topic']
-        max_analysts = state['max_analysts']
-        human_analyst_feedback = state.get('human_analyst_feedback', '')
-
-        # Enforce structured output
-        structured_llm = llm.with_structured_output(Perspectives)
-
-        # System message
-        system_message = analyst_instructions.format(topic=topic,
-                                                    human_analyst_feedback=human_analyst_feedback,
-                                                    max_analysts=max_analysts)
-
-        # Generate analysts
-        analysts = structured_llm.invoke([SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")])
-
-        # Write the list of analysts to state
-        return {"analysts": analysts.analysts}
-
-    def human_feedback(state: GenerateAnalystsState):
-        """No-op node that should be interrupted on"""
-        pass
-
-    def should_continue(state: GenerateAnalystsState):
-        """Return the next node to execute (exact notebook pattern)"""
-        # Check if human feedback
-        human_analyst_feedback = state.get('human_analyst_feedback', None)
-        if human_analyst_feedback:
-            return "create_analysts"
-        # Otherwise end
-        return END
+    st.session_state.current_job_id = job.id
+    # Keep the job in the URL so a refreshed page can reattach to it
+    st.query_params["job"] = job.id
 
-    # Build the graph exactly like the notebook
-    builder = StateGraph(GenerateAnalystsState)
-    builder.add_node("create_analysts", create_analysts)
-    builder.add_node("human_feedback", human_feedback)
-    builder.add_edge(START, "create_analysts")
-    builder.add_edge("create_analysts", "human_feedback")
-    builder.add_conditional_edges("human_feedback", should_continue, ["create_analysts", END])
+def reattach_job(job_id: str):
+    """Pick a running or finished job back up after a browser refresh"""
+    job = get_job_executor().get(job_id)
+    if job is None:
+        del st.query_params["job"]
+        return
+    st.session_state.current_job_id = job.id
+    st.session_state.last_report_topic = job.topic
+    st.session_state.research_in_progress = True
+    if not st.session_state.messages:
+        add_message("user", job.topic)
+
+def release_run(keep_resumable: bool = False):
+    """Drop the finished or cancelled run's graph from the session and delete its checkpoints.
+
+    With ``keep_resumable`` a failed run's durable checkpoints are kept so it can be resumed.
+    """
+    store = get_session_store()
+    thread = st.session_state.current_thread
+    graph = st.session_state.current_graph
+    if thread and graph is not None:
+        thread_id = thread["configurable"]["thread_id"]
+        if store is not None and graph.checkpointer is session_checkpointer():
+            store.drop_thread(thread_id)
+        elif graph.checkpointer is get_checkpointer() and not keep_resumable:
+            graph.checkpointer.delete_thread(thread_id)
+    st.session_state.current_graph = None
+    st.session_state.current_thread = None
 
-    # Compile with checkpointer
-    memory = MemorySaver()
-    return builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+def finish_job(job):
+    """Turn a finished job into a chat message and release the session"""
+    snapshot = job.snapshot()
+    st.session_state.current_job_id = None
+    st.session_state.research_in_progress = False
+    release_run(keep_resumable=snapshot["error"] is not None)
+    if "job" in st.query_params:
+        del st.query_params["job"]
+
+    error = snapshot["error"]
+    if isinstance(error, RateLimitError):
+        add_message("assistant", f"**Rate Limited**: {error.provider.title()} is busy right now. Please try again in a minute.")
+    elif isinstance(error, RetriesExhaustedError):
+        add_message("assistant", f"**Service Unavailable**: {error.provider.title()} is not responding right now. Please try again in a few minutes.")
+    elif error is not None:
+        add_message("assistant", f"**Research Error**: {str(error)}")
+    elif snapshot["result"]:
+        # The clean report is kept once; the chat wrapper is added when it is displayed
+        add_message("assistant", snapshot["result"], topic=st.session_state.last_report_topic)
+    else:
+        add_message("assistant", "I encountered an issue while generating the final report. Please try again.")
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def display_job_progress():
+    """Poll the session's background job and show its progress and report preview"""
+    job = get_job_executor().get(st.session_state.current_job_id)
+    if job is None:
+        st.session_state.current_job_id = None
+        st.session_state.research_in_progress = False
+        st.rerun()
+    if job.done:
+        finish_job(job)
+        st.rerun()
 
-def regenerate_team_with_feedback(feedback: str):
-    """Regenerate analysts with human feedback using the exact notebook pattern"""
+    snapshot = job.snapshot()
+    tracker = snapshot["tracker"]
+    if tracker is None:
+        st.markdown(f'<div class="progress-message">{snapshot["progress"]}</div>', unsafe_allow_html=True)
+    else:
+        st.markdown(f'<div class="progress-message">{snapshot["progress"]}... ({tracker["elapsed"]:.0f}s)</div>',
+                    unsafe_allow_html=True)
+        for analyst in tracker["analysts"]:
+            st.caption(describe_analyst(analyst))
+    # Live preview of the report in final report order; the assembled report replaces it
+    for node in REPORT_NODES:
+        if snapshot["drafts"][node]:
+            st.markdown(snapshot["drafts"][node])
+
+def regenerate_team_with_feedback(feedback: str, pinned=frozenset()):
+    """Replace the analysts not pinned (by index) using the feedback, and update the run in place"""
     try:
         # Show progress
         progress_placeholder = st.empty()
         with progress_placeholder:
             st.markdown('<div class="progress-message">Regenerating research team with your feedback...</div>', unsafe_allow_html=True)
         
-        # Create the feedback graph (like in notebook)
-        feedback_graph = create_analyst_feedback_graph()
-        feedback_thread = {"configurable": {"thread_id": f"feedback_{int(time.time())}"}}
-        
-        # Get current topic
         topic = st.session_state.last_report_topic
-        
-        # First run - generate initial analysts
-        initial_result = None
-        for event in feedback_graph.stream({
-            "topic": topic,
-            "max_analysts": 3
-        }, feedback_thread, stream_mode="values"):
-            if 'analysts' in event:
-                initial_result = event
-                break
-        
-        # Update with feedback (exact notebook pattern)
-        feedback_graph.update_state(feedback_thread, {"human_analyst_feedback": feedback}, as_node="human_feedback")
-        
-        # Continue execution with feedback
-        final_result = None
-        for event in feedback_graph.stream(None, feedback_thread, stream_mode="values"):
-            if 'analysts' in event:
-                final_result = event
-                # Don't break - get the last one (most recent)
+        analysts = st.session_state.current_analysts
+        # One structured call for the unpinned slots, through the same caches and limits as the graph
+        backends = make_backends(get_chat_model(), get_tavily_search())
+        team = replace_analysts(backends, topic, analysts, pinned, feedback)
         
         # Clear progress
         progress_placeholder.empty()
         
-        if final_result and 'analysts' in final_result:
-            # Update the analysts with the new feedback-influenced team
-            st.session_state.current_analysts = final_result['analysts']
-            st.session_state.show_analysts = True
-            
-            # Update the main graph's state too
-            if st.session_state.current_graph and st.session_state.current_thread:
-                st.session_state.current_graph.update_state(
-                    st.session_state.current_thread, 
-                    {"analysts": final_result['analysts']}, 
-                    as_node="create_analysts"
-                )
-            
-            # Show success message
-            st.success(f"✅ Team regenerated successfully with {len(final_result['analysts'])} analysts!")
-        else:
-            st.error("Failed to regenerate analysts with feedback")
+        # The run waits at team review with the new team, as if create_analysts produced it
+        st.session_state.current_graph.update_state(
+            st.session_state.current_thread,
+            {"analysts": team},
+            as_node="create_analysts"
+        )
+        st.session_state.current_analysts = team
+        st.session_state.pinned_analysts = {team[i].name for i in pinned if i < len(team)}
+        st.session_state.show_analysts = True
+        start_speculation(topic, team)
+        
+        replaced = len(analysts) - len(pinned)
+        st.success(f"✅ Team regenerated: replaced {replaced} of {len(team)} analysts!")
             
     except Exception as e:
         if 'progress_placeholder' in locals():
@@ -1516,7 +906,7 @@ def generate_new_analysts(topic: str):
         
         # Generate fresh analysts
         result = None
-        for event in graph.stream({
+        for event in stream_graph(graph, {
             "topic": topic,
             "max_analysts": 3
         }, {"configurable": {"thread_id": f"regen_{int(time.time())}"}}, stream_mode="values"):
@@ -1540,10 +930,52 @@ def regenerate_analysts():
         # Clear current analysts first
         st.session_state.current_analysts = None
         st.session_state.show_analysts = False
+        release_run()
         
         # Start fresh research process
         conduct_research(st.session_state.last_report_topic)
 
+def resume_research(run: dict):
+    """Resume an interrupted run from its last checkpoint"""
+    graph = create_exact_research_graph()
+    thread = run["thread"]
+    state = graph.get_state(thread)
+
+    st.session_state.current_graph = graph
+    st.session_state.current_thread = thread
+    st.session_state.last_report_topic = state.values.get("topic", "")
+    st.session_state.research_in_progress = True
+    add_message("user", st.session_state.last_report_topic)
+
+    if state.next == ("human_feedback",):
+        # Stopped while waiting for team approval
+        st.session_state.current_analysts = state.values.get("analysts")
+        st.session_state.pinned_analysts = set()
+        st.session_state.show_analysts = True
+        start_speculation(st.session_state.last_report_topic, st.session_state.current_analysts)
+    else:
+        # Interviews and sections that already completed are not run again
+        continue_research_with_feedback(None, resume=True)
+
+def display_incomplete_runs():
+    """Offer to resume this session's runs interrupted by a restart (durable checkpointer only)"""
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        return
+    runs = incomplete_runs(create_exact_research_graph(), checkpointer, st.session_state.session_id)
+    if not runs:
+        return
+
+    st.markdown("**Unfinished research**")
+    for run in runs:
+        col1, col2 = st.columns([10, 2])
+        with col1:
+            st.markdown(run["topic"])
+        with col2:
+            if st.button("Resume", key=f"resume_{run['thread']['configurable']['thread_id']}", use_container_width=True):
+                resume_research(run)
+                st.rerun()
+
 def main():
     # Check API keys on startup
     check_api_keys()
@@ -1553,6 +985,10 @@ def main():
         setup_api_keys()
         return
     
+    # Reattach to a background research job after a browser refresh
+    if st.session_state.current_job_id is None and "job" in st.query_params:
+        reattach_job(st.query_params["job"])
+    
     # Determine if we have messages for layout
     has_messages = len(st.session_state.messages) > 0
     chat_class = "has-messages" if has_messages else "empty"
@@ -1569,12 +1005,18 @@ def main():
             <div class="empty-subtitle">Your AI-powered research assistant</div>
         </div>
         """, unsafe_allow_html=True)
+        if not st.session_state.research_in_progress:
+            display_incomplete_runs()
     else:
         display_messages()
         
         # Show analysts for review if needed
         if st.session_state.show_analysts:
             display_analysts()
+        
+        # Progress of the running research job
+        if st.session_state.current_job_id:
+            display_job_progress()
     
     st.markdown('</div>', unsafe_allow_html=True)
     
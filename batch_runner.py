@@ -0,0 +1,200 @@
+"""Headless batch runner: research many topics from a JSONL file without the Streamlit UI.
+
+    python batch_runner.py topics.jsonl out/ --parallelism 4
+
+Each line is a JSON object with ``topic`` (or ``title``) and optionally ``id`` (or
+``request_id``), ``max_analysts``, ``max_num_turns`` and ``feedback``. ``feedback`` is a
+string or a list of strings applied in turn at the team review step, each one
+regenerating the analysts; the final team is approved automatically.
+
+Reports are written to ``out/reports/<id>.md``, one metrics record per run is
+appended to ``out/metrics.jsonl`` and node start/end events go to ``out/progress.jsonl``. Running the same batch again skips topics that
+already have a report, so an interrupted batch picks up where it stopped. With
+``RESEARCH_CHECKPOINT_DB`` set, topics that were cut off mid-run also continue from
+their last checkpoint instead of starting over.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from checkpoint_store import get_checkpointer
+from progress import PROGRESS_STREAM_MODE, ProgressTracker
+from rate_limit import BACKGROUND, priority
+from research_graph import stream_graph, use_async_graph, with_checkpointer
+from resources import get_research_graph
+
+DEFAULT_MAX_ANALYSTS = 3
+
+
+def load_topics(path: str) -> list:
+    """Read topic records from a JSONL file, giving each a stable, filename-safe ``id``"""
+    topics = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            topic = record.get("topic") or record.get("title")
+            if not topic:
+                raise ValueError(f"{path}:{line_number}: record has no topic")
+            run_id = str(record.get("id") or record.get("request_id") or _default_id(topic))
+            feedback = record.get("feedback") or []
+            topics.append({
+                "id": re.sub(r"[^\w.-]", "_", run_id),
+                "topic": topic,
+                "max_analysts": int(record.get("max_analysts", DEFAULT_MAX_ANALYSTS)),
+                "max_num_turns": record.get("max_num_turns"),
+                "feedback": [feedback] if isinstance(feedback, str) else list(feedback),
+            })
+    return topics
+
+
+def _default_id(topic: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:40]
+    return f"{slug}-{hashlib.sha1(topic.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _run(graph, run_input, thread, tracker=None):
+    for namespace, _, event in stream_graph(graph, run_input, thread, subgraphs=True,
+                                            stream_mode=[PROGRESS_STREAM_MODE]):
+        if tracker is not None:
+            tracker.feed(namespace, event)
+    return graph.get_state(thread)
+
+
+def research_topic(graph, record: dict, tracker=None) -> dict:
+    """Run one topic to completion and return the final graph state.
+
+    Scripted feedback is applied at each ``human_feedback`` interrupt, then the team is
+    approved. A thread that already has checkpoints continues where it stopped.
+    ``tracker`` (a progress.ProgressTracker) receives the run's task events.
+    """
+    thread = {"configurable": {"thread_id": f"batch_{record['id']}"}}
+    state = graph.get_state(thread)
+    if not state.values:
+        run_input = {"topic": record["topic"], "max_analysts": record["max_analysts"]}
+        if record.get("max_num_turns"):
+            run_input["max_num_turns"] = int(record["max_num_turns"])
+        state = _run(graph, run_input, thread, tracker)
+
+    # Every feedback round is one state update; skip rounds applied before a restart
+    applied = sum(1 for snapshot in graph.get_state_history(thread) if snapshot.metadata.get("source") == "update")
+    feedback = record["feedback"][applied:]
+    while state.next == ("human_feedback",):
+        note = feedback.pop(0) if feedback else None
+        graph.update_state(thread, {"human_analyst_feedback": note}, as_node="human_feedback")
+        state = _run(graph, None, thread, tracker)
+
+    if state.next:
+        # Cut off mid-run by a previous attempt
+        state = _run(graph, None, thread, tracker)
+    return state.values
+
+
+class BatchRunner:
+    """Runs topics on a worker pool and records reports and metrics under ``out_dir``"""
+
+    def __init__(self, out_dir: str, graph=None, parallelism: int = 4):
+        self.out_dir = out_dir
+        self.reports_dir = os.path.join(out_dir, "reports")
+        self.metrics_path = os.path.join(out_dir, "metrics.jsonl")
+        self.progress_path = os.path.join(out_dir, "progress.jsonl")
+        self.parallelism = parallelism
+        self._graph = graph
+        self._lock = threading.Lock()
+        os.makedirs(self.reports_dir, exist_ok=True)
+
+    def graph(self):
+        if self._graph is None:
+            self._graph = get_research_graph(use_async=use_async_graph())
+        # Each run gets its own checkpointer unless a durable one is configured
+        return with_checkpointer(self._graph, get_checkpointer())
+
+    def report_path(self, run_id: str) -> str:
+        return os.path.join(self.reports_dir, f"{run_id}.md")
+
+    def completed(self) -> set:
+        """Ids whose report has been written"""
+        return {name[:-3] for name in os.listdir(self.reports_dir) if name.endswith(".md")}
+
+    def _record(self, metrics: dict):
+        with self._lock:
+            with open(self.metrics_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(metrics) + "\n")
+
+    def run_one(self, record: dict) -> dict:
+        metrics = {"id": record["id"], "topic": record["topic"], "started_at": time.time()}
+        start = time.perf_counter()
+        tracker = ProgressTracker(run_id=record["id"], log_path=self.progress_path)
+        try:
+            # Batch work yields to interactive users sharing the rate limits
+            with priority(BACKGROUND):
+                values = research_topic(self.graph(), record, tracker)
+            report = values.get("final_report")
+            if not report:
+                raise RuntimeError("run finished without a final report")
+            path = self.report_path(record["id"])
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(f"# {record['topic']}\n\n{report}\n")
+            os.replace(path + ".tmp", path)
+            metrics.update(
+                status="ok",
+                analysts=len(values.get("analysts") or []),
+                sections=len(values.get("sections") or []),
+                failed_analysts=[failure["name"] for failure in values.get("failed_analysts") or []],
+                report_chars=len(report),
+            )
+        except Exception as e:
+            metrics.update(status="error", error=f"{type(e).__name__}: {e}")
+        finally:
+            tracker.close()
+        metrics["duration"] = round(time.perf_counter() - start, 3)
+        # Seconds spent in each node, summed over analysts and turns
+        metrics["node_seconds"] = {name: round(timing["total"], 3)
+                                   for name, timing in tracker.snapshot()["timings"].items()}
+        self._record(metrics)
+        return metrics
+
+    def run(self, records: list, log=None) -> list:
+        """Run every record without a report yet; returns the metrics of this invocation"""
+        done = self.completed()
+        pending = [record for record in records if record["id"] not in done]
+        if log:
+            log(f"{len(records) - len(pending)} of {len(records)} topics already done, {len(pending)} to run")
+        results = []
+        with ThreadPoolExecutor(max_workers=self.parallelism, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(self.run_one, record) for record in pending]
+            for future in as_completed(futures):
+                metrics = future.result()
+                results.append(metrics)
+                if log:
+                    detail = metrics.get("error") or f"{metrics['sections']} sections"
+                    log(f"[{len(results)}/{len(pending)}] {metrics['id']}: {metrics['status']} "
+                        f"in {metrics['duration']:.1f}s ({detail})")
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Research every topic in a JSONL file")
+    parser.add_argument("topics", help="JSONL file with one topic record per line")
+    parser.add_argument("out_dir", help="Directory for reports/ and metrics.jsonl")
+    parser.add_argument("--parallelism", type=int, default=4, help="Topics researched at the same time")
+    args = parser.parse_args(argv)
+
+    records = load_topics(args.topics)
+    results = BatchRunner(args.out_dir, parallelism=args.parallelism).run(
+        records, log=lambda line: print(line, file=sys.stderr))
+    failed = sum(1 for metrics in results if metrics["status"] != "ok")
+    print(f"{len(results) - failed} succeeded, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Compare sync and async research graph throughput with stubbed backends.
+
+    python benchmarks/bench_async.py [--latency 0.05] [--analysts 3 10 30]
+
+Every model and search call sleeps for ``--latency`` seconds, so the numbers reflect
+how well each execution path overlaps I/O rather than any real provider.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Benchmarks must not read or fill the real caches, or wait on the real rate limits
+os.environ["RESEARCH_LLM_CACHE"] = "0"
+os.environ["RESEARCH_RETRIEVAL_CACHE"] = "0"
+os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+os.environ["RESEARCH_TAVILY_RPM"] = "1000000"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from research_graph import build_research_graph, stream_graph
+from benchmarks.fakes import FakeChatModel, FakeTavilySearch, FakeWikipedia
+
+
+def run_once(num_analysts: int, latency: float, use_async: bool) -> dict:
+    llm = FakeChatModel(latency=latency, max_analysts=num_analysts)
+    graph = build_research_graph(llm, FakeTavilySearch(latency=latency), wikipedia=FakeWikipedia(latency=latency),
+                                 use_async=use_async)
+    thread = {"configurable": {"thread_id": f"bench_{num_analysts}_{use_async}"}}
+
+    peak_threads = threading.active_count()
+    start = time.perf_counter()
+    for _ in stream_graph(graph, {"topic": "Benchmark topic", "max_analysts": num_analysts}, thread, stream_mode="updates"):
+        pass
+    graph.update_state(thread, {"human_analyst_feedback": None}, as_node="human_feedback")
+    for _ in stream_graph(graph, None, thread, stream_mode="updates"):
+        peak_threads = max(peak_threads, threading.active_count())
+    elapsed = time.perf_counter() - start
+
+    final_state = graph.get_state(thread)
+    assert final_state.values.get("final_report"), "run did not produce a report"
+    return {"elapsed": elapsed, "peak_threads": peak_threads}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per model/search call")
+    parser.add_argument("--analysts", type=int, nargs="+", default=[3, 10, 30])
+    args = parser.parse_args(argv)
+
+    print(f"{'analysts':>8} {'mode':>5} {'wall (s)':>9} {'analysts/s':>11} {'threads':>8}")
+    for num_analysts in args.analysts:
+        for use_async in (False, True):
+            result = run_once(num_analysts, args.latency, use_async)
+            mode = "async" if use_async else "sync"
+            print(f"{num_analysts:>8} {mode:>5} {result['elapsed']:>9.2f} "
+                  f"{num_analysts / result['elapsed']:>11.2f} {result['peak_threads']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""End-to-end research benchmark against stored baselines, fully offline.
+
+    python benchmarks/bench_e2e.py [--analysts 1 3 5] [--turns 1 2 3] [--latency 0.02]
+    python benchmarks/bench_e2e.py --update-baseline
+
+Drives the app's own ``create_exact_research_graph`` with the shared resources pointed at
+deterministic fakes: the chat model answers with ``--response-words`` words after
+``--latency`` seconds, and Tavily and WikipediaLoader return ``--doc-chars`` sized
+documents. Every (analysts, turns) combination runs in a fresh process, so peak RSS is
+that run's own. Reported per run: wall time, seconds per node (summed over analysts and
+turns), peak RSS and serialized checkpoint size.
+
+Results are compared with ``benchmarks/baselines/e2e.json``; the run exits non-zero when
+any metric exceeds its baseline by more than ``--tolerance``. Baselines are recorded per
+machine class: refresh them with ``--update-baseline`` after an intended change.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "e2e.json")
+METRICS = ("wall_seconds", "peak_rss_mb", "checkpoint_kb")
+# Differences below these are noise, however large relative to a small baseline
+MIN_REGRESSION = {"wall_seconds": 0.1, "peak_rss_mb": 10, "checkpoint_kb": 1}
+
+
+def _configure_environment(use_async: bool):
+    # Benchmarks must not read or fill the real caches, stores or limits
+    os.environ["RESEARCH_LLM_CACHE"] = "0"
+    os.environ["RESEARCH_RETRIEVAL_CACHE"] = "0"
+    # Checkpoints stay in a per-run MemorySaver, as the baselines were recorded
+    os.environ["RESEARCH_SESSION_STORE"] = "0"
+    os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+    os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+    os.environ["RESEARCH_TAVILY_RPM"] = "1000000"
+    os.environ["RESEARCH_ASYNC_GRAPH"] = "1" if use_async else "0"
+    for name in ("RESEARCH_CHECKPOINT_DB", "RESEARCH_WIKIPEDIA_INDEX", "RESEARCH_TRACE"):
+        os.environ.pop(name, None)
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+    sys.path.insert(0, ROOT)
+
+
+def checkpoint_bytes(graph, thread) -> int:
+    """Serialized size of every checkpoint and pending write of a thread, subgraphs included"""
+    serde = graph.checkpointer.serde
+    total = 0
+    for saved in graph.checkpointer.list({"configurable": {"thread_id": thread["configurable"]["thread_id"]}}):
+        total += len(serde.dumps_typed(saved.checkpoint)[1])
+        total += sum(len(serde.dumps_typed(write[2])[1]) for write in saved.pending_writes or [])
+    return total
+
+
+def run_config(num_analysts: int, num_turns: int, options: dict) -> dict:
+    """One full run in this process: team generation, approval, interviews and report"""
+    _configure_environment(options["use_async"])
+
+    from batch_runner import research_topic
+    from benchmarks.fakes import install_fakes
+    from progress import ProgressTracker
+
+    install_fakes(max_analysts=num_analysts, latency=options["latency"],
+                  response_words=options["response_words"], doc_chars=options["doc_chars"])
+
+    from streamlit.logger import set_log_level
+
+    # Importing the app outside `streamlit run` warns about the missing script context
+    set_log_level("error")
+    from app_exact import create_exact_research_graph
+
+    graph = create_exact_research_graph()
+    record = {"id": f"bench_a{num_analysts}_t{num_turns}", "topic": "Benchmark topic",
+              "max_analysts": num_analysts, "max_num_turns": num_turns, "feedback": []}
+    tracker = ProgressTracker(run_id=record["id"])
+    start = time.perf_counter()
+    values = research_topic(graph, record, tracker)
+    wall = time.perf_counter() - start
+    assert values.get("final_report"), "run did not produce a report"
+    assert len(values.get("sections") or []) == num_analysts, "an interview did not produce a section"
+
+    thread = {"configurable": {"thread_id": f"batch_{record['id']}"}}
+    return {
+        "wall_seconds": round(wall, 3),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "checkpoint_kb": round(checkpoint_bytes(graph, thread) / 1024, 1),
+        "node_seconds": {name: round(timing["total"], 3) for name, timing in tracker.snapshot()["timings"].items()},
+    }
+
+
+def run_isolated(num_analysts: int, num_turns: int, options: dict) -> dict:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_config, (num_analysts, num_turns, options))
+
+
+def regressions(key: str, result: dict, baseline: dict, tolerance: float) -> list:
+    expected = baseline.get(key)
+    if not expected:
+        return []
+    return [f"{key}: {metric} {result[metric]} > baseline {expected[metric]} +{tolerance:.0%}"
+            for metric in METRICS if metric in expected
+            and result[metric] > max(expected[metric] * (1 + tolerance), expected[metric] + MIN_REGRESSION[metric])]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--analysts", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per model/search call")
+    parser.add_argument("--response-words", type=int, default=200, help="Words (output tokens) per model response")
+    parser.add_argument("--doc-chars", type=int, default=2000, help="Characters per retrieved document")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Benchmark the async graph")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional regression per metric")
+    parser.add_argument("--update-baseline", action="store_true", help="Record these results as the baseline")
+    parser.add_argument("--nodes", action="store_true", help="Also print seconds per node")
+    args = parser.parse_args(argv)
+
+    options = {"latency": args.latency, "response_words": args.response_words, "doc_chars": args.doc_chars,
+               "use_async": args.use_async}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    # Baselines only compare runs with the same fake backend settings
+    mode = "async" if args.use_async else "sync"
+    profile = f"{mode} latency={args.latency} words={args.response_words} docs={args.doc_chars}"
+    profile_baseline = baseline.get(profile, {})
+
+    print(f"{'analysts':>8} {'turns':>5} {'wall (s)':>9} {'peak RSS (MB)':>14} {'checkpoints (KB)':>17}")
+    results, failures = {}, []
+    for num_analysts in args.analysts:
+        for num_turns in args.turns:
+            key = f"analysts={num_analysts} turns={num_turns}"
+            result = run_isolated(num_analysts, num_turns, options)
+            results[key] = result
+            print(f"{num_analysts:>8} {num_turns:>5} {result['wall_seconds']:>9.2f} "
+                  f"{result['peak_rss_mb']:>14.1f} {result['checkpoint_kb']:>17.1f}")
+            if args.nodes:
+                for name, seconds in sorted(result["node_seconds"].items(), key=lambda item: -item[1]):
+                    print(f"{'':>16}{seconds:>9.2f}  {name}")
+            failures.extend(regressions(key, result, profile_baseline, args.tolerance))
+
+    if args.update_baseline:
+        profile_baseline.update({key: {metric: result[metric] for metric in METRICS} for key, result in results.items()})
+        baseline[profile] = profile_baseline
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    elif not profile_baseline:
+        print(f"no baseline for '{profile}'; record one with --update-baseline")
+    elif failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(f"{len(failures)} regression(s) against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
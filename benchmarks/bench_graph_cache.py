@@ -0,0 +1,66 @@
+"""Cold versus warm cost of getting a research graph for a new run.
+
+    python benchmarks/bench_graph_cache.py [--repeat 50]
+
+Cold: build the Anthropic/Tavily clients and compile the research graph, as every run
+used to. Warm: fetch the pooled clients and cached compiled graph and take a per-run copy
+with its own checkpointer. No network calls are made, so placeholder API keys are set
+when real ones are missing.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_anthropic import ChatAnthropic
+from langchain_tavily import TavilySearch
+
+import resources
+from research_graph import build_analyst_feedback_graph, build_research_graph, with_checkpointer
+
+
+def cold():
+    llm = ChatAnthropic(model=resources.DEFAULT_MODEL, temperature=0)
+    build_research_graph(llm, TavilySearch(max_results=3))
+    build_analyst_feedback_graph(llm)
+
+
+def warm():
+    with_checkpointer(resources.get_research_graph())
+    with_checkpointer(resources.get_analyst_feedback_graph())
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, max(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # First call populates the pool; it costs the same as a cold build
+    start = time.perf_counter()
+    warm()
+    first = (time.perf_counter() - start) * 1000
+
+    cold_median, cold_max = measure(cold, args.repeat)
+    warm_median, warm_max = measure(warm, args.repeat)
+    print(f"{'path':>6} {'median (ms)':>12} {'max (ms)':>9}")
+    print(f"{'cold':>6} {cold_median:>12.2f} {cold_max:>9.2f}")
+    print(f"{'warm':>6} {warm_median:>12.3f} {warm_max:>9.3f}")
+    print(f"first warm() call (fills the pool): {first:.2f}ms, speedup {cold_median / warm_median:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Cold-start import time of the app and worker entry points against a stored budget.
+
+    python benchmarks/bench_import.py [--modules app_exact batch_runner report_pdf] [--top 8]
+    python benchmarks/bench_import.py --update-baseline
+
+Each module is imported in a fresh ``python -X importtime`` process, ``--repeats`` times,
+and the fastest cumulative time is reported with the slowest modules it imports directly.
+Importing ``app_exact`` runs the page script in Streamlit's bare mode without API keys,
+which is what a new Streamlit worker does before the first credential check.
+
+The run exits non-zero when a module takes longer than its baseline in
+``benchmarks/baselines/imports.json`` by more than ``--tolerance``, or when it imports
+any of ``LAZY_MODULES``: those are only imported on first use (a PDF download, the first
+client or search), never at start-up.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "imports.json")
+# Differences below this are noise, however large relative to a small baseline
+MIN_REGRESSION = 0.05
+
+LAZY_MODULES = ("langchain_anthropic", "anthropic", "langchain_tavily", "langchain_community",
+                "weasyprint", "reportlab", "pypdf")
+
+
+def import_profile(module: str) -> list:
+    """(depth, self seconds, cumulative seconds, name) per module imported, from -X importtime"""
+    env = dict(os.environ)
+    # No keys, so the page script stops at the key form and makes no network calls
+    for name in ("ANTHROPIC_API_KEY", "TAVILY_API_KEY", "RESEARCH_TRACE"):
+        env.pop(name, None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:  self |  cumulative | <2 spaces per nesting level>name"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((depth, int(self_us) / 1e6, int(cumulative_us) / 1e6, name.strip()))
+    return entries
+
+
+def summarize(module: str, entries: list) -> dict:
+    # -X importtime lists a module after everything it imports, so its children precede it
+    index = max(i for i, entry in enumerate(entries) if entry[0] == 0 and entry[3] == module)
+    children = []
+    for depth, _, cumulative, name in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((cumulative, name))
+    imported = {entry[3] for entry in entries[:index + 1]}
+    return {
+        "seconds": entries[index][2],
+        "children": sorted(children, reverse=True),
+        "eager": sorted(name for name in LAZY_MODULES if name in imported),
+    }
+
+
+def measure(module: str, repeats: int) -> dict:
+    # The first import writes bytecode caches; only later, warm-disk imports are timed
+    import_profile(module)
+    return min((summarize(module, import_profile(module)) for _ in range(repeats)), key=lambda r: r["seconds"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["app_exact", "batch_runner", "report_pdf", "research_graph"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Slowest direct imports to list per module")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional regression")
+    parser.add_argument("--update-baseline", action="store_true", help="Record these results as the budget")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results, failures = {}, []
+    for module in args.modules:
+        result = measure(module, args.repeats)
+        expected = baseline.get(module)
+        budget = f"  (baseline {expected:.2f}s)" if expected is not None else ""
+        print(f"{module}: {result['seconds']:.2f}s{budget}")
+        for cumulative, name in result["children"][:args.top]:
+            print(f"  {cumulative:>7.3f}s  {name}")
+        if result["eager"]:
+            failures.append(f"{module}: imports {', '.join(result['eager'])} at start-up")
+        if expected is not None and result["seconds"] > max(expected * (1 + args.tolerance), expected + MIN_REGRESSION):
+            failures.append(f"{module}: {result['seconds']:.2f}s > baseline {expected:.2f}s +{args.tolerance:.0%}")
+        results[module] = round(result["seconds"], 3)
+
+    if args.update_baseline:
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(f"{len(failures)} import-time failure(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Microbenchmark for the per-interview BM25 passage index.
+
+    python benchmarks/bench_passage_index.py [--turns 2 5 10 20] [--repeat 20]
+
+Simulates the context an interview accumulates (three web results and two 4000 character
+Wikipedia articles per turn) and times the incremental index update and the ranked,
+budgeted context assembly done before each generate_answer call. Compare the numbers
+with the seconds a Claude call takes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_assembly import ANSWER_TOKEN_BUDGET, PassageIndex, render_passages, select_passages
+
+VOCABULARY = [f"term{i}" for i in range(5000)]
+
+
+def synthetic_text(rng, chars):
+    words = []
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(rng.choice(VOCABULARY))
+        if rng.random() < 0.08:
+            words[-1] += "."
+        if rng.random() < 0.01:
+            words[-1] += "\n\n"
+    return " ".join(words)
+
+
+def turn_blobs(rng, turn):
+    web = "\n\n---\n\n".join(
+        f'<Document href="https://example.com/{turn}/{i}"/>\n{synthetic_text(rng, 600)}\n</Document>' for i in range(3)
+    )
+    wiki = "\n\n---\n\n".join(
+        f'<Document source="https://en.wikipedia.org/wiki/Article_{turn}_{i}" page=""/>\n{synthetic_text(rng, 4000)}\n</Document>'
+        for i in range(2)
+    )
+    return [web, wiki]
+
+
+def run(turns, repeat):
+    update_times, query_times, passages = [], [], 0
+    for r in range(repeat):
+        rng = random.Random(r)
+        index = PassageIndex()
+        context = []
+        for turn in range(turns):
+            context = context + turn_blobs(rng, turn)
+            question = " ".join(rng.choice(VOCABULARY) for _ in range(12))
+
+            start = time.perf_counter()
+            index.update(context)
+            update_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            render_passages(select_passages(index.rank(question), ANSWER_TOKEN_BUDGET, 12))
+            query_times.append(time.perf_counter() - start)
+        passages += len(index)
+    return {
+        "update_ms": 1000 * sum(update_times) / len(update_times),
+        "query_ms": 1000 * sum(query_times) / len(query_times),
+        "passages": passages / repeat,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 5, 10, 20])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"{'turns':>5} {'passages':>9} {'update/turn (ms)':>17} {'query/turn (ms)':>16}")
+    for turns in args.turns:
+        result = run(turns, args.repeat)
+        print(f"{turns:>5} {result['passages']:>9.0f} {result['update_ms']:>17.2f} {result['query_ms']:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""PDF rendering time across report sizes: in-process versus the worker pool.
+
+    python benchmarks/bench_pdf_render.py [--sections 3 10 30] [--workers 1 2 4]
+
+"in-process" is ``generate_pdf`` on the calling thread, as the app used to render. The
+pool columns time ``PdfRenderPool.render`` with the given number of worker processes,
+after a warm-up render so process start-up is not counted. Reports of at least
+``--parallel-chars`` characters are rendered in parallel pieces and merged.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from report_pdf import PDF_MERGE_AVAILABLE, PdfRenderPool, generate_pdf, pdf_renderer
+
+
+def best_of(repeats: int, fn) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, nargs="+", default=[3, 10, 30], help="Analyst sections per report")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--parallel-chars", type=int, default=40000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # Imported here so spawned workers, which re-import this script, skip the graph modules
+    from benchmarks.fakes import synthetic_report
+
+    reports = {sections: synthetic_report(sections) for sections in args.sections}
+    pools = {workers: PdfRenderPool(workers=workers, parallel_min_chars=args.parallel_chars)
+             for workers in args.workers}
+    for pool in pools.values():
+        # Start every worker process before timing
+        pool.render(reports[max(args.sections)], "Benchmark topic")
+
+    print(f"renderer: {pdf_renderer()}, merge: {'pypdf' if PDF_MERGE_AVAILABLE else 'unavailable'}, "
+          f"{os.cpu_count()} CPUs")
+    header = f"{'sections':>8} {'chars':>8} {'in-process':>11}"
+    header += "".join(f" {f'{workers} workers':>11}" for workers in args.workers)
+    print(header)
+    for sections, report in reports.items():
+        row = f"{sections:>8} {len(report):>8} {best_of(args.repeats, lambda: generate_pdf(report, 'Benchmark topic')):>10.2f}s"
+        for workers, pool in pools.items():
+            row += f" {best_of(args.repeats, lambda: pool.render(report, 'Benchmark topic')):>10.2f}s"
+        print(row)
+    for pool in pools.values():
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
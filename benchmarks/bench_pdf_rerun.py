@@ -0,0 +1,88 @@
+"""Rerun latency with reports in the chat, and PDF download latency, with the PDF cache.
+
+    python benchmarks/bench_pdf_rerun.py [--reports 1 5 20] [--reruns 10] [--sections 5]
+
+Runs app_exact.py with Streamlit's AppTest harness and a session that already holds
+``--reports`` report messages. Download buttons defer rendering to the first click, so
+a rerun should cost the same however many reports are shown. For comparison, "eager"
+is what each rerun used to spend rendering every report's PDF. The download rows time
+the first request for a report (a render) and a repeated request (served from the cache).
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+# Benchmarks must not read or fill the real caches
+os.environ["RESEARCH_PDF_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "pdf_cache.sqlite3")
+os.environ["RESEARCH_SESSION_STORE_PATH"] = os.path.join(tempfile.mkdtemp(), "sessions.sqlite3")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+import resources
+from benchmarks.fakes import synthetic_report
+
+
+def report_message(report: str) -> dict:
+    return {"role": "assistant", "topic": "Benchmark topic", "content": report}
+
+
+def time_reruns(app: AppTest, reruns: int) -> float:
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--reruns", type=int, default=10)
+    parser.add_argument("--sections", type=int, default=5, help="Analyst sections per synthetic report")
+    args = parser.parse_args(argv)
+
+    resources.validate_credentials = lambda: None
+    # Importing the app outside `streamlit run` warns about the missing script context
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    import app_exact
+    from pdf_cache import get_pdf_cache
+    from report_pdf import generate_pdf, pdf_renderer
+
+    report = synthetic_report(args.sections)
+    start = time.perf_counter()
+    generate_pdf(report, "Benchmark topic")
+    render = time.perf_counter() - start
+
+    print(f"renderer: {pdf_renderer()}, {len(report)} chars, {render * 1000:.1f}ms per render")
+    print(f"{'reports':>7} {'rerun (ms)':>11} {'eager (ms)':>11}")
+    for count in args.reports:
+        app = AppTest.from_file(os.path.join(ROOT, "app_exact.py"), default_timeout=60)
+        app.session_state["messages"] = [report_message(report) for _ in range(count)]
+        app.session_state["last_report_topic"] = "Benchmark topic"
+        app.run()
+        assert not app.exception, app.exception
+        rerun = time_reruns(app, args.reruns)
+        print(f"{count:>7} {rerun * 1000:>11.1f} {(rerun + count * render) * 1000:>11.1f}")
+
+    cache = get_pdf_cache()
+    start = time.perf_counter()
+    app_exact.get_report_pdf(report, "Benchmark topic")
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    app_exact.get_report_pdf(report, "Benchmark topic")
+    repeat = time.perf_counter() - start
+    print(f"download: first {first * 1000:.1f}ms, repeated {repeat * 1000:.2f}ms "
+          f"(renders: {cache.stats()['renders']})")
+
+
+if __name__ == "__main__":
+    main()
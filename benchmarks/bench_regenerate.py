@@ -0,0 +1,95 @@
+"""Latency of one "Regenerate Team" click: the feedback graph versus in-place replacement.
+
+    python benchmarks/bench_regenerate.py [--latency 1.0] [--per-analyst 1.5] [--analysts 3]
+
+"feedback graph" is the previous path: a fresh analyst feedback graph generates a whole
+team from scratch, is interrupted, and generates it again with the feedback.
+"replace, N pinned" keeps N analysts of the current team and replaces the others with
+``research_graph.replace_analysts``. The fake model answers after ``--latency`` seconds
+plus ``--per-analyst`` seconds for every analyst it writes, since a real model's latency
+grows with its output. The response cache is off, as for a topic seen for the first time.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _configure_environment():
+    # Benchmarks must not read or fill the real caches, stores or limits
+    os.environ["RESEARCH_LLM_CACHE"] = "0"
+    os.environ["RESEARCH_RETRIEVAL_CACHE"] = "0"
+    os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+    os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+    for name in ("RESEARCH_CHECKPOINT_DB", "RESEARCH_TRACE"):
+        os.environ.pop(name, None)
+    sys.path.insert(0, ROOT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated seconds per model call")
+    parser.add_argument("--per-analyst", type=float, default=1.5, help="Simulated seconds per analyst written")
+    parser.add_argument("--analysts", type=int, default=3)
+    args = parser.parse_args(argv)
+    _configure_environment()
+
+    from benchmarks.fakes import FakeChatModel, FakeStructuredModel
+    from research_graph import (Perspectives, analyst_messages, build_analyst_feedback_graph, make_backends,
+                                replace_analysts, stream_graph, with_checkpointer)
+
+    class CountingStructuredModel(FakeStructuredModel):
+        def _parsed(self, messages):
+            parsed = super()._parsed(messages)
+            if self.schema is Perspectives:
+                self.llm.calls += 1
+                self.llm.written += len(parsed.analysts)
+                time.sleep(self.llm.per_analyst * len(parsed.analysts))
+            return parsed
+
+    class CountingModel(FakeChatModel):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.per_analyst = args.per_analyst
+            self.calls = 0
+            self.written = 0
+
+        def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+            return CountingStructuredModel(self, schema, include_raw)
+
+    topic, feedback = "Benchmark topic", "Add an analyst focused on economics"
+
+    def feedback_graph(llm):
+        graph = with_checkpointer(build_analyst_feedback_graph(llm))
+        thread = {"configurable": {"thread_id": "bench_regenerate"}}
+        for _ in stream_graph(graph, {"topic": topic, "max_analysts": args.analysts}, thread, stream_mode="values"):
+            pass
+        graph.update_state(thread, {"human_analyst_feedback": feedback}, as_node="human_feedback")
+        for _ in stream_graph(graph, None, thread, stream_mode="values"):
+            pass
+        return graph.get_state(thread).values["analysts"]
+
+    print(f"{'path':<18} {'seconds':>8} {'model calls':>12} {'analysts written':>17}")
+    llm = CountingModel(latency=args.latency, max_analysts=args.analysts)
+    start = time.perf_counter()
+    feedback_graph(llm)
+    print(f"{'feedback graph':<18} {time.perf_counter() - start:>8.2f} {llm.calls:>12} {llm.written:>17}")
+
+    # The team under review, generated without simulated latency
+    current = CountingModel(latency=0, max_analysts=args.analysts)
+    current.per_analyst = 0
+    team = make_backends(current, None).invoke(
+        analyst_messages({"topic": topic, "max_analysts": args.analysts}), Perspectives).analysts
+    for pinned in range(args.analysts):
+        llm = CountingModel(latency=args.latency, max_analysts=args.analysts)
+        backends = make_backends(llm, None)
+        start = time.perf_counter()
+        replace_analysts(backends, topic, team, set(range(pinned)), feedback)
+        label = f"replace, {pinned} pinned"
+        print(f"{label:<18} {time.perf_counter() - start:>8.2f} {llm.calls:>12} {llm.written:>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Markdown-to-PDF-input conversion time on large synthetic reports.
+
+    python benchmarks/bench_report_render.py [--lines 10000 30000 100000]
+
+Times the single-pass block parser and the WeasyPrint HTML and ReportLab story built
+from it, next to the line-by-line builders the app used before ("previous"), which
+copied lines through without escaping them or converting inline Markdown. Each size is
+run on a "dense" report, with bold, italics and links on every line, and on a "prose"
+report with the same structure and no inline markup. PDF layout itself is not included.
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from report_blocks import parse_report
+from report_pdf import REPORTLAB_AVAILABLE, report_flowables, report_html
+
+
+def synthetic_report(lines: int, markup: bool = True) -> str:
+    """Report of about ``lines`` lines mixing every block type"""
+    out = ["# Benchmark topic", "", "## Introduction", ""]
+    section = 0
+    while len(out) < lines:
+        section += 1
+        out += [f"### Section {section}", ""]
+        if markup:
+            out += [f"Finding {section} with **emphasis**, *nuance* and a [source](https://example.com/{section}) [1]."
+                    for _ in range(6)]
+            out += [""] + [f"- Point {n} about https://example.com/{section}/{n}" for n in range(4)] + [""]
+            out += [f"[{n}] https://example.com/source/{section}/{n}" for n in range(1, 4)] + ["", "---", ""]
+        else:
+            out += [f"Finding {section} with emphasis, nuance and a source at example.com/{section} [1]."
+                    for _ in range(6)]
+            out += [""] + [f"- Point {n} about example.com/{section}/{n}" for n in range(4)] + [""]
+            out += [f"[{n}] Source {n}, example.com/source/{section}/{n}" for n in range(1, 4)] + ["", "---", ""]
+    return "\n".join(out[:lines])
+
+
+def line_by_line_html(content: str, topic: str) -> str:
+    """The previous WeasyPrint HTML builder, without its stylesheet"""
+    content = html.unescape(content)
+    content = re.sub(r'\*Research completed.*?\*', '', content, flags=re.DOTALL)
+    html_content = f"<html><body><h1>Research Report: {topic}</h1>\n"
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line or line == '---':
+            continue
+        if line.startswith('# '):
+            html_content += f"<h1>{line[2:]}</h1>\n"
+        elif line.startswith('## '):
+            html_content += f"<h2>{line[3:]}</h2>\n"
+        elif line.startswith('### '):
+            html_content += f"<h3>{line[4:]}</h3>\n"
+        elif line.startswith('[') and ']' in line:
+            html_content += f'<p class="sources">{line}</p>\n'
+        elif line and len(line) > 1:
+            html_content += f"<p>{line}</p>\n"
+    return html_content + "</body></html>"
+
+
+def line_by_line_story(content: str, topic: str, styles) -> list:
+    """The previous ReportLab story builder"""
+    from reportlab.platypus import Paragraph, Spacer
+
+    story = [Paragraph(f"Research Report: {topic}", styles['Title']), Spacer(1, 20)]
+    content = html.unescape(content)
+    content = re.sub(r'\*Research completed.*?\*', '', content, flags=re.DOTALL)
+    for line in content.split('\n'):
+        line = line.strip()
+        if line and len(line) > 1:
+            if line.startswith('# '):
+                story.append(Paragraph(line[2:], styles['Heading1']))
+            elif line.startswith('## '):
+                story.append(Paragraph(line[3:], styles['Heading2']))
+            elif line.startswith('### '):
+                story.append(Paragraph(line[4:], styles['Heading3']))
+            else:
+                story.append(Paragraph(line, styles['Normal']))
+            story.append(Spacer(1, 6))
+    return story
+
+
+def timed(fn, repeat: int = 3) -> float:
+    """Best of ``repeat`` runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[10000, 30000, 100000])
+    args = parser.parse_args(argv)
+
+    if REPORTLAB_AVAILABLE:
+        from reportlab.lib.styles import getSampleStyleSheet
+        styles = getSampleStyleSheet()
+
+    print(f"{'lines':>7} {'report':>6} {'chars':>9} {'parse':>8} {'previous HTML':>14} {'HTML':>8} "
+          f"{'previous story':>15} {'story':>9}")
+    for lines in args.lines:
+        for kind in ("dense", "prose"):
+            report = synthetic_report(lines, markup=kind == "dense")
+            parse = timed(lambda: parse_report(report))
+            legacy = timed(lambda: line_by_line_html(report, "Benchmark topic"))
+            to_html = timed(lambda: report_html(report, "Benchmark topic"))
+            if REPORTLAB_AVAILABLE:
+                legacy_story = timed(lambda: line_by_line_story(report, "Benchmark topic", styles))
+                story = timed(lambda: report_flowables(report, "Benchmark topic", styles))
+            else:
+                legacy_story = story = 0.0
+            print(f"{lines:>7} {kind:>6} {len(report):>9} {parse * 1000:>6.1f}ms {legacy * 1000:>12.1f}ms "
+                  f"{to_html * 1000:>6.1f}ms {legacy_story * 1000:>13.1f}ms {story * 1000:>7.1f}ms")
+
+if __name__ == "__main__":
+    main()
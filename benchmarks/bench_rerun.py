@@ -0,0 +1,59 @@
+"""Streamlit rerun latency with the cached credential health check.
+
+    python benchmarks/bench_rerun.py [--reruns 20] [--check-latency 1.0]
+
+Runs app_exact.py with Streamlit's AppTest harness. The credential check is replaced by
+a stub that sleeps ``--check-latency`` seconds (a Claude round-trip) and counts calls, so
+the first run pays for validation and the warm reruns should make no network calls at all.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+import resources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--check-latency", type=float, default=1.0, help="Simulated seconds per credential check")
+    args = parser.parse_args(argv)
+
+    calls = []
+
+    def stub_validate():
+        calls.append(time.time())
+        time.sleep(args.check_latency)
+
+    resources.validate_credentials = stub_validate
+    app = AppTest.from_file(os.path.join(ROOT, "app_exact.py"), default_timeout=60)
+
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    first_calls = len(calls)
+
+    times = []
+    for _ in range(args.reruns):
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+
+    print(f"first run:   {first * 1000:8.1f}ms  credential checks: {first_calls}")
+    print(f"warm reruns: {statistics.median(times) * 1000:8.1f}ms median, {max(times) * 1000:.1f}ms max  "
+          f"credential checks: {len(calls) - first_calls}")
+    if len(calls) != first_calls:
+        sys.exit("warm reruns performed network credential checks")
+
+
+if __name__ == "__main__":
+    main()
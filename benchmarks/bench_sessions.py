@@ -0,0 +1,166 @@
+"""Server memory under many sessions with reports: session state versus the session store.
+
+    python benchmarks/bench_sessions.py [--sessions 10 40] [--reports 3] [--cap-mb 1]
+
+Every simulated session runs ``--reports`` full research runs against the fake backends
+and keeps what app_exact keeps between reruns. "session state" is the previous layout:
+each report wrapped in its chat message and again in ``last_report_content``, plus the
+last run's graph with its ``MemorySaver``. "session store" keeps only references in
+session state, checkpoints runs to the store and deletes them once the report is stored.
+After all runs every session is rerendered once, reading each report back.
+
+Each (layout, sessions) pair runs in a fresh process. Reported: RSS after the load and
+its peak, the bytes session state retains (texts plus the serialized checkpoints of
+retained graphs), and the store's memory tier and file size.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYOUTS = ("session state", "session store")
+
+
+def _configure_environment():
+    # Benchmarks must not read or fill the real caches, stores or limits
+    os.environ["RESEARCH_LLM_CACHE"] = "0"
+    os.environ["RESEARCH_RETRIEVAL_CACHE"] = "0"
+    os.environ["RESEARCH_SESSION_STORE"] = "0"
+    os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+    os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+    os.environ["RESEARCH_TAVILY_RPM"] = "1000000"
+    for name in ("RESEARCH_CHECKPOINT_DB", "RESEARCH_WIKIPEDIA_INDEX", "RESEARCH_TRACE"):
+        os.environ.pop(name, None)
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-benchmark")
+    os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+    sys.path.insert(0, ROOT)
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def retained_bytes(session: dict) -> int:
+    """Texts in a simulated session state plus the checkpoints its graph keeps in memory"""
+    total = sum(len(message.get("content", "")) for message in session["messages"])
+    total += len(session["last_report_content"] or "")
+    graph = session["current_graph"]
+    if graph is not None:
+        serde = graph.checkpointer.serde
+        for saved in graph.checkpointer.list(session["current_thread"]):
+            total += len(serde.dumps_typed(saved.checkpoint)[1])
+            total += sum(len(serde.dumps_typed(write[2])[1]) for write in saved.pending_writes or [])
+    return total
+
+
+def run_load(layout: str, sessions: int, options: dict) -> dict:
+    """Simulate ``sessions`` sessions in this process and measure what they retain"""
+    _configure_environment()
+
+    import resources
+    from batch_runner import research_topic
+    from benchmarks.fakes import install_fakes
+    from research_graph import with_checkpointer
+    from session_store import SessionStore
+    from streamlit.logger import set_log_level
+
+    # Importing the app outside `streamlit run` warns about the missing script context
+    set_log_level("error")
+    from app_exact import REPORT_MESSAGE
+
+    install_fakes(max_analysts=options["analysts"], latency=0, response_words=options["response_words"],
+                  doc_chars=options["doc_chars"])
+    base_graph = resources.get_research_graph()
+    store = None
+    if layout == "session store":
+        store = SessionStore(path=os.path.join(tempfile.mkdtemp(), "sessions.sqlite3"),
+                             max_memory_bytes=int(options["memory_mb"] * 1024 * 1024),
+                             max_session_bytes=int(options["cap_mb"] * 1024 * 1024))
+
+    states = []
+    start = time.perf_counter()
+    for number in range(sessions):
+        session_id = f"session{number}"
+        state = {"messages": [], "last_report_content": None, "current_graph": None, "current_thread": None}
+        for report_number in range(options["reports"]):
+            topic = f"Benchmark topic {number}-{report_number}"
+            record = {"id": f"{session_id}_{report_number}", "topic": topic,
+                      "max_analysts": options["analysts"], "max_num_turns": 2, "feedback": []}
+            thread = {"configurable": {"thread_id": f"batch_{record['id']}"}}
+            graph = with_checkpointer(base_graph, store.checkpointer() if store else None)
+            if store:
+                store.add_thread(session_id, thread["configurable"]["thread_id"])
+            report = research_topic(graph, record)["final_report"]
+
+            state["messages"].append({"role": "user", "content": topic})
+            if store:
+                state["messages"].append({"role": "assistant", "topic": topic,
+                                          "ref": store.put(session_id, report, "report")})
+                store.drop_thread(thread["configurable"]["thread_id"])
+            else:
+                state["messages"].append({"role": "assistant",
+                                          "content": REPORT_MESSAGE.format(topic=topic, report=report)})
+                state["last_report_content"] = report
+                state["current_graph"], state["current_thread"] = graph, thread
+        states.append((session_id, state))
+    wall = time.perf_counter() - start
+
+    # One rerender of every session
+    for session_id, state in states:
+        for message in state["messages"]:
+            if "ref" in message:
+                assert store.get(session_id, message["ref"]) is not None, "stored report went missing"
+
+    gc.collect()
+    result = {
+        "wall_seconds": round(wall, 2),
+        "rss_mb": round(current_rss_mb(), 1),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "state_kb": round(sum(retained_bytes(state) for _, state in states) / 1024, 1),
+        "store_memory_kb": 0.0,
+        "store_disk_kb": 0.0,
+    }
+    if store:
+        result["store_memory_kb"] = round(store.stats()["memory_bytes"] / 1024, 1)
+        result["store_disk_kb"] = round(sum(os.path.getsize(store.path + suffix) for suffix in ("", "-wal")
+                                            if os.path.exists(store.path + suffix)) / 1024, 1)
+    return result
+
+
+def run_isolated(layout: str, sessions: int, options: dict) -> dict:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_load, (layout, sessions, options))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--reports", type=int, default=3, help="Research runs per session")
+    parser.add_argument("--analysts", type=int, default=3)
+    parser.add_argument("--response-words", type=int, default=400, help="Words per model response")
+    parser.add_argument("--doc-chars", type=int, default=2000, help="Characters per retrieved document")
+    parser.add_argument("--memory-mb", type=float, default=64, help="Session store memory tier")
+    parser.add_argument("--cap-mb", type=float, default=4, help="Session store memory per session")
+    args = parser.parse_args(argv)
+
+    options = {"reports": args.reports, "analysts": args.analysts, "response_words": args.response_words,
+               "doc_chars": args.doc_chars, "memory_mb": args.memory_mb, "cap_mb": args.cap_mb}
+    print(f"{'layout':<14} {'sessions':>8} {'runs (s)':>9} {'RSS (MB)':>9} {'peak (MB)':>10} "
+          f"{'state (KB)':>11} {'store mem (KB)':>15} {'store disk (KB)':>16}")
+    for sessions in args.sessions:
+        for layout in LAYOUTS:
+            result = run_isolated(layout, sessions, options)
+            print(f"{layout:<14} {sessions:>8} {result['wall_seconds']:>9.2f} {result['rss_mb']:>9.1f} "
+                  f"{result['peak_rss_mb']:>10.1f} {result['state_kb']:>11.1f} {result['store_memory_kb']:>15.1f} "
+                  f"{result['store_disk_kb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Approval-to-report time with and without speculative prefetch during team review.
+
+    python benchmarks/bench_speculation.py [--latency 0.5] [--review 5] [--analysts 3]
+
+Runs the app's research graph against the fake backends, each mode in a fresh process
+with empty temporary caches. After team generation the simulated user reviews the
+team for ``--review`` seconds and approves it unchanged. "speculative" starts
+``speculation.speculate`` when the team is shown; "baseline" idles. Reported: seconds
+from approval to the final report, model calls and retrievals made after approval, and
+what the speculation spent. "regenerated" cancels the speculation at the end of the
+review instead, as "Regenerate Team" does, and shows the cost recorded as wasted.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("baseline", "speculative", "regenerated")
+
+
+def _configure_environment():
+    # Benchmarks must not read or fill the real caches, stores or limits
+    cache_dir = tempfile.mkdtemp()
+    os.environ["RESEARCH_LLM_CACHE_PATH"] = os.path.join(cache_dir, "llm_cache.sqlite3")
+    os.environ["RESEARCH_RETRIEVAL_CACHE_PATH"] = os.path.join(cache_dir, "retrieval_cache.sqlite3")
+    os.environ["RESEARCH_SESSION_STORE"] = "0"
+    os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+    os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+    os.environ["RESEARCH_TAVILY_RPM"] = "1000000"
+    for name in ("RESEARCH_LLM_CACHE", "RESEARCH_RETRIEVAL_CACHE", "RESEARCH_CHECKPOINT_DB",
+                 "RESEARCH_WIKIPEDIA_INDEX", "RESEARCH_TRACE"):
+        os.environ.pop(name, None)
+    sys.path.insert(0, ROOT)
+
+
+def run_mode(mode: str, options: dict) -> dict:
+    _configure_environment()
+
+    from benchmarks.fakes import FakeChatModel, FakeTavilySearch, FakeWikipediaLoader
+    import research_graph
+    from llm_cache import get_llm_cache
+    from research_graph import build_research_graph, with_checkpointer
+    from retrieval_cache import get_retrieval_cache
+    from speculation import speculate, speculation_stats
+
+    latency = options["latency"]
+    llm = FakeChatModel(latency=latency, max_analysts=options["analysts"])
+    tavily = FakeTavilySearch(latency=latency)
+    FakeWikipediaLoader.latency = latency
+    research_graph.WikipediaLoader = FakeWikipediaLoader
+    graph = with_checkpointer(build_research_graph(llm, tavily))
+    thread = {"configurable": {"thread_id": f"bench_{mode}"}}
+    topic = "Benchmark topic"
+
+    for _ in graph.stream({"topic": topic, "max_analysts": options["analysts"],
+                           "max_num_turns": options["turns"]}, thread):
+        pass
+    analysts = graph.get_state(thread).values["analysts"]
+
+    speculation = speculate(topic, analysts, llm, tavily) if mode != "baseline" else None
+    # The user reads the proposed team
+    time.sleep(options["review"])
+    if mode == "regenerated":
+        speculation.cancel()
+        return {"speculation": speculation.snapshot(), "stats": speculation_stats()}
+    if speculation is not None:
+        speculation.commit()
+
+    # Cache misses are the calls that reach the model or a retriever
+    calls_before = get_llm_cache().stats()["misses"]
+    fetches_before = get_retrieval_cache().stats()["misses"]
+    start = time.perf_counter()
+    graph.update_state(thread, {"human_analyst_feedback": None}, as_node="human_feedback")
+    for _ in graph.stream(None, thread):
+        pass
+    wall = time.perf_counter() - start
+    assert graph.get_state(thread).values.get("final_report"), "run did not produce a report"
+    return {
+        "wall_seconds": round(wall, 2),
+        "llm_calls": get_llm_cache().stats()["misses"] - calls_before,
+        "retrievals": get_retrieval_cache().stats()["misses"] - fetches_before,
+        "speculation": speculation.snapshot() if speculation else None,
+        "stats": speculation_stats(),
+    }
+
+
+def run_isolated(mode: str, options: dict) -> dict:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_mode, (mode, options))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per model/search call")
+    parser.add_argument("--review", type=float, default=5.0, help="Seconds the user spends reviewing the team")
+    parser.add_argument("--analysts", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    options = {"latency": args.latency, "review": args.review, "analysts": args.analysts, "turns": args.turns}
+    print(f"{'mode':<12} {'approval to report (s)':>23} {'model calls':>12} {'retrievals':>11} "
+          f"{'speculated':>11} {'tokens':>7} {'searches':>9}")
+    for mode in MODES:
+        result = run_isolated(mode, options)
+        spec = result["speculation"] or {}
+        prefetched = f"{spec['prefetched']}/{spec['analysts']}" if spec else "-"
+        if mode == "regenerated":
+            stats = result["stats"]
+            print(f"{mode:<12} {'-':>23} {'-':>12} {'-':>11} {prefetched:>11} {spec['tokens']:>7} {spec['searches']:>9}"
+                  f"   wasted: {stats['wasted_tokens']} tokens, {stats['wasted_searches']} searches")
+            continue
+        print(f"{mode:<12} {result['wall_seconds']:>23.2f} {result['llm_calls']:>12} {result['retrievals']:>11} {prefetched:>11} "
+              f"{spec.get('tokens', 0):>7} {spec.get('searches', 0):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Deterministic stand-ins for the chat model and retrievers used by the benchmarks.
+
+They honor the same calls the research graph makes (``invoke``/``ainvoke``,
+``with_structured_output``, ``search``) and sleep for a configurable latency instead of
+calling Anthropic, Tavily or Wikipedia.
+"""
+import asyncio
+import re
+import time
+
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, get_buffer_string
+
+from research_graph import Perspectives, SearchQueries, SearchQuery
+
+
+def _usage(messages, output_tokens: int) -> dict:
+    # Roughly one token per word, reported the way ChatAnthropic reports usage
+    input_tokens = len(get_buffer_string(messages).split())
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens}
+
+
+class FakeStructuredModel:
+    def __init__(self, llm, schema, include_raw: bool = False):
+        self.llm = llm
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def _result(self, messages):
+        parsed = self._parsed(messages)
+        if not self.include_raw:
+            return parsed
+        raw = AIMessage(content="", usage_metadata=_usage(messages, len(parsed.model_dump_json().split())))
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+    def _parsed(self, messages):
+        if self.schema is Perspectives:
+            # The analyst prompt asks for the top {max_analysts} themes
+            requested = re.search(r"top (\d+) themes", get_buffer_string(messages))
+            count = int(requested.group(1)) if requested else self.llm.max_analysts
+            return Perspectives(analysts=[
+                dict(affiliation=f"Institute {i}", name=f"Analyst {i}", role=f"Role {i}",
+                     description=f"Focus area {i}")
+                for i in range(count)
+            ])
+        if self.schema is SearchQueries:
+            return SearchQueries(web_query="web query", encyclopedia_query="encyclopedia query")
+        if self.schema is SearchQuery:
+            return SearchQuery(search_query="search query")
+        raise ValueError(f"Unsupported schema {self.schema!r}")
+
+    def invoke(self, messages, config=None, **kwargs):
+        time.sleep(self.llm.latency)
+        return self._result(messages)
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        await asyncio.sleep(self.llm.latency)
+        return self._result(messages)
+
+
+class FakeChatModel:
+    """Chat model that answers after ``latency`` seconds with a fixed-size response"""
+
+    model = "fake-chat-model"
+    temperature = 0
+
+    def __init__(self, latency: float = 0.05, max_analysts: int = 3, response_words: int = 50):
+        self.latency = latency
+        self.max_analysts = max_analysts
+        self.response_words = response_words
+
+    def _message(self, messages):
+        body = " ".join(["insight [1]"] * (self.response_words // 2))
+        return AIMessage(content=f"## Insights\n{body}\n\n## Sources\n[1] https://example.com",
+                         usage_metadata=_usage(messages, self.response_words))
+
+    def invoke(self, messages, config=None, **kwargs):
+        time.sleep(self.latency)
+        return self._message(messages)
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._message(messages)
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        return FakeStructuredModel(self, schema, include_raw)
+
+
+class FakeTavilySearch:
+    """Web search returning ``max_results`` documents of ``doc_chars`` characters"""
+
+    def __init__(self, latency: float = 0.05, max_results: int = 3, doc_chars: int = 500):
+        self.latency = latency
+        self.max_results = max_results
+        self.doc_chars = doc_chars
+
+    def _results(self, query):
+        return {"results": [
+            {"url": f"https://example.com/{i}", "content": (query + " ") * (self.doc_chars // (len(query) + 1))}
+            for i in range(self.max_results)
+        ]}
+
+    def invoke(self, query):
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def ainvoke(self, query):
+        await asyncio.sleep(self.latency)
+        return self._results(query)
+
+
+class FakeWikipedia:
+    """Wikipedia backend with the LocalWikipedia ``search`` interface"""
+
+    def __init__(self, latency: float = 0.05, doc_chars: int = 4000):
+        self.latency = latency
+        self.doc_chars = doc_chars
+
+    def _docs(self, query, k):
+        return [{
+            "page_content": ("article text " * self.doc_chars)[:self.doc_chars],
+            "metadata": {"title": f"{query} {i}", "source": f"https://en.wikipedia.org/wiki/Article_{i}"},
+        } for i in range(k)]
+
+    def search(self, query, k=2):
+        time.sleep(self.latency)
+        return self._docs(query, k)
+
+    async def asearch(self, query, k=2):
+        await asyncio.sleep(self.latency)
+        return self._docs(query, k)
+
+
+class FakeWikipediaLoader:
+    """Drop-in for langchain's WikipediaLoader; set ``latency`` and ``doc_chars`` on the class"""
+
+    latency = 0.05
+    doc_chars = 4000
+
+    def __init__(self, query: str, load_max_docs: int = 2, **kwargs):
+        self.query = query
+        self.load_max_docs = load_max_docs
+
+    def _docs(self):
+        return [Document(
+            page_content=("article text " * self.doc_chars)[:self.doc_chars],
+            metadata={"title": f"{self.query} {i}", "source": f"https://en.wikipedia.org/wiki/Article_{i}"},
+        ) for i in range(self.load_max_docs)]
+
+    def load(self):
+        time.sleep(self.latency)
+        return self._docs()
+
+    async def aload(self):
+        await asyncio.sleep(self.latency)
+        return self._docs()
+
+
+def install_fakes(max_analysts: int = 3, latency: float = 0.05, response_words: int = 50, doc_chars: int = 500):
+    """Point the shared resources and research_graph's WikipediaLoader at the fakes"""
+    import resources
+    import research_graph
+
+    resources.get_chat_model = lambda *args, **kwargs: FakeChatModel(
+        latency=latency, max_analysts=max_analysts, response_words=response_words)
+    resources.get_tavily_search = lambda *args, **kwargs: FakeTavilySearch(latency=latency, doc_chars=doc_chars)
+    FakeWikipediaLoader.latency = latency
+    FakeWikipediaLoader.doc_chars = doc_chars
+    research_graph.WikipediaLoader = FakeWikipediaLoader
+
+
+def synthetic_report(sections: int, paragraphs: int = 6) -> str:
+    """Report shaped like finalize_report output"""
+    parts = ["# Benchmark topic\n\n## Introduction\n" + "Introductory text. " * 60]
+    for section in range(sections):
+        body = "\n\n".join(f"Finding {section}.{p} with supporting detail [{p + 1}]. " * 8 for p in range(paragraphs))
+        parts.append(f"## Insights\n\n### Section {section}\n{body}")
+    parts.append("## Conclusion\n" + "Concluding text. " * 60)
+    sources = "\n".join(f"[{i}] https://example.com/source/{i}" for i in range(1, 2 * sections + 1))
+    parts.append(f"## Sources\n{sources}")
+    return "\n\n---\n\n".join(parts)
@@ -0,0 +1,143 @@
+"""Durable checkpoints so research runs survive restarts and can resume mid-graph.
+
+Set ``RESEARCH_CHECKPOINT_DB`` to a SQLite file to replace the per-run ``MemorySaver``
+with one process-wide ``DurableSqliteSaver``. Runs keep their ``research_<timestamp>``
+thread ids, so after a restart ``incomplete_runs`` finds interrupted runs and streaming
+the graph again with ``None`` input continues from the last completed node. LangGraph
+stores the writes of every finished task, so interviews that completed before the crash
+are not executed again. Each run is recorded with the session that started it, and only
+that session's runs are listed.
+
+The database runs in WAL mode with ``synchronous=NORMAL``: every checkpoint is still its
+own commit, but a commit appends to the WAL without waiting for an fsync. The WAL is only
+synced when SQLite copies it into the main file. A crashed process loses no checkpoints;
+a power failure may lose the last few.
+"""
+import os
+import sqlite3
+import threading
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    SQLITE_CHECKPOINTS_AVAILABLE = True
+except ImportError:
+    SQLITE_CHECKPOINTS_AVAILABLE = False
+
+# Pydantic models stored in graph state
+STATE_MODELS = [
+    ("research_graph", "Analyst"),
+    ("research_graph", "SearchQueries"),
+    ("research_graph", "SearchQuery"),
+]
+
+
+def checkpoint_serializer():
+    """Checkpoint serializer that may deserialize the research graph's state models"""
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=STATE_MODELS)
+    except TypeError:
+        # Older langgraph releases deserialize any registered type without an allowlist
+        return JsonPlusSerializer()
+
+
+if SQLITE_CHECKPOINTS_AVAILABLE:
+    class DurableSqliteSaver(SqliteSaver):
+        """SqliteSaver tuned for durability at low cost, usable from async graphs too.
+
+        Local SQLite calls take microseconds, so the async methods run them inline
+        instead of requiring a separate aiosqlite connection per event loop.
+        """
+
+        @classmethod
+        def open(cls, path: str) -> "DurableSqliteSaver":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            return cls(conn, serde=checkpoint_serializer())
+
+        async def aget_tuple(self, config):
+            return self.get_tuple(config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            for item in self.list(config, filter=filter, before=before, limit=limit):
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return self.put(config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return self.put_writes(config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return self.delete_thread(thread_id)
+
+        def setup(self) -> None:
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_owners (thread_id TEXT PRIMARY KEY, owner TEXT NOT NULL)"
+            )
+            self.conn.commit()
+
+        def set_owner(self, thread_id: str, owner: str) -> None:
+            """Record the session that started ``thread_id``"""
+            with self.cursor() as cur:
+                cur.execute("INSERT OR REPLACE INTO thread_owners (thread_id, owner) VALUES (?, ?)",
+                            (thread_id, owner))
+
+        def delete_thread(self, thread_id: str) -> None:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_owners WHERE thread_id = ?", (str(thread_id),))
+
+        def thread_ids(self, prefix: str = "", limit: int = 50, owner: str = None) -> list:
+            """Thread ids with checkpoints, most recently updated first, of ``owner`` if given"""
+            query = ("SELECT c.thread_id, MAX(c.checkpoint_id) AS latest FROM checkpoints c "
+                     "WHERE c.checkpoint_ns = '' AND c.thread_id LIKE ? ")
+            params = [prefix + "%"]
+            if owner is not None:
+                query += "AND c.thread_id IN (SELECT thread_id FROM thread_owners WHERE owner = ?) "
+                params.append(owner)
+            with self.cursor(False) as cur:
+                cur.execute(query + "GROUP BY c.thread_id ORDER BY latest DESC LIMIT ?", (*params, limit))
+                return [row[0] for row in cur.fetchall()]
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """Process-wide durable checkpointer, or None when ``RESEARCH_CHECKPOINT_DB`` is unset"""
+    global _checkpointer
+    path = os.getenv("RESEARCH_CHECKPOINT_DB")
+    if not path or not SQLITE_CHECKPOINTS_AVAILABLE:
+        return None
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = DurableSqliteSaver.open(path)
+        return _checkpointer
+
+
+def incomplete_runs(graph, checkpointer, owner: str, prefix: str = "research_", limit: int = 5) -> list:
+    """Runs started by ``owner`` that stopped before producing a final report, newest first.
+
+    Returns dicts with ``thread`` (the run config), ``topic`` and ``next`` (the nodes that
+    will run on resume). ``graph`` must be compiled with ``checkpointer``.
+    """
+    runs = []
+    for thread_id in checkpointer.thread_ids(prefix, owner=owner):
+        thread = {"configurable": {"thread_id": thread_id}}
+        state = graph.get_state(thread)
+        if not state.next or state.values.get("final_report"):
+            continue
+        runs.append({"thread": thread, "topic": state.values.get("topic", ""), "next": state.next})
+        if len(runs) >= limit:
+            break
+    return runs
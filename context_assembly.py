@@ -0,0 +1,317 @@
+"""Token-budgeted context assembly for generate_answer and write_section.
+
+``InterviewState.context`` grows by a web blob and a Wikipedia blob on every turn and used
+to be pasted into prompts whole. ``assemble_context`` parses those blobs back into
+documents, splits them into passages, drops duplicate and near-duplicate passages across
+turns, ranks the rest against the current question and keeps the best ones that fit the
+token budget. Passages are rendered back into ``<Document ...>`` blocks, one per source,
+so the citation instructions in the prompts keep working.
+
+Ranking uses a ``PassageIndex`` (BM25) per interview that is updated incrementally with the
+blobs added since the previous turn instead of being rebuilt. An index is only reused for a
+context whose leading blobs are exactly the ones it has indexed, and a ranking only covers
+the passages of the blobs in the context being assembled.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+
+# Budgets per call site; 0 disables assembly
+ANSWER_TOKEN_BUDGET = int(os.getenv("RESEARCH_ANSWER_TOKEN_BUDGET", "6000"))
+SECTION_TOKEN_BUDGET = int(os.getenv("RESEARCH_SECTION_TOKEN_BUDGET", "8000"))
+# Most passages pulled into a single prompt
+TOP_K_PASSAGES = int(os.getenv("RESEARCH_CONTEXT_TOP_K", "12"))
+PASSAGE_CHARS = 800
+NEAR_DUPLICATE_THRESHOLD = 0.7
+# Near-duplicate candidates are found through shared shingles. Shingles in more passages
+# than this (boilerplate) are not used to find candidates, and at most
+# NEAR_DUPLICATE_CANDIDATES passages with the most shared shingles are compared exactly.
+SHINGLE_POSTINGS_CAP = 32
+NEAR_DUPLICATE_CANDIDATES = 8
+
+_DOCUMENT_RE = re.compile(r"<Document (?P<attrs>[^>]*?)/>\n(?P<body>.*?)\n</Document>", re.DOTALL)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class Passage:
+    header: str
+    text: str
+    order: int
+
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4
+
+
+def parse_documents(context) -> list:
+    """Return (header, body) pairs from context blobs, ``header`` being the Document tag"""
+    if isinstance(context, str):
+        context = [context]
+    documents = []
+    for blob in context:
+        for match in _DOCUMENT_RE.finditer(blob or ""):
+            documents.append((f"<Document {match.group('attrs')}/>", match.group("body").strip()))
+    return documents
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_CHARS) -> list:
+    """Split on paragraphs, packing short ones together and cutting long ones on sentences"""
+    passages, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph]
+        if len(paragraph) > max_chars:
+            pieces, piece = [], ""
+            for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+                if piece and len(piece) + len(sentence) + 1 > max_chars:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece} {sentence}".strip()
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}".strip()
+    if current:
+        passages.append(current)
+    return passages
+
+
+def tokenize(text: str) -> list:
+    return _WORD_RE.findall(text.lower())
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = tokenize(text)
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def collect_passages(context, start: int = 0) -> list:
+    passages = []
+    for header, body in parse_documents(context):
+        for text in split_passages(body):
+            passages.append(Passage(header=header, text=text, order=start + len(passages)))
+    return passages
+
+
+def render_passages(passages: list) -> str:
+    """Render passages grouped into one Document block per source, in first-seen order"""
+    groups = OrderedDict()
+    for passage in sorted(passages, key=lambda p: p.order):
+        groups.setdefault(passage.header, []).append(passage.text)
+    return "\n\n---\n\n".join(
+        f"{header}\n" + "\n\n".join(texts) + "\n</Document>" for header, texts in groups.items()
+    )
+
+
+def select_passages(passages: list, token_budget: int, top_k: int = None) -> list:
+    """Pick the most relevant passages that fit the token budget"""
+    selected, used = [], 0
+    for passage in passages:
+        if top_k is not None and len(selected) >= top_k:
+            break
+        cost = count_tokens(passage.text) + count_tokens(passage.header) + 4
+        if used + cost > token_budget:
+            continue
+        selected.append(passage)
+        used += cost
+    return selected
+
+
+class PassageIndex:
+    """Incremental BM25 index over the deduplicated passages of one interview.
+
+    ``update(context)`` only parses the context blobs added since the last call. The cost
+    of adding a passage does not grow with the index: near-duplicates are looked for
+    among a capped set of candidates that share shingles with it. Updates and rankings
+    hold the index lock, so concurrent turns never see a half-indexed blob.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        self.k1 = k1
+        self.b = b
+        self.threshold = threshold
+        self.passages = []
+        self._blob_hashes = []
+        # Number of passages indexed after each blob
+        self._blob_ends = []
+        self._term_counts = []
+        self._lengths = []
+        self._total_length = 0
+        self._postings = defaultdict(dict)
+        self._seen = set()
+        self._shingles = []
+        self._shingle_postings = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.passages)
+
+    @property
+    def blob_count(self) -> int:
+        return len(self._blob_hashes)
+
+    def _is_duplicate(self, text: str) -> bool:
+        normalized = " ".join(tokenize(text))
+        if not normalized or normalized in self._seen:
+            return True
+        shingles = _shingles(text)
+        shared = Counter()
+        for shingle in shingles:
+            ids = self._shingle_postings.get(shingle)
+            if ids and len(ids) <= SHINGLE_POSTINGS_CAP:
+                shared.update(ids)
+        for other_id, _ in shared.most_common(NEAR_DUPLICATE_CANDIDATES):
+            other = self._shingles[other_id]
+            if len(shingles & other) / len(shingles | other) >= self.threshold:
+                return True
+        self._seen.add(normalized)
+        shingle_id = len(self._shingles)
+        self._shingles.append(shingles)
+        for shingle in shingles:
+            self._shingle_postings[shingle].append(shingle_id)
+        return False
+
+    def add(self, passage: Passage):
+        if self._is_duplicate(passage.text):
+            return
+        doc_id = len(self.passages)
+        terms = Counter(tokenize(passage.text))
+        length = sum(terms.values())
+        self.passages.append(passage)
+        self._term_counts.append(terms)
+        self._lengths.append(length)
+        self._total_length += length
+        for term, count in terms.items():
+            self._postings[term][doc_id] = count
+
+    def extends(self, context) -> bool:
+        """Whether ``context`` starts with exactly the blobs already indexed"""
+        if len(context) < self.blob_count:
+            return False
+        return all(_blob_hash(blob) == digest for blob, digest in zip(context, self._blob_hashes))
+
+    def update(self, context) -> bool:
+        """Index the blobs appended to ``context`` since the last update.
+
+        Returns False, indexing nothing, when ``context`` does not extend the indexed blobs.
+        """
+        with self._lock:
+            if not self.extends(context):
+                return False
+            for blob in context[self.blob_count:]:
+                start = self.passages[-1].order + 1 if self.passages else 0
+                for passage in collect_passages([blob], start=start):
+                    self.add(passage)
+                self._blob_hashes.append(_blob_hash(blob))
+                self._blob_ends.append(len(self.passages))
+            return True
+
+    def _limit(self, blobs: int = None) -> int:
+        # Caller holds self._lock
+        if blobs is None or blobs >= len(self._blob_ends):
+            return len(self.passages)
+        return self._blob_ends[blobs - 1] if blobs > 0 else 0
+
+    def _scores(self, query: str, limit: int) -> dict:
+        # Caller holds self._lock
+        n = len(self.passages)
+        if not n:
+            return {}
+        average_length = self._total_length / n
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if doc_id >= limit:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return scores
+
+    def scores(self, query: str, blobs: int = None) -> dict:
+        """BM25 score of every passage, from the first ``blobs`` blobs, sharing a term with the query"""
+        with self._lock:
+            return self._scores(query, self._limit(blobs))
+
+    def rank(self, query: str, blobs: int = None) -> list:
+        """The passages of the first ``blobs`` blobs (all by default), best BM25 match first.
+
+        Unmatched passages keep arrival order.
+        """
+        with self._lock:
+            limit = self._limit(blobs)
+            scores = self._scores(query, limit)
+            order = sorted(range(limit), key=lambda i: (-scores.get(i, 0.0), i))
+            return [self.passages[i] for i in order]
+
+    def search(self, query: str, k: int = 5, blobs: int = None) -> list:
+        return self.rank(query, blobs)[:k]
+
+
+def _blob_hash(blob: str) -> str:
+    return hashlib.blake2b((blob or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PassageIndexRegistry:
+    """Keeps one PassageIndex per interview, found by the first context blob.
+
+    An interview's context only ever grows, so the index for a state is the one whose
+    indexed blobs are a prefix of the state's context. A context that diverges from the
+    indexed blobs gets a new index, which takes over the slot. Least recently used indexes
+    are dropped beyond ``max_indexes``.
+    """
+
+    def __init__(self, max_indexes: int = 256):
+        self.max_indexes = max_indexes
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, context) -> PassageIndex:
+        key = (scope, _blob_hash(context[0]) if context else "")
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = PassageIndex()
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        if not index.update(context):
+            index = PassageIndex()
+            index.update(context)
+            with self._lock:
+                self._indexes[key] = index
+        return index
+
+
+passage_indexes = PassageIndexRegistry()
+
+
+def assemble_context(context, query: str, token_budget: int, scope: str = "", top_k: int = TOP_K_PASSAGES) -> str:
+    """Deduplicated, ranked and budgeted context for a prompt.
+
+    ``scope`` separates interviews (the analyst name) so each gets its own incremental
+    index. A ``token_budget`` of 0 disables assembly and returns the context as it used
+    to be pasted into prompts.
+    """
+    if not token_budget:
+        return context
+    index = passage_indexes.get(scope, context)
+    # Another run sharing this context's history may have indexed further blobs since
+    ranked = index.rank(query, blobs=len(context))
+    return render_passages(select_passages(ranked, token_budget, top_k))
@@ -0,0 +1,201 @@
+"""Background execution of research runs, shared by every Streamlit session.
+
+The interview and report phase takes minutes. Running it inside the Streamlit script
+blocked the page, and a refresh or rerun killed the run. Runs are now submitted to a
+process-wide ``JobExecutor``: a fixed pool of worker threads plus a bounded queue. Once
+the pool and the queue are full, ``submit`` raises ``QueueFullError`` instead of letting
+waits grow without limit. Sessions keep only the job id, poll the ``Job`` for progress
+and the final report, and can look the job up again after a browser refresh.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from progress import PROGRESS_STREAM_MODE, ProgressTracker
+from research_graph import REPORT_NODES, message_chunk_text, stream_graph
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class QueueFullError(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+class Job:
+    """Handle for one background run; every field is safe to read from another thread"""
+
+    def __init__(self, job_id: str, topic: str = ""):
+        self.id = job_id
+        self.topic = topic
+        self.status = QUEUED
+        self.progress = "Waiting for a free research worker..."
+        # Report preview, one draft per report node in final report order
+        self.drafts = {node: "" for node in REPORT_NODES}
+        self.tracker = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._draft_ids = {}
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def set_progress(self, message: str):
+        with self._lock:
+            self.progress = message
+
+    def add_token(self, node: str, chunk):
+        """Append a streamed message chunk to ``node``'s draft"""
+        if node not in self.drafts:
+            return
+        with self._lock:
+            if self._draft_ids.get(node) != chunk.id:
+                # A retried call starts a new message, so start the draft over
+                self._draft_ids[node] = chunk.id
+                self.drafts[node] = ""
+            self.drafts[node] += message_chunk_text(chunk)
+
+    def set_draft(self, node: str, text: str):
+        with self._lock:
+            self.drafts[node] = text
+
+    def snapshot(self) -> dict:
+        """Consistent copy of the fields the UI renders"""
+        tracker = self.tracker.snapshot() if self.tracker is not None else None
+        with self._lock:
+            return {
+                "status": self.status,
+                "progress": (tracker and tracker["stage"]) or self.progress,
+                "tracker": tracker,
+                "drafts": dict(self.drafts),
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+def run_research(job: Job, graph, thread, feedback=None, resume: bool = False):
+    """Run the interviews and report for an approved team; returns the final report.
+
+    With ``resume`` the run continues from its last checkpoint without new feedback.
+    Progress comes from the graph's task events; set ``RESEARCH_PROGRESS_LOG`` to a file
+    to also append them there as JSONL.
+    """
+    if not resume:
+        graph.update_state(thread, {"human_analyst_feedback": feedback}, as_node="human_feedback")
+    job.set_progress("Conducting comprehensive multi-agent research...")
+    job.tracker = ProgressTracker(run_id=thread["configurable"]["thread_id"],
+                                  log_path=os.getenv("RESEARCH_PROGRESS_LOG"))
+
+    try:
+        for namespace, mode, event in stream_graph(graph, None, thread, subgraphs=True,
+                                                   stream_mode=["updates", "messages", PROGRESS_STREAM_MODE]):
+            if mode == PROGRESS_STREAM_MODE:
+                job.tracker.feed(namespace, event)
+            elif namespace:
+                # Interview internals only feed the tracker
+                continue
+            elif mode == "messages":
+                # Stream report tokens into the preview as they are generated
+                chunk, metadata = event
+                job.add_token(metadata.get("langgraph_node"), chunk)
+            else:
+                node_name = next(iter(event.keys()))
+                if node_name in job.drafts and event[node_name]:
+                    # Show the complete section (cached responses produce no tokens)
+                    job.set_draft(node_name, next(iter(event[node_name].values())))
+    finally:
+        job.tracker.close()
+
+    report = graph.get_state(thread).values.get("final_report")
+    if report and graph.checkpointer is not None:
+        # A finished run is never resumed; the session may be gone before it collects the report
+        graph.checkpointer.delete_thread(thread["configurable"]["thread_id"])
+    return report
+
+
+class JobExecutor:
+    """Fixed pool of research workers with admission control.
+
+    At most ``workers`` jobs run at once and at most ``max_queued`` more wait for a
+    worker. Finished jobs stay available to ``get`` for ``retention`` seconds so a
+    refreshed page can still collect its report.
+    """
+
+    def __init__(self, workers: int = 4, max_queued: int = 16, retention: float = 3600):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job, fn, args, kwargs):
+        with job._lock:
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            with job._lock:
+                job.error = e
+                job.finished = time.time()
+                job.status = FAILED
+        else:
+            with job._lock:
+                job.result = result
+                job.finished = time.time()
+                job.status = DONE
+
+    def submit(self, fn, *args, topic: str = "", **kwargs) -> Job:
+        """Queue ``fn(job, *args, **kwargs)``; raises QueueFullError when at capacity"""
+        with self._lock:
+            self._prune()
+            active = sum(1 for job in self._jobs.values() if not job.done)
+            if active >= self.workers + self.max_queued:
+                raise QueueFullError(f"{active} research runs already running or queued")
+            job = Job(uuid.uuid4().hex[:12], topic)
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {
+            "running": statuses.count(RUNNING),
+            "queued": statuses.count(QUEUED),
+            "capacity": self.workers + self.max_queued,
+        }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    """Process-wide executor sized by ``RESEARCH_JOB_WORKERS`` and ``RESEARCH_JOB_QUEUE``"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor(
+                workers=int(os.getenv("RESEARCH_JOB_WORKERS", "4")),
+                max_queued=int(os.getenv("RESEARCH_JOB_QUEUE", "16")),
+            )
+        return _executor
@@ -0,0 +1,388 @@
+"""Content-addressed response cache for the chat model calls made by the research graph.
+
+Every node in the research graph talks to Claude through either ``llm.invoke`` or
+``llm.with_structured_output(Schema).invoke``. ``CachedChatModel`` wraps the chat model
+and replays earlier responses when the model name, temperature, structured output schema
+and message list are identical to a previous call.
+
+The default cache is tiered: a small in-memory LRU sits in front of a SQLite file that
+survives restarts. Entries are evicted by age and by the total size of the disk tier.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "research_ai", "llm_cache.sqlite3")
+
+# Seconds between sweeps for expired rows
+PRUNE_INTERVAL = 3600
+# A sweep over the size limit evicts down to this fraction of it, so that a full cache
+# is not swept again on every write
+PRUNE_TARGET = 0.9
+
+
+def _model_name(llm) -> str:
+    """Best effort model identifier for a chat model"""
+    for attr in ("model", "model_name", "model_id"):
+        value = getattr(llm, attr, None)
+        if value:
+            return str(value)
+    return type(llm).__name__
+
+
+def _schema_id(schema) -> str:
+    """Identify a structured output schema by name and JSON schema"""
+    if schema is None:
+        return ""
+    if hasattr(schema, "model_json_schema"):
+        return schema.__name__ + ":" + json.dumps(schema.model_json_schema(), sort_keys=True)
+    return json.dumps(schema, sort_keys=True, default=str)
+
+
+def _message_key(message) -> dict:
+    # Graph state gives every message a random id, which is never part of the prompt
+    data = message_to_dict(message)
+    return {"type": data["type"], "data": {k: v for k, v in data["data"].items() if k != "id"}}
+
+
+def make_cache_key(model: str, temperature, schema, messages) -> str:
+    """Hash the model, temperature, schema and message list into a cache key"""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "schema": _schema_id(schema),
+        "messages": [_message_key(m) for m in messages],
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Interface for response caches used by CachedChatModel.
+
+    Values are JSON serializable. Subclasses implement ``get`` and ``put``.
+    """
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def put(self, key: str, value) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def _record(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-memory LRU cache with optional maximum entry age"""
+
+    def __init__(self, max_entries: int = 256, max_age: float = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if self.max_age is not None and time.time() - created > self.max_age:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value, created: float = None):
+        with self._lock:
+            self._entries[key] = (created or time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str):
+        value = self._lookup(key)
+        self._record(value is not None)
+        return value
+
+    def put(self, key: str, value) -> None:
+        self._store(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredResponseCache(ResponseCache):
+    """In-memory LRU tier in front of a SQLite tier.
+
+    The disk tier is pruned by age (``max_age`` seconds) and by total payload size
+    (``max_bytes``), dropping the least recently used rows first. Writes keep a running
+    total of the payload size, so only a write that crosses the limit, or the first write
+    after ``PRUNE_INTERVAL``, pays for a sweep.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_memory_entries: int = 256,
+                 max_age: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        super().__init__()
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.memory = MemoryResponseCache(max_entries=max_memory_entries, max_age=max_age)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._pruned = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.prune()
+
+    def get(self, key: str):
+        value = self.memory._lookup(key)
+        if value is not None:
+            with self._stats_lock:
+                self.memory_hits += 1
+            self._record(True)
+            return value
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.max_age is not None and now - row[1] > self.max_age:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._disk_bytes -= row[2]
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+
+        if row is None:
+            self._record(False)
+            return None
+
+        value = json.loads(row[0])
+        self.memory._store(key, value, created=row[1])
+        with self._stats_lock:
+            self.disk_hits += 1
+        self._record(True)
+        return value
+
+    def put(self, key: str, value) -> None:
+        blob = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._conn.commit()
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            full = self.max_bytes is not None and self._disk_bytes > self.max_bytes
+        self.memory._store(key, value, created=now)
+        if full or now - self._pruned > PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> None:
+        """Evict expired rows, then least recently used rows above the size limit"""
+        with self._lock:
+            self._pruned = time.time()
+            if self.max_age is not None:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (self._pruned - self.max_age,))
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if self.max_bytes is not None and total > self.max_bytes:
+                excess = total - int(self.max_bytes * PRUNE_TARGET)
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM responses ORDER BY accessed ASC"
+                ).fetchall():
+                    if excess <= 0:
+                        break
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    excess -= size
+                    total -= size
+            self._conn.commit()
+            self._disk_bytes = total
+
+    def clear(self) -> None:
+        self.memory.clear()
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        stats.update({
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "memory_entries": len(self.memory),
+            "disk_entries": entries,
+            "disk_bytes": size,
+        })
+        return stats
+
+
+class _CachedStructuredModel:
+    """Structured output runnable that consults the response cache first"""
+
+    def __init__(self, parent: "CachedChatModel", schema, **kwargs):
+        self.parent = parent
+        self.schema = schema
+        self.kwargs = kwargs
+        self._runnable = None
+
+    @property
+    def runnable(self):
+        # Only build the provider's structured output wrapper on a cache miss
+        if self._runnable is None:
+            self._runnable = self.parent.llm.with_structured_output(self.schema, **self.kwargs)
+        return self._runnable
+
+    def invoke(self, messages, config=None, **kwargs):
+        key = self.parent._key(self.schema, messages)
+        if key is not None:
+            cached = self.parent.cache.get(key)
+            if cached is not None:
+                return self.schema.model_validate(cached)
+
+        result = self.runnable.invoke(messages, config, **kwargs)
+        if key is not None and result is not None:
+            self.parent.cache.put(key, result.model_dump())
+        return result
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        key = self.parent._key(self.schema, messages)
+        if key is not None:
+            cached = self.parent.cache.get(key)
+            if cached is not None:
+                return self.schema.model_validate(cached)
+
+        result = await self.runnable.ainvoke(messages, config, **kwargs)
+        if key is not None and result is not None:
+            self.parent.cache.put(key, result.model_dump())
+        return result
+
+
+class CachedChatModel:
+    """Wrap a chat model so ``invoke`` and ``with_structured_output`` go through a cache.
+
+    Only deterministic calls (``temperature == 0``) are cached unless
+    ``cache_nondeterministic`` is set. Anything else is delegated to the wrapped model.
+    """
+
+    def __init__(self, llm, cache: ResponseCache, cache_nondeterministic: bool = False):
+        self.llm = llm
+        self.cache = cache
+        self.cache_nondeterministic = cache_nondeterministic
+        self.model_name = _model_name(llm)
+        self.temperature = getattr(llm, "temperature", None)
+
+    def _key(self, schema, messages):
+        if self.cache is None:
+            return None
+        if not self.cache_nondeterministic and self.temperature not in (0, 0.0):
+            return None
+        return make_cache_key(self.model_name, self.temperature, schema, messages)
+
+    def invoke(self, messages, config=None, **kwargs):
+        key = self._key(None, messages)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return messages_from_dict([cached])[0]
+
+        response = self.llm.invoke(messages, config, **kwargs)
+        if key is not None:
+            self.cache.put(key, message_to_dict(response))
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        key = self._key(None, messages)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return messages_from_dict([cached])[0]
+
+        response = await self.llm.ainvoke(messages, config, **kwargs)
+        if key is not None:
+            self.cache.put(key, message_to_dict(response))
+        return response
+
+    def with_structured_output(self, schema, **kwargs):
+        return _CachedStructuredModel(self, schema, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide response cache, or None when disabled.
+
+    Configured with ``RESEARCH_LLM_CACHE`` (set to ``0`` to disable),
+    ``RESEARCH_LLM_CACHE_PATH``, ``RESEARCH_LLM_CACHE_MAX_AGE`` (seconds) and
+    ``RESEARCH_LLM_CACHE_MAX_MB``.
+    """
+    global _llm_cache
+    if os.getenv("RESEARCH_LLM_CACHE", "1") == "0":
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = TieredResponseCache(
+                path=os.getenv("RESEARCH_LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_age=float(os.getenv("RESEARCH_LLM_CACHE_MAX_AGE", 7 * 24 * 3600)),
+                max_bytes=int(float(os.getenv("RESEARCH_LLM_CACHE_MAX_MB", 256)) * 1024 * 1024),
+            )
+        return _llm_cache
@@ -0,0 +1,213 @@
+"""Content-addressed cache for rendered report PDFs.
+
+Rendering a report to PDF takes up to seconds with WeasyPrint. The app used to render
+every report in the chat on every Streamlit rerun. PDFs are now rendered only when a
+download is requested. They are stored under a hash of the renderer, topic and report
+content, so each report is rendered once and later downloads, sessions and restarts
+reuse the bytes. A small in-memory LRU, bounded by size, sits in front of a SQLite tier
+that is pruned by total size.
+
+When a render falls back to another renderer than the expected one, the PDF is stored
+under a fallback key for the expected renderer, so later downloads of the same report
+reuse it instead of rendering again.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "research_ai", "pdf_cache.sqlite3")
+
+# Bump when the PDF layout changes so stale renders are not served
+RENDER_VERSION = 4
+# Pruning evicts down to this fraction of the size limit, so that a full cache is not
+# pruned again on every write
+PRUNE_TARGET = 0.9
+
+
+def make_pdf_key(content: str, topic: str, renderer: str, fallback: bool = False) -> str:
+    """Stable key for one report rendered by one renderer.
+
+    With ``fallback`` the key is for a PDF rendered by another renderer after
+    ``renderer`` failed.
+    """
+    payload = "\0".join([str(RENDER_VERSION), renderer + (":fallback" if fallback else ""), topic or "",
+                         content or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Memory tier of at most ``max_memory_bytes`` in front of a SQLite tier of ``max_bytes``"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_memory_bytes: int = 32 * 1024 * 1024,
+                 max_bytes: int = 512 * 1024 * 1024):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._rendering = {}
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdfs ("
+            "key TEXT PRIMARY KEY, pdf BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self.prune()
+
+    def _remember(self, key: str, pdf: bytes):
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= len(self._memory.pop(key))
+            if len(pdf) > self.max_memory_bytes:
+                return
+            self._memory[key] = pdf
+            self._memory_bytes += len(pdf)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, key: str):
+        """Cached PDF bytes for ``key``, or None"""
+        with self._lock:
+            pdf = self._memory.get(key)
+            if pdf is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return pdf
+
+        with self._db_lock:
+            row = self._conn.execute("SELECT pdf FROM pdfs WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE pdfs SET accessed = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        if row is None:
+            return None
+        pdf = bytes(row[0])
+        self._remember(key, pdf)
+        with self._lock:
+            self.disk_hits += 1
+        return pdf
+
+    def put(self, key: str, pdf: bytes) -> None:
+        with self._db_lock:
+            old = self._conn.execute("SELECT size FROM pdfs WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO pdfs (key, pdf, size, accessed) VALUES (?, ?, ?, ?)",
+                               (key, sqlite3.Binary(pdf), len(pdf), time.time()))
+            self._conn.commit()
+            # A running total, so that writes below the limit do not scan the table
+            self._disk_bytes += len(pdf) - (old[0] if old else 0)
+            full = self._disk_bytes > self.max_bytes
+        self._remember(key, pdf)
+        if full:
+            self.prune()
+
+    def get_or_render(self, content: str, topic: str, renderer: str, render) -> bytes:
+        """Return the cached PDF, calling ``render()`` at most once per key across threads.
+
+        ``renderer`` is the renderer expected to be used. ``render()`` returns
+        ``(pdf, renderer used)``. A PDF from another renderer is stored under the
+        expected renderer's fallback key, which is looked up before rendering, so it is
+        reused without ever being stored as the expected renderer's output.
+        """
+        key = make_pdf_key(content, topic, renderer)
+        fallback_key = make_pdf_key(content, topic, renderer, fallback=True)
+        pdf = self.get(key) or self.get(fallback_key)
+        if pdf is not None:
+            return pdf
+
+        with self._lock:
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Another download may have rendered it while we waited
+                pdf = self.get(key) or self.get(fallback_key)
+                if pdf is None:
+                    start = time.perf_counter()
+                    pdf, used = render()
+                    with self._lock:
+                        self.renders += 1
+                        self.render_seconds += time.perf_counter() - start
+                    self.put(key if used == renderer else fallback_key, pdf)
+        finally:
+            with self._lock:
+                self._rendering.pop(key, None)
+        return pdf
+
+    def prune(self) -> None:
+        """Evict least recently downloaded PDFs above the disk size limit"""
+        with self._db_lock:
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pdfs").fetchone()
+            if total > self.max_bytes:
+                excess = total - int(self.max_bytes * PRUNE_TARGET)
+                for key, size in self._conn.execute("SELECT key, size FROM pdfs ORDER BY accessed ASC").fetchall():
+                    if excess <= 0:
+                        break
+                    self._conn.execute("DELETE FROM pdfs WHERE key = ?", (key,))
+                    excess -= size
+                    total -= size
+                self._conn.commit()
+            self._disk_bytes = total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        with self._db_lock:
+            self._conn.execute("DELETE FROM pdfs")
+            self._conn.commit()
+            self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pdfs").fetchone()
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders,
+                "render_seconds": self.render_seconds,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": entries,
+                "disk_bytes": size,
+            }
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """Return the process-wide PDF cache, or None when disabled.
+
+    Configured with ``RESEARCH_PDF_CACHE`` (set to ``0`` to disable),
+    ``RESEARCH_PDF_CACHE_PATH``, ``RESEARCH_PDF_CACHE_MEMORY_MB`` and
+    ``RESEARCH_PDF_CACHE_MAX_MB``.
+    """
+    global _pdf_cache
+    if os.getenv("RESEARCH_PDF_CACHE", "1") == "0":
+        return None
+    with _pdf_cache_lock:
+        if _pdf_cache is None:
+            _pdf_cache = PdfCache(
+                path=os.getenv("RESEARCH_PDF_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_memory_bytes=int(float(os.getenv("RESEARCH_PDF_CACHE_MEMORY_MB", 32)) * 1024 * 1024),
+                max_bytes=int(float(os.getenv("RESEARCH_PDF_CACHE_MAX_MB", 512)) * 1024 * 1024),
+            )
+        return _pdf_cache
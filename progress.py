@@ -0,0 +1,178 @@
+"""Progress of a research run, derived from the graph's own task events.
+
+Stream the graph with ``stream_mode=[..., PROGRESS_STREAM_MODE]`` and ``subgraphs=True``
+and hand every task event to ``ProgressTracker.feed``. The tracker follows each
+interview through its namespace (``conduct_interview:<task id>``). It counts the
+analyst's completed turns and times every node from its start event to its result, so
+nothing has to sleep or guess. The same events drive the UI (``snapshot``) and an
+optional JSONL log with one record per node start and end.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from typing import get_args
+
+from langgraph.types import StreamMode
+
+# "tasks" carries only task starts and results; older langgraph only has "debug"
+PROGRESS_STREAM_MODE = "tasks" if "tasks" in get_args(StreamMode) else "debug"
+
+INTERVIEW_NODE = "conduct_interview"
+
+# Stage text for the top-level nodes
+STAGE_MESSAGES = {
+    "conduct_interview": "Conducting expert interviews",
+    "write_report": "Synthesizing findings",
+    "write_introduction": "Crafting introduction",
+    "write_conclusion": "Writing conclusion",
+    "finalize_report": "Finalizing report",
+}
+
+# What an analyst is doing while each interview node runs
+INTERVIEW_ACTIVITY = {
+    "ask_question": "asking a question",
+    "plan_queries": "planning searches",
+    "search_web": "searching the web",
+    "search_wikipedia": "searching Wikipedia",
+    "answer_question": "getting an answer",
+    "save_interview": "saving the interview",
+    "write_section": "writing a section",
+}
+
+
+class ProgressTracker:
+    """Per-analyst turn counts and per-node timings for one run. Safe to read while fed."""
+
+    def __init__(self, run_id: str = "", log_path: str = None):
+        self.run_id = run_id
+        self.started = time.perf_counter()
+        self.analysts = {}
+        self.timings = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+        self._tasks = {}
+        self._running = defaultdict(int)
+        self._lock = threading.Lock()
+        self._log = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    def feed(self, namespace: tuple, event: dict):
+        """Consume one task event from the ``tasks`` or ``debug`` stream"""
+        if "payload" in event:
+            # debug events wrap the task payload; checkpoints carry nothing we need
+            if event.get("type") not in ("task", "task_result"):
+                return
+            event = event["payload"]
+        now = time.perf_counter()
+        with self._lock:
+            if "input" in event:
+                self._start(namespace, event, now)
+            elif event.get("id") in self._tasks:
+                self._finish(event, now)
+
+    def _interview(self, namespace: tuple):
+        # Interview nodes run in the namespace of the conduct_interview task that owns them
+        if namespace and namespace[0].startswith(INTERVIEW_NODE + ":"):
+            return self.analysts.get(namespace[0].split(":", 1)[1])
+        return None
+
+    def _start(self, namespace, event, now):
+        name = event["name"]
+        analyst = turn = None
+        interview = self._interview(namespace)
+        if not namespace:
+            self._running[name] += 1
+            if name == INTERVIEW_NODE:
+                analyst = event["input"]["analyst"].name
+                self.analysts[event["id"]] = {"name": analyst, "turns": 0, "node": "", "status": "running",
+                                              "started": now, "elapsed": 0.0}
+        elif interview is not None:
+            if name == "ask_question" and not event["input"].get("messages", [])[1:]:
+                # A retried interview starts over from the first question
+                interview["turns"] = 0
+                interview["status"] = "running"
+            interview["node"] = name
+            analyst = interview["name"]
+            turn = interview["turns"] + 1
+        self._tasks[event["id"]] = (namespace, name, now, analyst, turn)
+        self._write({"event": "start", "node": name, "analyst": analyst, "turn": turn, "t": now - self.started})
+
+    def _finish(self, event, now):
+        namespace, name, started, analyst, turn = self._tasks.pop(event["id"])
+        duration = now - started
+        timing = self.timings[name]
+        timing["count"] += 1
+        timing["total"] += duration
+        timing["max"] = max(timing["max"], duration)
+        if not namespace:
+            self._running[name] -= 1
+
+        error = event.get("error")
+        interview = self._interview(namespace)
+        if interview is not None:
+            if error:
+                interview["status"] = "retrying"
+            elif name == "answer_question":
+                interview["turns"] += 1
+        elif not namespace and name == INTERVIEW_NODE and event["id"] in self.analysts:
+            analyst_progress = self.analysts[event["id"]]
+            writes = event.get("result") or {}
+            if isinstance(writes, list):
+                writes = dict(writes)
+            analyst_progress["status"] = "failed" if error or writes.get("failed_analysts") else "done"
+            analyst_progress["elapsed"] = duration
+
+        record = {"event": "end", "node": name, "analyst": analyst, "turn": turn, "t": now - self.started,
+                  "duration": duration}
+        if error:
+            record["error"] = str(error)
+        self._write(record)
+
+    def _write(self, record: dict):
+        if self._log is None:
+            return
+        record = {"run": self.run_id, **{k: round(v, 4) if isinstance(v, float) else v for k, v in record.items()}}
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def stage(self) -> str:
+        """Text for the top-level node(s) currently running"""
+        running = [name for name, count in self._running.items() if count > 0 and name in STAGE_MESSAGES]
+        if INTERVIEW_NODE in running:
+            return STAGE_MESSAGES[INTERVIEW_NODE]
+        return ", ".join(STAGE_MESSAGES[name] for name in running)
+
+    def snapshot(self) -> dict:
+        """Stage, elapsed time, per-analyst progress and node timings"""
+        now = time.perf_counter()
+        with self._lock:
+            analysts = []
+            for analyst in self.analysts.values():
+                analyst = dict(analyst)
+                if analyst["status"] in ("running", "retrying"):
+                    analyst["elapsed"] = now - analyst["started"]
+                del analyst["started"]
+                analysts.append(analyst)
+            return {
+                "stage": self.stage(),
+                "elapsed": now - self.started,
+                "analysts": analysts,
+                "timings": {name: dict(timing) for name, timing in self.timings.items()},
+            }
+
+
+def describe_analyst(analyst: dict) -> str:
+    """One line of progress text for an analyst from ``ProgressTracker.snapshot``"""
+    if analyst["status"] == "done":
+        return f"{analyst['name']}: done after {analyst['turns']} turns ({analyst['elapsed']:.0f}s)"
+    if analyst["status"] == "failed":
+        return f"{analyst['name']}: interview failed ({analyst['elapsed']:.0f}s)"
+    activity = INTERVIEW_ACTIVITY.get(analyst["node"], "starting")
+    if analyst["status"] == "retrying":
+        activity = "retrying after an error"
+    elif analyst["node"] in ("save_interview", "write_section"):
+        return f"{analyst['name']}: {activity} after {analyst['turns']} turns ({analyst['elapsed']:.0f}s)"
+    return f"{analyst['name']}: turn {analyst['turns'] + 1}, {activity} ({analyst['elapsed']:.0f}s)"
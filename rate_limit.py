@@ -0,0 +1,389 @@
+"""Process-wide rate limiting and retries for Anthropic and Tavily calls.
+
+Every Streamlit session and interview branch in the process shares one ``ProviderLimiter``
+per provider. Each limiter holds a requests/minute bucket and an optional tokens/minute
+bucket, serves interactive calls (team generation) ahead of background ones (interview
+turns), and backs off adaptively when the provider answers 429 anyway.
+
+``call_with_retry`` / ``acall_with_retry`` wrap a call with the limiter and retry
+rate-limit, overload and timeout errors with jittered exponential backoff, honoring
+``Retry-After``. When retries run out they raise ``RateLimitError`` if the provider was
+still answering 429, and ``RetriesExhaustedError`` for other failures. They are the only
+retry layer: the shared Anthropic client is created with
+``max_retries=0``, so a call is attempted at most ``RESEARCH_MAX_RETRIES + 1`` times.
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import random
+import threading
+import time
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority = contextvars.ContextVar("rate_limit_priority", default=BACKGROUND)
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """Run the calls made inside the block at the given priority"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+class RetriesExhaustedError(Exception):
+    """Raised when a provider keeps failing with retryable errors after all retries"""
+
+    problem = "still failing"
+
+    def __init__(self, provider: str, attempts: int, cause: Exception):
+        super().__init__(f"{provider} {self.problem} after {attempts} attempts: {cause}")
+        self.provider = provider
+        self.attempts = attempts
+        self.cause = cause
+
+
+class RateLimitError(RetriesExhaustedError):
+    """Raised when a provider keeps rate limiting after all retries"""
+
+    problem = "rate limit still exceeded"
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute`` tokens per minute"""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.per_minute = per_minute
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, scale: float = 1.0):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_minute * scale / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, scale: float = 1.0) -> float:
+        """Seconds until ``amount`` tokens are available (0 when they are now)"""
+        # A single request larger than the bucket is allowed once the bucket is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) * 60.0 / (self.per_minute * scale)
+
+
+class ProviderLimiter:
+    """Requests/minute and tokens/minute limits for one provider, shared process-wide"""
+
+    # Adaptive scaling: halve the rate on a 429, recover a little on every success
+    MIN_SCALE = 0.1
+    RECOVERY_STEP = 0.05
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = None):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.scale = 1.0
+        self._lock = threading.Lock()
+        self._waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+
+        # Metrics
+        self.acquired = 0
+        self.throttled = 0
+        self.retries = 0
+        self.wait_total = {INTERACTIVE: 0.0, BACKGROUND: 0.0}
+        self.wait_max = {INTERACTIVE: 0.0, BACKGROUND: 0.0}
+        self.wait_count = {INTERACTIVE: 0, BACKGROUND: 0}
+
+    def _try_acquire(self, level: int, tokens: float) -> float:
+        """Take capacity and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            # Lower priority callers yield while a higher priority caller is queued
+            if any(self._waiting[p] for p in self._waiting if p < level):
+                return self.POLL_INTERVAL
+
+            self.requests.refill(self.scale)
+            wait = self.requests.wait_time(1, self.scale)
+            if self.tokens is not None and tokens:
+                self.tokens.refill(self.scale)
+                wait = max(wait, self.tokens.wait_time(tokens, self.scale))
+            if wait > 0:
+                return wait
+
+            self.requests.tokens -= 1
+            if self.tokens is not None and tokens:
+                self.tokens.tokens -= min(tokens, self.tokens.capacity)
+            self.acquired += 1
+            return 0.0
+
+    def _enter(self, level: int):
+        with self._lock:
+            self._waiting[level] += 1
+
+    def _exit(self, level: int, waited: float):
+        with self._lock:
+            self._waiting[level] -= 1
+            self.wait_total[level] += waited
+            self.wait_count[level] += 1
+            self.wait_max[level] = max(self.wait_max[level], waited)
+
+    def acquire(self, tokens: float = 0, level: int = None):
+        """Block until a request (and ``tokens`` tokens) may be sent"""
+        level = current_priority() if level is None else level
+        start = time.monotonic()
+        self._enter(level)
+        try:
+            while True:
+                wait = self._try_acquire(level, tokens)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, self.POLL_INTERVAL))
+        finally:
+            self._exit(level, time.monotonic() - start)
+
+    async def aacquire(self, tokens: float = 0, level: int = None):
+        """Async ``acquire`` that sleeps on the event loop instead of blocking a thread"""
+        level = current_priority() if level is None else level
+        start = time.monotonic()
+        self._enter(level)
+        try:
+            while True:
+                wait = self._try_acquire(level, tokens)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, self.POLL_INTERVAL))
+        finally:
+            self._exit(level, time.monotonic() - start)
+
+    def record_usage(self, extra_tokens: float):
+        """Debit (or refund) the difference between estimated and actual token usage"""
+        if self.tokens is None or not extra_tokens:
+            return
+        with self._lock:
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens - extra_tokens)
+
+    def record_throttled(self):
+        with self._lock:
+            self.throttled += 1
+            self.scale = max(self.MIN_SCALE, self.scale / 2)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_success(self):
+        with self._lock:
+            self.scale = min(1.0, self.scale + self.RECOVERY_STEP)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "provider": self.name,
+                "queue_depth": sum(self._waiting.values()),
+                "queued": {PRIORITY_NAMES[p]: n for p, n in self._waiting.items()},
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "rate_scale": self.scale,
+                "avg_wait": {
+                    PRIORITY_NAMES[p]: (self.wait_total[p] / self.wait_count[p]) if self.wait_count[p] else 0.0
+                    for p in self.wait_total
+                },
+                "max_wait": {PRIORITY_NAMES[p]: w for p, w in self.wait_max.items()},
+            }
+
+
+def _status_code(error: Exception):
+    for obj in (error, getattr(error, "response", None)):
+        code = getattr(obj, "status_code", None) or getattr(obj, "status", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limit, overload and transient timeout errors are worth retrying"""
+    code = _status_code(error)
+    if code in (408, 429, 500, 502, 503, 504, 529):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in ("rate limit", "rate_limit", "429", "overloaded", "timed out", "timeout"))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    code = _status_code(error)
+    return code == 429 or "rate limit" in str(error).lower() or "rate_limit" in str(error).lower()
+
+
+def retry_after(error: Exception):
+    """Seconds requested by a ``Retry-After`` (or ``retry-after-ms``) header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers.get("retry-after-ms")) / 1000.0
+        if headers.get("retry-after") is not None:
+            return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def backoff_delay(attempt: int, error: Exception, base: float = 1.0, cap: float = 60.0) -> float:
+    """Jittered exponential backoff that never undercuts the server's Retry-After"""
+    delay = min(cap, base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+    requested = retry_after(error)
+    if requested is not None:
+        delay = max(delay, requested)
+    return delay
+
+
+DEFAULT_MAX_RETRIES = int(os.getenv("RESEARCH_MAX_RETRIES", "5"))
+
+
+def _exhausted(limiter: ProviderLimiter, attempts: int, error: Exception) -> RetriesExhaustedError:
+    if is_rate_limited(error):
+        return RateLimitError(limiter.name, attempts, error)
+    return RetriesExhaustedError(limiter.name, attempts, error)
+
+
+def call_with_retry(limiter: ProviderLimiter, fn, tokens: float = 0, max_retries: int = None):
+    """Call ``fn()`` under ``limiter``, retrying retryable errors with backoff"""
+    max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        limiter.acquire(tokens)
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if is_rate_limited(e):
+                limiter.record_throttled()
+            if attempt == max_retries:
+                raise _exhausted(limiter, attempt + 1, e) from e
+            limiter.record_retry()
+            time.sleep(backoff_delay(attempt, e))
+        else:
+            limiter.record_success()
+            return result
+
+
+async def acall_with_retry(limiter: ProviderLimiter, afn, tokens: float = 0, max_retries: int = None):
+    """Async ``call_with_retry`` for a coroutine factory ``afn``"""
+    max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        await limiter.aacquire(tokens)
+        try:
+            result = await afn()
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            if is_rate_limited(e):
+                limiter.record_throttled()
+            if attempt == max_retries:
+                raise _exhausted(limiter, attempt + 1, e) from e
+            limiter.record_retry()
+            await asyncio.sleep(backoff_delay(attempt, e))
+        else:
+            limiter.record_success()
+            return result
+
+
+def estimate_tokens(messages) -> int:
+    """Rough input token estimate (about four characters per token)"""
+    return sum(len(str(getattr(m, "content", m))) for m in messages) // 4
+
+
+def _actual_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    return None
+
+
+class _RateLimitedStructuredModel:
+    def __init__(self, parent: "RateLimitedChatModel", runnable):
+        self.parent = parent
+        self.runnable = runnable
+
+    def invoke(self, messages, config=None, **kwargs):
+        tokens = estimate_tokens(messages)
+        return call_with_retry(self.parent.limiter, lambda: self.runnable.invoke(messages, config, **kwargs), tokens)
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        tokens = estimate_tokens(messages)
+        return await acall_with_retry(self.parent.limiter, lambda: self.runnable.ainvoke(messages, config, **kwargs), tokens)
+
+
+class RateLimitedChatModel:
+    """Chat model wrapper that sends every call through a ProviderLimiter"""
+
+    def __init__(self, llm, limiter: ProviderLimiter):
+        self.llm = llm
+        self.limiter = limiter
+
+    def invoke(self, messages, config=None, **kwargs):
+        tokens = estimate_tokens(messages)
+        response = call_with_retry(self.limiter, lambda: self.llm.invoke(messages, config, **kwargs), tokens)
+        actual = _actual_tokens(response)
+        if actual is not None:
+            self.limiter.record_usage(actual - tokens)
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        tokens = estimate_tokens(messages)
+        response = await acall_with_retry(self.limiter, lambda: self.llm.ainvoke(messages, config, **kwargs), tokens)
+        actual = _actual_tokens(response)
+        if actual is not None:
+            self.limiter.record_usage(actual - tokens)
+        return response
+
+    def with_structured_output(self, schema, **kwargs):
+        return _RateLimitedStructuredModel(self, self.llm.with_structured_output(schema, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+# Process-wide limiters, configured from the environment
+PROVIDER_DEFAULTS = {
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 80000},
+    "tavily": {"requests_per_minute": 100, "tokens_per_minute": None},
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """Return the limiter shared by every session for ``provider``.
+
+    Limits come from ``RESEARCH_<PROVIDER>_RPM`` and ``RESEARCH_<PROVIDER>_TPM``.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            defaults = PROVIDER_DEFAULTS.get(provider, {"requests_per_minute": 60, "tokens_per_minute": None})
+            rpm = float(os.getenv(f"RESEARCH_{provider.upper()}_RPM", defaults["requests_per_minute"]))
+            tpm = os.getenv(f"RESEARCH_{provider.upper()}_TPM", defaults["tokens_per_minute"])
+            limiter = _limiters[provider] = ProviderLimiter(provider, rpm, float(tpm) if tpm else None)
+        return limiter
+
+
+def limiter_stats() -> list:
+    """Queue depth and wait-time metrics for every provider limiter"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
@@ -0,0 +1,136 @@
+"""Parse a report's Markdown once into blocks shared by every PDF renderer.
+
+``parse_report`` walks the report in a single pass and returns its headings, paragraphs,
+lists and ``[n] url`` citation lines. Block text is already in the small HTML subset
+(``<b>``, ``<i>``, ``<a href>``) that both WeasyPrint and ReportLab paragraphs understand:
+the report is HTML-escaped once, and Markdown links, bare URLs, bold and italics are
+converted by one combined regex. Lines without ``*`` or ``://``, most of a report, are
+copied through without running it. ``plain_text`` turns the blocks back into unformatted
+text for the last-resort PDF.
+"""
+import html
+import re
+from dataclasses import dataclass, field
+
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+LIST = "list"
+CITATION = "citation"
+
+_HEADING = re.compile(r"(#{1,6})\s+(.*)")
+_LIST_ITEM = re.compile(r"(?:[-*+]|(\d+)[.)])\s+(.*)")
+_CITATION = re.compile(r"\[\d+\]")
+# Footer the app appends under each report in the chat
+_FOOTER = re.compile(r"\*Research completed.*?\*", re.DOTALL)
+
+# Links, bare URLs, bold and italics, matched in one pass. Nothing spans a line. There
+# are no groups: a group at the start of an alternative stops the regex engine from
+# skipping ahead to the next "[", "h" or "*", which made scanning plain text 4x slower.
+_INLINE = re.compile(
+    r"\[[^\]\n]+\]\(https?://[^\s)]+\)"
+    r"|https?://[^\s<]*[^\s<.,;:)\]]"
+    r"|\*\*[^\n]+?\*\*"
+    r"|\*(?<![*\w]\*)(?![\s*])[^\n]+?(?<![\s*])\*(?![*\w])"
+)
+_TAG = re.compile(r'<a href="(?P<href>[^"]*)">(?P<label>.*?)</a>|<[^>]+>')
+
+
+@dataclass
+class Block:
+    kind: str
+    # Escaped text with inline tags
+    text: str = ""
+    # Heading level, 1 for "#"
+    level: int = 0
+    ordered: bool = False
+    items: list = field(default_factory=list)
+
+
+def _markup(match) -> str:
+    text = match.group()
+    first = text[0]
+    if first == "[":
+        label, _, href = text[1:-1].partition("](")
+        return f'<a href="{href}">{label}</a>'
+    if first == "h":
+        return f'<a href="{text}">{text}</a>'
+    bold = text[1] == "*"
+    inner = text[2:-2] if bold else text[1:-1]
+    if "*" in inner or "http" in inner:
+        inner = _INLINE.sub(_markup, inner)
+    return f"<b>{inner}</b>" if bold else f"<i>{inner}</i>"
+
+
+def parse_report(content: str) -> list:
+    """Blocks of a Markdown report, in order, from a single pass over its lines"""
+    content = _FOOTER.sub("", html.unescape(content or ""))
+    blocks = []
+    paragraph = []
+    current_list = None
+
+    for raw in html.escape(content, quote=False).split("\n"):
+        line = raw.strip()
+        if not line or line == "---":
+            if paragraph:
+                blocks.append(Block(PARAGRAPH, " ".join(paragraph)))
+                paragraph = []
+            current_list = None
+            continue
+        # Lines without markup, most of a report, skip the regex
+        if "*" in line or "://" in line:
+            line = _INLINE.sub(_markup, line)
+
+        first = line[0]
+        if first == "#" and (heading := _HEADING.match(line)):
+            kind = HEADING
+        elif first == "[" and _CITATION.match(line):
+            kind = CITATION
+        elif (first in "-*+" or first.isdigit()) and (item := _LIST_ITEM.match(line)):
+            kind = LIST
+        elif current_list is not None and raw[0] in " \t":
+            # Indented continuation of the previous list item
+            current_list.items[-1] += " " + line
+            continue
+        else:
+            current_list = None
+            paragraph.append(line)
+            continue
+
+        if paragraph:
+            blocks.append(Block(PARAGRAPH, " ".join(paragraph)))
+            paragraph = []
+        if kind == LIST:
+            ordered = item.group(1) is not None
+            if current_list is None or current_list.ordered != ordered:
+                current_list = Block(LIST, ordered=ordered)
+                blocks.append(current_list)
+            current_list.items.append(item.group(2))
+            continue
+        current_list = None
+        if kind == HEADING:
+            blocks.append(Block(HEADING, heading.group(2).strip(), level=len(heading.group(1))))
+        else:
+            blocks.append(Block(CITATION, line))
+
+    if paragraph:
+        blocks.append(Block(PARAGRAPH, " ".join(paragraph)))
+    return blocks
+
+
+def _plain(match) -> str:
+    href = match.group("href")
+    if href is None:
+        return ""
+    label = match.group("label")
+    return label if label == href else f"{label} ({href})"
+
+
+def plain_text(blocks: list) -> str:
+    """Unescaped text of the blocks without tags, one block or list item per line"""
+    lines = []
+    for block in blocks:
+        if block.kind == LIST:
+            lines.extend(f"{n}. {item}" if block.ordered else f"- {item}" for n, item in enumerate(block.items, 1))
+        else:
+            lines.append(block.text)
+    return html.unescape(_TAG.sub(_plain, "\n".join(lines)))
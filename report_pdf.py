@@ -0,0 +1,355 @@
+"""Report PDF rendering, in-process or on a pool of worker processes.
+
+WeasyPrint layout is CPU-bound and takes seconds for a long report, which held up the
+Streamlit script thread. ``render_pdf`` hands the work to a process pool (spawned, so
+workers never inherit the server's threads) and waits at most ``RESEARCH_PDF_TIMEOUT``
+seconds. Long reports are split at the ``---`` separators ``finalize_report`` inserts,
+and then at headings, into one part per worker; the parts are rendered in parallel and
+merged into a single PDF with pypdf. When a render fails or times out the report is
+rendered in-process with ReportLab instead.
+
+WeasyPrint, ReportLab and pypdf are imported on the first render, not with this module,
+so processes that never produce a PDF do not pay for them. Availability is detected
+from the installed packages without importing them.
+"""
+import html
+import importlib.util
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+from io import BytesIO
+
+from report_blocks import CITATION, HEADING, LIST, parse_report, plain_text
+
+
+def _installed(name: str) -> bool:
+    # Looks the package up without importing it
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+WEASYPRINT_AVAILABLE = _installed("weasyprint")
+REPORTLAB_AVAILABLE = _installed("reportlab")
+
+
+REPORT_CSS = """
+    body {
+        font-family: Arial, sans-serif;
+        line-height: 1.6;
+        margin: 40px;
+        color: #333;
+    }
+    h1 { color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+    h2 { color: #34495e; margin-top: 30px; }
+    h3 { color: #7f8c8d; }
+    p { margin-bottom: 15px; }
+    .sources { background: #f8f9fa; padding: 15px; border-left: 4px solid #3498db; }
+"""
+
+
+def report_html(content: str, topic: str, title: bool = True) -> str:
+    """Standalone HTML document for a report"""
+    topic = html.escape(topic or "")
+    parts = ['<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">',
+             f"<title>Research Report: {topic}</title>\n<style>{REPORT_CSS}</style>\n</head>\n<body>"]
+    if title:
+        parts.append(f"<h1>Research Report: {topic}</h1>")
+    for block in parse_report(content):
+        if block.kind == HEADING:
+            level = min(block.level, 3)
+            parts.append(f"<h{level}>{block.text}</h{level}>")
+        elif block.kind == LIST:
+            tag = "ol" if block.ordered else "ul"
+            parts.append(f"<{tag}>" + "".join(f"<li>{item}</li>" for item in block.items) + f"</{tag}>")
+        elif block.kind == CITATION:
+            parts.append(f'<p class="sources">{block.text}</p>')
+        else:
+            parts.append(f"<p>{block.text}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def report_flowables(content: str, topic: str, styles, title: bool = True) -> list:
+    """ReportLab story for a report"""
+    from reportlab.platypus import ListFlowable, ListItem, Paragraph, Spacer
+
+    story = []
+    if title:
+        story.append(Paragraph(f"Research Report: {html.escape(topic or '')}", styles['Title']))
+        story.append(Spacer(1, 20))
+    blocks = parse_report(content)
+    if not blocks:
+        story.append(Paragraph("No content available for this report.", styles['Normal']))
+    for block in blocks:
+        if block.kind == HEADING:
+            story.append(Paragraph(block.text, styles[f"Heading{min(block.level, 3)}"]))
+        elif block.kind == LIST:
+            story.append(ListFlowable(
+                [ListItem(Paragraph(item, styles['Normal'])) for item in block.items],
+                bulletType="1" if block.ordered else "bullet",
+            ))
+        else:
+            story.append(Paragraph(block.text, styles['Normal']))
+        story.append(Spacer(1, 6))
+    return story
+
+
+def generate_pdf_weasyprint(content: str, topic: str, title: bool = True) -> bytes:
+    """Generate PDF using WeasyPrint (HTML to PDF)"""
+    from weasyprint import HTML
+
+    try:
+        return HTML(string=report_html(content, topic, title)).write_pdf()
+    except Exception as e:
+        print(f"WeasyPrint PDF generation error: {e}")
+        raise e
+
+def generate_pdf_reportlab(content: str, topic: str, title: bool = True) -> bytes:
+    """Generate PDF using ReportLab (fallback)"""
+    try:
+        if not REPORTLAB_AVAILABLE:
+            raise Exception("ReportLab not available")
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import SimpleDocTemplate
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72,
+                               topMargin=72, bottomMargin=18)
+        doc.build(report_flowables(content, topic, getSampleStyleSheet(), title))
+        return buffer.getvalue()
+        
+    except Exception as e:
+        print(f"ReportLab PDF generation error: {e}")
+        raise e
+
+def generate_pdf(content: str, topic: str, title: bool = True) -> bytes:
+    """Generate PDF - try WeasyPrint first, fallback to ReportLab"""
+    return generate_pdf_with_renderer(content, topic, title)[0]
+
+def generate_pdf_with_renderer(content: str, topic: str, title: bool = True) -> tuple:
+    """``generate_pdf`` that also returns the name of the renderer that produced the PDF"""
+    global WEASYPRINT_AVAILABLE
+    try:
+        if WEASYPRINT_AVAILABLE:
+            try:
+                return generate_pdf_weasyprint(content, topic, title), "weasyprint"
+            except (ImportError, OSError) as e:
+                # Installed but unusable, typically missing Pango libraries; stop trying it
+                print(f"WeasyPrint unavailable, falling back to ReportLab: {e}")
+                WEASYPRINT_AVAILABLE = False
+        if REPORTLAB_AVAILABLE:
+            return generate_pdf_reportlab(content, topic, title), "reportlab"
+        # Simple text-based PDF as last resort
+        return create_simple_text_pdf(content, topic), "text"
+    except Exception as e:
+        print(f"All PDF generation methods failed: {e}")
+        return create_simple_text_pdf(content, topic), "text"
+
+def pdf_renderer() -> str:
+    """Name of the renderer generate_pdf is expected to use, for looking up cached PDFs"""
+    if WEASYPRINT_AVAILABLE:
+        return "weasyprint"
+    if REPORTLAB_AVAILABLE:
+        return "reportlab"
+    return "text"
+
+def note_renderer(renderer: str) -> None:
+    """Learn from a worker's result that WeasyPrint is unusable in this installation.
+
+    Workers switch to ReportLab only when WeasyPrint cannot load; without this the
+    parent would keep expecting WeasyPrint output.
+    """
+    global WEASYPRINT_AVAILABLE
+    if WEASYPRINT_AVAILABLE and "reportlab" in renderer.split("+"):
+        WEASYPRINT_AVAILABLE = False
+
+def create_simple_text_pdf(content: str, topic: str) -> bytes:
+    """Create a simple text-based PDF as last resort"""
+    try:
+        # Use a simple approach to create minimal PDF
+        if REPORTLAB_AVAILABLE:
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.styles import getSampleStyleSheet
+            from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+            buffer = BytesIO()
+            doc = SimpleDocTemplate(buffer, pagesize=letter)
+            styles = getSampleStyleSheet()
+            story = [
+                Paragraph(f"Research Report: {html.escape(topic or '')}", styles['Title']),
+                Spacer(1, 20),
+                Paragraph("Content preview - full formatting not available", styles['Normal']),
+                Spacer(1, 10)
+            ]
+            
+            # Add basic content
+            text = plain_text(parse_report(content))
+            if text:
+                story.append(Paragraph(html.escape(text[:1000]).replace("\n", "<br/>") + "...", styles['Normal']))
+            
+            doc.build(story)
+            buffer.seek(0)
+            return buffer.getvalue()
+        else:
+            # Return minimal PDF bytes if nothing else works
+            return b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n2 0 obj\n<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n3 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>\nendobj\nxref\n0 4\n0000000000 65535 f \n0000000009 00000 n \n0000000058 00000 n \n0000000115 00000 n \ntrailer\n<< /Size 4 /Root 1 0 R >>\nstartxref\n181\n%%EOF"
+    except:
+        # Return absolute minimal PDF if everything fails
+        return b"%PDF-1.4\n1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\nxref\n0 2\ntrailer\n<< /Size 2 /Root 1 0 R >>\nstartxref\n0\n%%EOF"
+
+
+# Parallel rendering
+
+PDF_MERGE_AVAILABLE = _installed("pypdf")
+
+PDF_TIMEOUT = float(os.getenv("RESEARCH_PDF_TIMEOUT", "60"))
+# Shorter reports are rendered in one piece
+PARALLEL_MIN_CHARS = int(os.getenv("RESEARCH_PDF_PARALLEL_CHARS", "40000"))
+
+
+class PdfRenderError(RuntimeError):
+    """The worker pool could not render a report in time"""
+
+
+def split_report(content: str, parts: int) -> list:
+    """Split a report into at most ``parts`` contiguous pieces of similar size.
+
+    Pieces only break at the ``---`` separators between introduction, body and
+    conclusion, or before a heading.
+    """
+    blocks = []
+    for section in re.split(r"\n\s*---\s*\n", content):
+        blocks.extend(block for block in re.split(r"\n(?=#{1,3} )", section) if block.strip())
+    target = len(content) / max(parts, 1)
+    pieces, current, size = [], [], 0
+    for block in blocks:
+        if current and size + len(block) > target and len(pieces) < parts - 1:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        current.append(block)
+        size += len(block)
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def merge_pdfs(parts: list) -> bytes:
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part))
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _render_part(content: str, topic: str, title: bool) -> tuple:
+    # Runs in a worker process; imports this module, never the Streamlit app
+    return generate_pdf_with_renderer(content, topic, title)
+
+
+class PdfRenderPool:
+    """Worker processes for PDF rendering, started on first use"""
+
+    def __init__(self, workers: int = None, timeout: float = PDF_TIMEOUT, parallel_min_chars: int = PARALLEL_MIN_CHARS):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.parallel_min_chars = parallel_min_chars
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _reset(self):
+        # A timed-out or crashed worker may still be busy; start over with fresh processes
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        # shutdown() does not stop a worker stuck in a render, so stop the processes too
+        processes = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(5)
+
+    def render(self, content: str, topic: str) -> bytes:
+        """Render in the pool, in parallel pieces for long reports; raises PdfRenderError"""
+        return self.render_with_renderer(content, topic)[0]
+
+    def render_with_renderer(self, content: str, topic: str) -> tuple:
+        """``render`` that also returns the renderer the workers used, "a+b" if pieces differ"""
+        pieces = [content]
+        if PDF_MERGE_AVAILABLE and self.workers > 1 and len(content) >= self.parallel_min_chars:
+            pieces = split_report(content, self.workers)
+        try:
+            executor = self._executor()
+            futures = [executor.submit(_render_part, piece, topic, index == 0) for index, piece in enumerate(pieces)]
+            done, pending = wait(futures, timeout=self.timeout)
+            if pending:
+                raise TimeoutError(f"PDF rendering took longer than {self.timeout:.0f}s")
+            results = [future.result() for future in futures]
+        except Exception as e:
+            self._reset()
+            raise PdfRenderError(str(e)) from e
+        parts = [pdf for pdf, _ in results]
+        renderer = "+".join(dict.fromkeys(name for _, name in results))
+        note_renderer(renderer)
+        return (parts[0] if len(parts) == 1 else merge_pdfs(parts)), renderer
+
+    def shutdown(self):
+        self._reset()
+
+
+def fallback_pdf(content: str, topic: str) -> bytes:
+    """In-process ReportLab rendering for when the pool fails"""
+    try:
+        return generate_pdf_reportlab(content, topic)
+    except Exception:
+        return create_simple_text_pdf(content, topic)
+
+
+def render_pdf(content: str, topic: str, fallback: bool = True) -> bytes:
+    """Render a report on the worker pool.
+
+    With ``fallback`` a failed or timed-out render is replaced by ``fallback_pdf``;
+    otherwise PdfRenderError is raised.
+    """
+    try:
+        return render_pdf_with_renderer(content, topic)[0]
+    except PdfRenderError as e:
+        if not fallback:
+            raise
+        print(f"PDF worker rendering failed, falling back to ReportLab: {e}")
+        return fallback_pdf(content, topic)
+
+
+def render_pdf_with_renderer(content: str, topic: str) -> tuple:
+    """(PDF, renderer used) from the worker pool; raises PdfRenderError"""
+    return get_pdf_pool().render_with_renderer(content, topic)
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def get_pdf_pool() -> PdfRenderPool:
+    """Process-wide render pool sized by ``RESEARCH_PDF_WORKERS`` (default: CPU count)"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            workers = os.getenv("RESEARCH_PDF_WORKERS")
+            _pdf_pool = PdfRenderPool(workers=int(workers) if workers else None)
+        return _pdf_pool
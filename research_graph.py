@@ -0,0 +1,949 @@
+"""Research automation graph from the notebook, independent of the Streamlit UI.
+
+``build_research_graph`` and ``build_analyst_feedback_graph`` take the chat model and
+search client explicitly so the same graphs can be driven from the app, from scripts and
+from benchmarks. With ``use_async=True`` every node awaits ``ainvoke``/``aload`` instead of
+blocking, and all model and search calls of every async run in the process share one
+limit on how many are in flight at once.
+"""
+import asyncio
+import collections
+import operator
+import os
+import threading
+import time
+from typing import List, Annotated
+from typing_extensions import TypedDict
+from pydantic import BaseModel, Field
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import START, END, StateGraph, MessagesState
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Send
+from langgraph.errors import GraphBubbleUp
+
+from checkpoint_store import checkpoint_serializer
+from context_assembly import ANSWER_TOKEN_BUDGET, SECTION_TOKEN_BUDGET, assemble_context
+from llm_cache import CachedChatModel, get_llm_cache
+from rate_limit import (INTERACTIVE, RateLimitedChatModel, acall_with_retry, backoff_delay, call_with_retry,
+                        get_limiter, priority)
+from retrieval_cache import get_retrieval_cache
+from tracing import TracedChatModel, add as trace_add, get_tracer, traced_node
+from wiki_index import get_local_wikipedia
+
+# EXACT MODELS FROM NOTEBOOK (unchanged)
+class Analyst(BaseModel):
+    affiliation: str = Field(description="Primary affiliation of the analyst.")
+    name: str = Field(description="Name of the analyst.")
+    role: str = Field(description="Role of the analyst in the context of the topic.")
+    description: str = Field(description="Description of the analyst focus, concerns, and motives.")
+
+    @property
+    def persona(self) -> str:
+        return f"Name: {self.name}\nRole: {self.role}\nAffiliation: {self.affiliation}\nDescription: {self.description}\n"
+
+class Perspectives(BaseModel):
+    analysts: List[Analyst] = Field(description="Comprehensive list of analysts with their roles and affiliations.")
+
+class SearchQuery(BaseModel):
+    search_query: str = Field(None, description="Search query for retrieval.")
+
+class SearchQueries(BaseModel):
+    """One planned query per retriever, produced by a single structured call per turn"""
+    web_query: str = Field(None, description="Search query for a web search engine.")
+    encyclopedia_query: str = Field(None, description="Short query for an encyclopedia such as Wikipedia, ideally the name of the most relevant article.")
+
+    def for_source(self, source: str) -> str:
+        """Query for a retriever, falling back to the web query"""
+        query = getattr(self, f"{source}_query", None)
+        return query or self.web_query or self.encyclopedia_query or ""
+
+# EXACT STATE DEFINITIONS FROM NOTEBOOK (unchanged)
+class GenerateAnalystsState(TypedDict):
+    topic: str
+    max_analysts: int
+    human_analyst_feedback: str
+    analysts: List[Analyst]
+
+class InterviewState(MessagesState):
+    max_num_turns: int
+    search_queries: SearchQueries
+    context: Annotated[list, operator.add]
+    analyst: Analyst
+    interview: str
+    sections: list
+
+class ResearchGraphState(TypedDict):
+    topic: str
+    max_analysts: int
+    human_analyst_feedback: str
+    analysts: List[Analyst]
+    max_num_turns: int
+    sections: Annotated[list, operator.add]
+    failed_analysts: Annotated[list, operator.add]
+    introduction: str
+    content: str
+    conclusion: str
+    final_report: str
+
+# EXACT ANALYST INSTRUCTIONS FROM NOTEBOOK
+analyst_instructions = """You are tasked with creating a set of AI analyst personas. Follow these instructions carefully:
+
+1. First, review the research topic:
+{topic}
+
+2. Examine any editorial feedback that has been optionally provided to guide creation of the analysts:
+
+{human_analyst_feedback}
+
+3. Determine the most interesting themes based upon documents and / or feedback above.
+
+4. Pick the top {max_analysts} themes.
+
+5. Assign one analyst to each theme."""
+
+# Replaces part of an existing team, so pinned analysts need no new generation pass
+regeneration_instructions = """You are revising a team of AI analyst personas. Follow these instructions carefully:
+
+1. First, review the research topic:
+{topic}
+
+2. These analysts stay on the team unchanged:
+
+{kept}
+
+3. These analysts are being replaced:
+
+{replaced}
+
+4. Examine any editorial feedback that has been optionally provided to guide creation of the new analysts:
+
+{human_analyst_feedback}
+
+5. Determine the most interesting themes based upon the topic and / or feedback above that the analysts staying on the team do not cover.
+
+6. Create exactly {count} new analysts, one for each of the top {count} themes."""
+
+# EXACT QUESTION INSTRUCTIONS FROM NOTEBOOK
+question_instructions = """You are an analyst tasked with interviewing an expert to learn about a specific topic.
+
+Your goal is boil down to interesting and specific insights related to your topic.
+
+1. Interesting: Insights that people will find surprising or non-obvious.
+
+2. Specific: Insights that avoid generalities and include specific examples from the expert.
+
+Here is your topic of focus and set of goals: {goals}
+
+Begin by introducing yourself using a name that fits your persona, and then ask your question.
+
+Continue to ask questions to drill down and refine your understanding of the topic.
+
+When you are satisfied with your understanding, complete the interview with: "Thank you so much for your help!"
+
+Remember to stay in character throughout your response, reflecting the persona and goals provided to you."""
+
+# Search instructions - one planning call yields a query for every retriever
+search_instructions = SystemMessage(content=f"""You will be given a conversation between an analyst and an expert.
+
+Your goal is to generate well-structured queries for use in retrieval and / or web-search related to the conversation.
+
+First, analyze the full conversation.
+
+Pay particular attention to the final question posed by the analyst.
+
+Convert this final question into:
+
+1. A well-structured web search query.
+
+2. A short encyclopedia query, ideally the title of the most relevant Wikipedia article.""")
+
+# EXACT ANSWER INSTRUCTIONS FROM NOTEBOOK
+answer_instructions = """You are an expert being interviewed by an analyst.
+
+Here is analyst area of focus: {goals}.
+
+You goal is to answer a question posed by the interviewer.
+
+To answer question, use this context:
+
+{context}
+
+When answering questions, follow these guidelines:
+
+1. Use only the information provided in the context.
+
+2. Do not introduce external information or make assumptions beyond what is explicitly stated in the context.
+
+3. The context contain sources at the topic of each individual document.
+
+4. Include these sources your answer next to any relevant statements. For example, for source # 1 use [1].
+
+5. List your sources in order at the bottom of your answer. [1] Source 1, [2] Source 2, etc
+
+6. If the source is: <Document source="assistant/docs/llama3_1.pdf" page="7"/>' then just list:
+
+[1] assistant/docs/llama3_1.pdf, page 7
+
+And skip the addition of the brackets as well as the Document source preamble in your citation."""
+
+# EXACT SECTION WRITER INSTRUCTIONS FROM NOTEBOOK
+section_writer_instructions = """You are an expert technical writer.
+
+Your task is to create a short, easily digestible section of a report based on a set of source documents.
+
+1. Analyze the content of the source documents:
+- The name of each source document is at the start of the document, with the <Document tag.
+
+2. Create a report structure using markdown formatting:
+- Use ## for the section title
+- Use ### for sub-section headers
+
+3. Write the report following this structure:
+a. Title (## header)
+b. Summary (### header)
+c. Sources (### header)
+
+4. Make your title engaging based upon the focus area of the analyst:
+{focus}
+
+5. For the summary section:
+- Set up summary with general background / context related to the focus area of the analyst
+- Emphasize what is novel, interesting, or surprising about insights gathered from the interview
+- Create a numbered list of source documents, as you use them
+- Do not mention the names of interviewers or experts
+- Aim for approximately 400 words maximum
+- Use numbered sources in your report (e.g., [1], [2]) based on information from source documents
+
+6. In the Sources section:
+- Include all sources used in your report
+- Provide full links to relevant websites or specific document paths
+- Separate each source by a newline. Use two spaces at the end of each line to create a newline in Markdown.
+- It will look like:
+
+### Sources
+[1] Link or Document name
+[2] Link or Document name
+
+7. Be sure to combine sources. For example this is not correct:
+
+[3] https://ai.meta.com/blog/meta-llama-3-1/
+[4] https://ai.meta.com/blog/meta-llama-3-1/
+
+There should be no redundant sources. It should simply be:
+
+[3] https://ai.meta.com/blog/meta-llama-3-1/
+
+8. Final review:
+- Ensure the report follows the required structure
+- Include no preamble before the title of the report
+- Check that all guidelines have been followed"""
+
+# EXACT REPORT WRITER INSTRUCTIONS FROM NOTEBOOK
+report_writer_instructions = """You are a technical writer creating a report on this overall topic:
+
+{topic}
+
+You have a team of analysts. Each analyst has done two things:
+
+1. They conducted an interview with an expert on a specific sub-topic.
+2. They write up their finding into a memo.
+
+Your task:
+
+1. You will be given a collection of memos from your analysts.
+2. Think carefully about the insights from each memo.
+3. Consolidate these into a crisp overall summary that ties together the central ideas from all of the memos.
+4. Summarize the central points in each memo into a cohesive single narrative.
+
+To format your report:
+
+1. Use markdown formatting.
+2. Include no pre-amble for the report.
+3. Use no sub-heading.
+4. Start your report with a single title header: ## Insights
+5. Do not mention any analyst names in your report.
+6. Preserve any citations in the memos, which will be annotated in brackets, for example [1] or [2].
+7. Create a final, consolidated list of sources and add to a Sources section with the `## Sources` header.
+8. List your sources in order and do not repeat.
+
+[1] Source 1
+[2] Source 2
+
+Here are the memos from your analysts to build your report from:
+
+{context}"""
+
+# EXACT INTRO/CONCLUSION INSTRUCTIONS FROM NOTEBOOK
+intro_conclusion_instructions = """You are a technical writer finishing a report on {topic}
+
+You will be given all of the sections of the report.
+
+You job is to write a crisp and compelling introduction or conclusion section.
+
+The user will instruct you whether to write the introduction or conclusion.
+
+Include no pre-amble for either section.
+
+Target around 100 words, crisply previewing (for introduction) or recapping (for conclusion) all of the sections of the report.
+
+Use markdown formatting.
+
+For your introduction, create a compelling title and use the # header for the title.
+
+For your introduction, use ## Introduction as the section header.
+
+For your conclusion, use ## Conclusion as the section header.
+
+Here are the sections to reflect on for writing: {formatted_str_sections}"""
+
+# Prompt assembly shared by the sync and async nodes
+def analyst_messages(state: GenerateAnalystsState) -> list:
+    system_message = analyst_instructions.format(topic=state['topic'],
+                                                 human_analyst_feedback=state.get('human_analyst_feedback', ''),
+                                                 max_analysts=state['max_analysts'])
+    return [SystemMessage(content=system_message)]+[HumanMessage(content="Generate the set of analysts.")]
+
+def regeneration_messages(topic: str, kept: list, replaced: list, feedback: str = "") -> list:
+    system_message = regeneration_instructions.format(
+        topic=topic,
+        kept="\n".join(analyst.persona for analyst in kept) or "None",
+        replaced="\n".join(analyst.persona for analyst in replaced),
+        human_analyst_feedback=feedback or "",
+        count=len(replaced))
+    return [SystemMessage(content=system_message)]+[HumanMessage(content="Generate the new analysts.")]
+
+def question_messages(state: InterviewState) -> list:
+    system_message = question_instructions.format(goals=state["analyst"].persona)
+    return [SystemMessage(content=system_message)]+state["messages"]
+
+def answer_messages(state: InterviewState) -> list:
+    # Only the passages most relevant to the latest question, within the token budget
+    question = state["messages"][-1].content
+    context = assemble_context(state["context"], question, ANSWER_TOKEN_BUDGET, scope=state["analyst"].name)
+    system_message = answer_instructions.format(goals=state["analyst"].persona, context=context)
+    return [SystemMessage(content=system_message)]+state["messages"]
+
+def section_messages(state: InterviewState) -> list:
+    # Write section using either the gathered source docs from interview (context) or the interview itself (interview)
+    analyst = state["analyst"]
+    context = assemble_context(state["context"], f"{analyst.role} {analyst.description}", SECTION_TOKEN_BUDGET,
+                               scope=analyst.name)
+    system_message = section_writer_instructions.format(focus=analyst.description)
+    return [SystemMessage(content=system_message)]+[HumanMessage(content=f"Use this source to write your section: {context}")]
+
+class InterviewsFailedError(RuntimeError):
+    """Every interview failed, so there is nothing to write a report from"""
+
+def format_sections(state: ResearchGraphState) -> str:
+    if not state["sections"]:
+        failures = "; ".join(f"{f['name']}: {f['error']}" for f in state.get("failed_analysts") or [])
+        raise InterviewsFailedError(f"Every interview failed ({failures})")
+    return "\n\n".join([f"{section}" for section in state["sections"]])
+
+def report_messages(state: ResearchGraphState) -> list:
+    system_message = report_writer_instructions.format(topic=state["topic"], context=format_sections(state))
+    return [SystemMessage(content=system_message)]+[HumanMessage(content=f"Write a report based upon these memos.")]
+
+def intro_conclusion_messages(state: ResearchGraphState, part: str) -> list:
+    instructions = intro_conclusion_instructions.format(topic=state["topic"], formatted_str_sections=format_sections(state))
+    return [SystemMessage(content=instructions)]+[HumanMessage(content=f"Write the report {part}")]
+
+def format_web_docs(search_docs) -> str:
+    # Handle different result formats - fix for TavilySearch
+    if isinstance(search_docs, dict) and 'results' in search_docs:
+        docs = search_docs['results']
+    elif isinstance(search_docs, list):
+        docs = search_docs
+    else:
+        docs = []
+
+    # Format - keep exact same format as notebook
+    return "\n\n---\n\n".join(
+        [
+            f'<Document href="{doc.get("url", "unknown")}"/>\n{doc.get("content", doc.get("snippet", "No content"))}\n</Document>'
+            for doc in docs if isinstance(doc, dict)
+        ]
+    )
+
+def format_wikipedia_docs(search_docs) -> str:
+    return "\n\n---\n\n".join(
+        [
+            f'<Document source="{doc["metadata"]["source"]}" page="{doc["metadata"].get("page", "")}"/>\n{doc["page_content"]}\n</Document>'
+            for doc in search_docs
+        ]
+    )
+
+def _wikipedia_dicts(docs) -> list:
+    # Documents are cached as plain dicts
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+# Nodes without I/O, shared by the sync and async graphs
+def human_feedback(state: GenerateAnalystsState):
+    """No-op node that should be interrupted on"""
+    pass
+
+def save_interview(state: InterviewState):
+    """Save interviews"""
+    # Get messages
+    messages = state["messages"]
+
+    # Convert interview to a string
+    interview = get_buffer_string(messages)
+
+    # Save to interviews key
+    return {"interview": interview}
+
+def route_messages(state: InterviewState, name: str = "expert"):
+    """Route between question and answer"""
+    # Get messages
+    messages = state["messages"]
+    max_num_turns = state.get('max_num_turns',2)
+
+    # Check the number of expert answers
+    num_responses = len(
+        [m for m in messages if isinstance(m, AIMessage) and m.name == name]
+    )
+
+    # End if expert has answered more than the max turns
+    if num_responses >= max_num_turns:
+        return 'save_interview'
+
+    # This router is run after each question - answer pair
+    # Get the last question asked to check if it signals the end of discussion
+    last_question = messages[-2]
+
+    if "Thank you so much for your help" in last_question.content:
+        return 'save_interview'
+    return "ask_question"
+
+def interview_opening(topic: str) -> HumanMessage:
+    """First message of every interview"""
+    return HumanMessage(content=f"So you said you were writing an article on {topic}?")
+
+def initiate_all_interviews(state: ResearchGraphState):
+    """This is the "map" step where we run each interview sub-graph using Send API"""
+    # Check if human feedback
+    human_analyst_feedback=state.get('human_analyst_feedback')
+    if human_analyst_feedback:
+        # Return to create_analysts
+        return "create_analysts"
+
+    # Otherwise kick off interviews in parallel via Send() API
+    else:
+        topic = state["topic"]
+        # Interviews default to two turns unless the run sets max_num_turns
+        turns = {"max_num_turns": state["max_num_turns"]} if state.get("max_num_turns") else {}
+        return [Send("conduct_interview", {"analyst": analyst, "messages": [interview_opening(topic)], **turns})
+                for analyst in state["analysts"]]
+
+def missing_analysts_note(state: ResearchGraphState) -> str:
+    """Note naming the analysts whose interviews failed, or an empty string"""
+    names = [failure["name"] for failure in state.get("failed_analysts") or []]
+    if not names:
+        return ""
+    interviews = "interview" if len(names) == 1 else "interviews"
+    return (f"*Note: the {interviews} with {', '.join(names)} could not be completed, "
+            f"so {'this perspective is' if len(names) == 1 else 'these perspectives are'} missing from the report.*")
+
+def finalize_report(state: ResearchGraphState):
+    """The is the "reduce" step where we gather all the sections, combine them, and reflect on them to write the intro/conclusion"""
+    # Save full final report
+    content = state["content"]
+    if content.startswith("## Insights"):
+        content = content.strip("## Insights")
+    if "## Sources" in content:
+        try:
+            content, sources = content.split("\n## Sources\n")
+        except:
+            sources = None
+    else:
+        sources = None
+
+    note = missing_analysts_note(state)
+    if note:
+        content = content.rstrip() + "\n\n" + note
+
+    final_report = state["introduction"] + "\n\n---\n\n" + content + "\n\n---\n\n" + state["conclusion"]
+    if sources is not None:
+        final_report += "\n\n## Sources\n" + sources
+    return {"final_report": final_report}
+
+# Nodes whose output makes up the final report, in the order finalize_report assembles it
+REPORT_NODES = ["write_introduction", "write_report", "write_conclusion"]
+
+def message_chunk_text(chunk) -> str:
+    """Text carried by a streamed message chunk (Anthropic chunks may hold content blocks)"""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+        if not isinstance(block, dict) or block.get("type", "text") in ("text", "text_delta")
+    )
+
+# Async concurrency limit
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "16"))
+
+class ConcurrencyLimit:
+    """Async context manager capping in-flight calls across every event loop in the process.
+
+    ``stream_graph`` drives each run on its own event loop, so an ``asyncio.Semaphore``
+    (bound to one loop) would only limit a single run. Slots are counted under a thread
+    lock instead, and a released slot is handed directly to the oldest waiter on whatever
+    loop it is waiting on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                waiting = waiter in self._waiters
+                if waiting:
+                    self._waiters.remove(waiter)
+            future = waiter[1]
+            if not waiting and future.done() and not future.cancelled():
+                # The slot arrived just as the task was cancelled
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    # The slot stays taken; it passes to the waiter
+                    loop.call_soon_threadsafe(self._grant, future)
+                    return
+                except RuntimeError:
+                    # Its loop is closed
+                    continue
+            self.active -= 1
+
+    def _grant(self, future):
+        if future.cancelled():
+            # The waiter gave up after the slot was handed to it
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+_concurrency_limit = None
+_concurrency_limit_lock = threading.Lock()
+
+def get_concurrency_limit() -> ConcurrencyLimit:
+    """Return the limit shared by every async graph in the process (``RESEARCH_MAX_CONCURRENCY``)"""
+    global _concurrency_limit
+    with _concurrency_limit_lock:
+        if _concurrency_limit is None:
+            _concurrency_limit = ConcurrencyLimit(DEFAULT_MAX_CONCURRENCY)
+        return _concurrency_limit
+
+def use_async_graph() -> bool:
+    """Whether the app should build async graphs (``RESEARCH_ASYNC_GRAPH=1``)"""
+    return os.getenv("RESEARCH_ASYNC_GRAPH", "0") == "1"
+
+def stream_graph(graph, input, config, **kwargs):
+    """Stream a graph synchronously, driving ``astream`` on a private event loop for async graphs"""
+    if not getattr(graph, "is_async", False):
+        yield from graph.stream(input, config, **kwargs)
+        return
+
+    loop = asyncio.new_event_loop()
+    events = graph.astream(input, config, **kwargs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
+def with_checkpointer(graph, checkpointer=None):
+    """Per-run copy of a compiled graph with its own checkpointer.
+
+    Compiled graphs are cached and shared between sessions (see resources.py); giving
+    each run its own checkpointer keeps their state isolated. Pass a durable checkpointer
+    (see checkpoint_store.py) to make the run resumable after a restart; its thread ids
+    keep runs apart.
+    """
+    if checkpointer is None:
+        checkpointer = MemorySaver(serde=checkpoint_serializer())
+    run_graph = graph.copy(update={"checkpointer": checkpointer})
+    run_graph.is_async = getattr(graph, "is_async", False)
+    return run_graph
+
+# langchain_community is imported on the first live Wikipedia search
+WikipediaLoader = None
+
+def wikipedia_loader(query: str):
+    global WikipediaLoader
+    if WikipediaLoader is None:
+        from langchain_community.document_loaders import WikipediaLoader
+    return WikipediaLoader(query=query, load_max_docs=2)
+
+def counted_fetch(fetch):
+    # Retrievals that miss the cache; the difference to "retrievals" is cache hits
+    trace_add(retrieval_fetches=1)
+    return fetch()
+
+class _Backends:
+    """LLM and retrievers used by the nodes, with caching and the async concurrency limit"""
+
+    def __init__(self, llm, tavily_search, wikipedia, semaphore):
+        # Cache hits never reach the rate limiter (or count as traced model calls)
+        llm = RateLimitedChatModel(llm, get_limiter("anthropic"))
+        if get_tracer() is not None:
+            llm = TracedChatModel(llm)
+        self.llm = CachedChatModel(llm, get_llm_cache())
+        self.tavily_search = tavily_search
+        self.tavily_limiter = get_limiter("tavily")
+        self.wikipedia = wikipedia if wikipedia is not None else get_local_wikipedia()
+        self.retrieval_cache = get_retrieval_cache()
+        self.semaphore = semaphore
+
+    def limit(self):
+        return self.semaphore or get_concurrency_limit()
+
+    # Sync calls
+    def invoke(self, messages, schema=None):
+        trace_add(llm_requests=1)
+        runnable = self.llm.with_structured_output(schema) if schema else self.llm
+        return runnable.invoke(messages)
+
+    def cached_retrieval(self, source: str, query: str, fetch):
+        """Serve a retrieval from the shared cache, coalescing identical in-flight queries"""
+        trace_add(retrievals=1)
+        if self.retrieval_cache is None:
+            return counted_fetch(fetch)
+        return self.retrieval_cache.get_or_fetch(source, query, lambda: counted_fetch(fetch))
+
+    def search_web(self, query: str):
+        return self.cached_retrieval("tavily", query, lambda: call_with_retry(
+            self.tavily_limiter, lambda: self.tavily_search.invoke(query)))
+
+    def search_wikipedia(self, query: str):
+        if self.wikipedia is not None:
+            # Offline index answers without touching the network
+            return self.wikipedia.search(query, k=2)
+        return self.cached_retrieval("wikipedia", query,
+                                     lambda: _wikipedia_dicts(wikipedia_loader(query).load()))
+
+    # Async calls
+    async def ainvoke(self, messages, schema=None):
+        trace_add(llm_requests=1)
+        runnable = self.llm.with_structured_output(schema) if schema else self.llm
+        async with self.limit():
+            return await runnable.ainvoke(messages)
+
+    async def acached_retrieval(self, source: str, query: str, afetch):
+        trace_add(retrievals=1)
+
+        async def limited_fetch():
+            trace_add(retrieval_fetches=1)
+            async with self.limit():
+                return await afetch()
+        if self.retrieval_cache is None:
+            return await limited_fetch()
+        return await self.retrieval_cache.aget_or_fetch(source, query, limited_fetch)
+
+    async def asearch_web(self, query: str):
+        return await self.acached_retrieval("tavily", query, lambda: acall_with_retry(
+            self.tavily_limiter, lambda: self.tavily_search.ainvoke(query)))
+
+    async def asearch_wikipedia(self, query: str):
+        if self.wikipedia is not None:
+            if hasattr(self.wikipedia, "asearch"):
+                return await self.wikipedia.asearch(query, k=2)
+            return self.wikipedia.search(query, k=2)
+
+        async def aload():
+            return _wikipedia_dicts(await wikipedia_loader(query).aload())
+        return await self.acached_retrieval("wikipedia", query, aload)
+
+def make_backends(llm, tavily_search, wikipedia=None, semaphore=None) -> _Backends:
+    """Backends configured like a graph's, sharing its caches; for work outside the graph"""
+    return _Backends(llm, tavily_search, wikipedia, semaphore)
+
+def replace_analysts(backends: _Backends, topic: str, analysts: list, pinned, feedback: str = "") -> list:
+    """Replace the analysts whose indexes are not in ``pinned`` with one structured call.
+
+    Pinned analysts keep their place in the team; a slot the model leaves unfilled keeps
+    its current analyst.
+    """
+    replace = [i for i in range(len(analysts)) if i not in pinned]
+    if not replace:
+        return list(analysts)
+    kept = [analyst for i, analyst in enumerate(analysts) if i in pinned]
+    messages = regeneration_messages(topic, kept, [analysts[i] for i in replace], feedback)
+    with priority(INTERACTIVE):
+        generated = backends.invoke(messages, Perspectives).analysts
+    team = list(analysts)
+    for i, analyst in zip(replace, generated):
+        team[i] = analyst
+    return team
+
+def _sync_nodes(backends: _Backends) -> dict:
+    def create_analysts(state: GenerateAnalystsState):
+        """Create analysts"""
+        # Team generation is interactive, so it goes ahead of queued interview turns
+        with priority(INTERACTIVE):
+            analysts = backends.invoke(analyst_messages(state), Perspectives)
+        return {"analysts": analysts.analysts}
+
+    def generate_question(state: InterviewState):
+        """Node to generate a question"""
+        question = backends.invoke(question_messages(state))
+        return {"messages": [question]}
+
+    def plan_queries(state: InterviewState):
+        """Plan the search queries for every retriever with a single structured call"""
+        search_queries = backends.invoke([search_instructions]+state['messages'], SearchQueries)
+        return {"search_queries": search_queries}
+
+    def search_web(state: InterviewState):
+        """Retrieve docs from web search"""
+        search_docs = backends.search_web(state["search_queries"].for_source("web"))
+        return {"context": [format_web_docs(search_docs)]}
+
+    def search_wikipedia(state: InterviewState):
+        """Retrieve docs from wikipedia"""
+        search_docs = backends.search_wikipedia(state["search_queries"].for_source("encyclopedia"))
+        return {"context": [format_wikipedia_docs(search_docs)]}
+
+    def generate_answer(state: InterviewState):
+        """Node to answer a question"""
+        answer = backends.invoke(answer_messages(state))
+
+        # Name the message as coming from the expert
+        answer.name = "expert"
+        return {"messages": [answer]}
+
+    def write_section(state: InterviewState):
+        """Node to write a report section from the interview"""
+        section = backends.invoke(section_messages(state))
+        return {"sections": [section.content]}
+
+    def write_report(state: ResearchGraphState):
+        report = backends.invoke(report_messages(state))
+        return {"content": report.content}
+
+    def write_introduction(state: ResearchGraphState):
+        intro = backends.invoke(intro_conclusion_messages(state, "introduction"))
+        return {"introduction": intro.content}
+
+    def write_conclusion(state: ResearchGraphState):
+        conclusion = backends.invoke(intro_conclusion_messages(state, "conclusion"))
+        return {"conclusion": conclusion.content}
+
+    return locals()
+
+def _async_nodes(backends: _Backends) -> dict:
+    async def create_analysts(state: GenerateAnalystsState):
+        """Create analysts"""
+        # Team generation is interactive, so it goes ahead of queued interview turns
+        with priority(INTERACTIVE):
+            analysts = await backends.ainvoke(analyst_messages(state), Perspectives)
+        return {"analysts": analysts.analysts}
+
+    async def generate_question(state: InterviewState):
+        """Node to generate a question"""
+        question = await backends.ainvoke(question_messages(state))
+        return {"messages": [question]}
+
+    async def plan_queries(state: InterviewState):
+        """Plan the search queries for every retriever with a single structured call"""
+        search_queries = await backends.ainvoke([search_instructions]+state['messages'], SearchQueries)
+        return {"search_queries": search_queries}
+
+    async def search_web(state: InterviewState):
+        """Retrieve docs from web search"""
+        search_docs = await backends.asearch_web(state["search_queries"].for_source("web"))
+        return {"context": [format_web_docs(search_docs)]}
+
+    async def search_wikipedia(state: InterviewState):
+        """Retrieve docs from wikipedia"""
+        search_docs = await backends.asearch_wikipedia(state["search_queries"].for_source("encyclopedia"))
+        return {"context": [format_wikipedia_docs(search_docs)]}
+
+    async def generate_answer(state: InterviewState):
+        """Node to answer a question"""
+        answer = await backends.ainvoke(answer_messages(state))
+
+        # Name the message as coming from the expert
+        answer.name = "expert"
+        return {"messages": [answer]}
+
+    async def write_section(state: InterviewState):
+        """Node to write a report section from the interview"""
+        section = await backends.ainvoke(section_messages(state))
+        return {"sections": [section.content]}
+
+    async def write_report(state: ResearchGraphState):
+        report = await backends.ainvoke(report_messages(state))
+        return {"content": report.content}
+
+    async def write_introduction(state: ResearchGraphState):
+        intro = await backends.ainvoke(intro_conclusion_messages(state, "introduction"))
+        return {"introduction": intro.content}
+
+    async def write_conclusion(state: ResearchGraphState):
+        conclusion = await backends.ainvoke(intro_conclusion_messages(state, "conclusion"))
+        return {"conclusion": conclusion.content}
+
+    return locals()
+
+# Attempts per interview before its analyst is left out of the report; at least one
+INTERVIEW_MAX_ATTEMPTS = max(1, int(os.getenv("RESEARCH_INTERVIEW_ATTEMPTS", "2")))
+
+def _interview_failure(state: InterviewState, error: Exception) -> dict:
+    return {"failed_analysts": [{"name": state["analyst"].name, "error": f"{type(error).__name__}: {error}"}]}
+
+def isolated_interview(interview_graph, max_attempts: int = INTERVIEW_MAX_ATTEMPTS):
+    """Run one interview branch, retrying it on its own and recording it as failed when
+    the attempts run out, so one flaky call does not discard the other analysts' sections"""
+    max_attempts = max(1, max_attempts)
+    def conduct_interview(state: InterviewState, config: RunnableConfig):
+        for attempt in range(max_attempts):
+            try:
+                return {"sections": interview_graph.invoke(state, config)["sections"]}
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                error = e
+                if attempt + 1 < max_attempts:
+                    time.sleep(backoff_delay(attempt, e))
+        return _interview_failure(state, error)
+    return conduct_interview
+
+def aisolated_interview(interview_graph, max_attempts: int = INTERVIEW_MAX_ATTEMPTS):
+    """Async ``isolated_interview``"""
+    max_attempts = max(1, max_attempts)
+    async def conduct_interview(state: InterviewState, config: RunnableConfig):
+        for attempt in range(max_attempts):
+            try:
+                return {"sections": (await interview_graph.ainvoke(state, config))["sections"]}
+            except GraphBubbleUp:
+                raise
+            except Exception as e:
+                error = e
+                if attempt + 1 < max_attempts:
+                    await asyncio.sleep(backoff_delay(attempt, e))
+        return _interview_failure(state, error)
+    return conduct_interview
+
+def _add_node(builder, tracer, name: str, fn):
+    # Without RESEARCH_TRACE the node is added unwrapped
+    builder.add_node(name, traced_node(name, fn, tracer))
+
+def build_research_graph(llm, tavily_search, wikipedia=None, use_async: bool = False, semaphore=None):
+    """Build and compile the EXACT research automation graph from the notebook.
+
+    ``wikipedia`` is an optional backend with ``search(query, k)`` (see wiki_index.LocalWikipedia);
+    by default the offline index is used when configured, otherwise WikipediaLoader.
+    ``semaphore`` caps in-flight calls for the async graph; by default every async graph
+    in the process shares ``get_concurrency_limit()``.
+    """
+    backends = _Backends(llm, tavily_search, wikipedia, semaphore)
+    tracer = get_tracer()
+    nodes = _async_nodes(backends) if use_async else _sync_nodes(backends)
+
+    # EXACT INTERVIEW GRAPH FROM NOTEBOOK
+    interview_builder = StateGraph(InterviewState)
+    _add_node(interview_builder, tracer, "ask_question", nodes["generate_question"])
+    _add_node(interview_builder, tracer, "plan_queries", nodes["plan_queries"])
+    _add_node(interview_builder, tracer, "search_web", nodes["search_web"])
+    _add_node(interview_builder, tracer, "search_wikipedia", nodes["search_wikipedia"])
+    _add_node(interview_builder, tracer, "answer_question", nodes["generate_answer"])
+    _add_node(interview_builder, tracer, "save_interview", save_interview)
+    _add_node(interview_builder, tracer, "write_section", nodes["write_section"])
+
+    # Flow
+    interview_builder.add_edge(START, "ask_question")
+    interview_builder.add_edge("ask_question", "plan_queries")
+    interview_builder.add_edge("plan_queries", "search_web")
+    interview_builder.add_edge("plan_queries", "search_wikipedia")
+    interview_builder.add_edge("search_web", "answer_question")
+    interview_builder.add_edge("search_wikipedia", "answer_question")
+    interview_builder.add_conditional_edges("answer_question", route_messages,['ask_question','save_interview'])
+    interview_builder.add_edge("save_interview", "write_section")
+    interview_builder.add_edge("write_section", END)
+
+    # EXACT GRAPH CONSTRUCTION FROM NOTEBOOK
+    builder = StateGraph(ResearchGraphState)
+    _add_node(builder, tracer, "create_analysts", nodes["create_analysts"])
+    _add_node(builder, tracer, "human_feedback", human_feedback)
+    isolate = aisolated_interview if use_async else isolated_interview
+    _add_node(builder, tracer, "conduct_interview", isolate(interview_builder.compile()))
+    _add_node(builder, tracer, "write_report", nodes["write_report"])
+    _add_node(builder, tracer, "write_introduction", nodes["write_introduction"])
+    _add_node(builder, tracer, "write_conclusion", nodes["write_conclusion"])
+    _add_node(builder, tracer, "finalize_report", finalize_report)
+
+    # EXACT LOGIC FROM NOTEBOOK
+    builder.add_edge(START, "create_analysts")
+    builder.add_edge("create_analysts", "human_feedback")
+    builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
+    builder.add_edge("conduct_interview", "write_report")
+    builder.add_edge("conduct_interview", "write_introduction")
+    builder.add_edge("conduct_interview", "write_conclusion")
+    builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
+    builder.add_edge("finalize_report", END)
+
+    # Compile
+    memory = MemorySaver()
+    graph = builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+    graph.is_async = use_async
+    return graph
+
+def build_analyst_feedback_graph(llm, use_async: bool = False, semaphore=None):
+    """Build a separate graph just for analyst generation with feedback (following notebook pattern)"""
+    backends = _Backends(llm, None, None, semaphore)
+    tracer = get_tracer()
+    nodes = _async_nodes(backends) if use_async else _sync_nodes(backends)
+
+    def should_continue(state: GenerateAnalystsState):
+        """Return the next node to execute (exact notebook pattern)"""
+        # Check if human feedback
+        human_analyst_feedback = state.get('human_analyst_feedback', None)
+        if human_analyst_feedback:
+            return "create_analysts"
+        # Otherwise end
+        return END
+
+    # Build the graph exactly like the notebook
+    builder = StateGraph(GenerateAnalystsState)
+    _add_node(builder, tracer, "create_analysts", nodes["create_analysts"])
+    _add_node(builder, tracer, "human_feedback", human_feedback)
+    builder.add_edge(START, "create_analysts")
+    builder.add_edge("create_analysts", "human_feedback")
+    builder.add_conditional_edges("human_feedback", should_continue, ["create_analysts", END])
+
+    # Compile with checkpointer
+    memory = MemorySaver()
+    graph = builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
+    graph.is_async = use_async
+    return graph
@@ -0,0 +1,195 @@
+"""Process-wide pool of API clients and compiled research graphs.
+
+Streamlit re-runs the script on every interaction and each session used to build its
+own ``ChatAnthropic``/``TavilySearch`` clients and recompile the full graph for every
+research run. Clients are now pooled per configuration and API key fingerprint, and
+compiled graphs are cached per model and retriever configuration. Each run gets its own
+copy of the cached graph with a fresh checkpointer (see ``research_graph.with_checkpointer``),
+so runs never share state.
+
+Credentials are validated once per key fingerprint by ``check_credentials``; the result
+is cached so reruns render without any network I/O.
+
+The Anthropic and Tavily client libraries take seconds to import; they are imported
+when the first client is created rather than with this module.
+"""
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage
+
+from research_graph import build_analyst_feedback_graph, build_research_graph
+
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+DEFAULT_TEMPERATURE = 0
+DEFAULT_MAX_RESULTS = 3
+
+_lock = threading.RLock()
+_clients = {}
+_graphs = {}
+
+
+def key_fingerprint(value: str) -> str:
+    """Short, non-reversible identifier for an API key"""
+    if not value:
+        return ""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def get_chat_model(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+    """Shared ChatAnthropic client for the current ANTHROPIC_API_KEY"""
+    key = ("anthropic", model, temperature, key_fingerprint(os.getenv("ANTHROPIC_API_KEY")))
+    with _lock:
+        if key not in _clients:
+            from langchain_anthropic import ChatAnthropic
+            # Retries belong to rate_limit.call_with_retry, which backs off through the shared
+            # limiter; client retries on top would multiply the attempts per 429
+            _clients[key] = ChatAnthropic(model=model, temperature=temperature, max_retries=0)
+        return _clients[key]
+
+
+def get_tavily_search(max_results: int = DEFAULT_MAX_RESULTS):
+    """Shared TavilySearch client for the current TAVILY_API_KEY"""
+    key = ("tavily", max_results, key_fingerprint(os.getenv("TAVILY_API_KEY")))
+    with _lock:
+        if key not in _clients:
+            from langchain_tavily import TavilySearch
+            _clients[key] = TavilySearch(max_results=max_results)
+        return _clients[key]
+
+
+def _graph_key(kind: str, model: str, temperature: float, max_results: int, use_async: bool) -> tuple:
+    # Everything the compiled graph closes over: clients (by key fingerprint) and retriever setup
+    return (
+        kind, model, temperature, max_results, use_async,
+        key_fingerprint(os.getenv("ANTHROPIC_API_KEY")),
+        key_fingerprint(os.getenv("TAVILY_API_KEY")),
+        os.getenv("RESEARCH_WIKIPEDIA_INDEX", ""),
+    )
+
+
+def get_research_graph(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE,
+                       max_results: int = DEFAULT_MAX_RESULTS, use_async: bool = False):
+    """Compiled research graph shared by every session with the same configuration.
+
+    Do not stream the returned graph directly; take a per-run copy with
+    ``research_graph.with_checkpointer``.
+    """
+    key = _graph_key("research", model, temperature, max_results, use_async)
+    with _lock:
+        if key not in _graphs:
+            _graphs[key] = build_research_graph(get_chat_model(model, temperature),
+                                                get_tavily_search(max_results), use_async=use_async)
+        return _graphs[key]
+
+
+def get_analyst_feedback_graph(model: str = DEFAULT_MODEL, temperature: float = DEFAULT_TEMPERATURE,
+                               use_async: bool = False):
+    """Compiled analyst feedback graph shared by every session with the same configuration"""
+    key = _graph_key("feedback", model, temperature, None, use_async)
+    with _lock:
+        if key not in _graphs:
+            _graphs[key] = build_analyst_feedback_graph(get_chat_model(model, temperature), use_async=use_async)
+        return _graphs[key]
+
+
+def clear():
+    """Drop every pooled client and compiled graph"""
+    with _lock:
+        _clients.clear()
+        _graphs.clear()
+
+
+@dataclass
+class HealthStatus:
+    ok: bool
+    error: str = ""
+    checked_at: float = 0.0
+    latency: float = 0.0
+
+
+def validate_credentials() -> None:
+    """Make one minimal Claude call with the current keys; raises on failure"""
+    get_tavily_search()
+    get_chat_model().invoke([HumanMessage(content="test")], max_tokens=1)
+
+
+class HealthCheck:
+    """Caches credential checks per key fingerprint.
+
+    A successful check is trusted for ``ttl`` seconds and then revalidated in the
+    background while the cached result keeps being served. A failed check is retried
+    in the background, at most every ``retry_interval`` seconds.
+    """
+
+    def __init__(self, ttl: float = 3600, retry_interval: float = 30):
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.network_checks = 0
+        self._results = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _run(self, key) -> HealthStatus:
+        start = time.perf_counter()
+        try:
+            validate_credentials()
+            status = HealthStatus(ok=True)
+        except Exception as e:
+            status = HealthStatus(ok=False, error=str(e))
+        status.checked_at = time.time()
+        status.latency = time.perf_counter() - start
+        with self._lock:
+            self.network_checks += 1
+            self._results[key] = status
+            self._pending.discard(key)
+        return status
+
+    def _recheck_in_background(self, key):
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        threading.Thread(target=self._run, args=(key,), daemon=True, name="credential-check").start()
+
+    def check(self, wait: bool = True, force: bool = False):
+        """Status for the current keys, or None while a non-blocking first check runs.
+
+        ``force`` ignores a cached failure, e.g. when the user re-submits their keys.
+        """
+        key = (key_fingerprint(os.getenv("ANTHROPIC_API_KEY")), key_fingerprint(os.getenv("TAVILY_API_KEY")))
+        with self._lock:
+            status = self._results.get(key)
+        if force and status is not None and not status.ok:
+            status = None
+
+        if status is None:
+            if wait:
+                with self._lock:
+                    self._pending.add(key)
+                return self._run(key)
+            self._recheck_in_background(key)
+            return None
+
+        age = time.time() - status.checked_at
+        if (status.ok and age >= self.ttl) or (not status.ok and age >= self.retry_interval):
+            self._recheck_in_background(key)
+        return status
+
+    def invalidate(self):
+        with self._lock:
+            self._results.clear()
+
+
+health_check = HealthCheck(
+    ttl=float(os.getenv("RESEARCH_HEALTH_TTL", "3600")),
+    retry_interval=float(os.getenv("RESEARCH_HEALTH_RETRY", "30")),
+)
+
+
+def check_credentials(wait: bool = True, force: bool = False):
+    """Cached credential check shared by every session; see HealthCheck"""
+    return health_check.check(wait, force)
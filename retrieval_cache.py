@@ -0,0 +1,391 @@
+"""TTL cache for Tavily and Wikipedia retrieval with in-flight request coalescing.
+
+Analysts researching the same topic often produce identical search queries. Results are
+cached per source under the normalized query string, each source with its own TTL, in a
+bounded in-memory LRU and in SQLite so they survive restarts. When two interview
+branches, in the same run or in different runs, ask for the same query at the same time
+only one network call is made and both wait on it.
+"""
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "research_ai", "retrieval_cache.sqlite3")
+
+# Web results go stale quickly, encyclopedia articles do not
+DEFAULT_TTLS = {
+    "tavily": 15 * 60,
+    "wikipedia": 7 * 24 * 3600,
+}
+
+# Seconds between sweeps for expired rows
+PRUNE_INTERVAL = 3600
+# A sweep over the size limit evicts down to this fraction of it
+PRUNE_TARGET = 0.9
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop surrounding punctuation and collapse whitespace"""
+    query = (query or "").lower()
+    query = re.sub(r"[\"'`?!.,;:]+", " ", query)
+    return " ".join(query.split())
+
+
+class _Flight:
+    """A fetch in progress that other callers, sync or async on any event loop, can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # The leader was cancelled or interrupted; waiters fetch for themselves
+        self.abandoned = False
+        self.waiters = []
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RetrievalCache:
+    """Per-source TTL cache: an in-memory LRU of ``max_memory_entries`` results in front
+    of SQLite, which is pruned of expired rows and, least recently used first, down to
+    ``max_bytes``.
+
+    Values must be JSON serializable. ``get_or_fetch`` is the main entry point. SQLite is
+    only touched outside the lock guarding the memory tier and the in-flight table, so a
+    slow disk does not stall lookups for other queries.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttls: dict = None, default_ttl: float = 3600,
+                 max_memory_entries: int = 512, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._disk_bytes = 0
+        self._pruned = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_latency = 0.0
+        self.fetch_latency = 0.0
+
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "source TEXT NOT NULL, query TEXT NOT NULL, value TEXT NOT NULL, "
+                "latency REAL NOT NULL, created REAL NOT NULL, "
+                "size INTEGER NOT NULL DEFAULT 0, accessed REAL NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (source, query))"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+            # Files written before size-based pruning
+            if "size" not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE results SET size = LENGTH(value)")
+            if "accessed" not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE results SET accessed = created")
+            self._conn.commit()
+            self.prune()
+
+    def ttl(self, source: str) -> float:
+        return self.ttls.get(source, self.default_ttl)
+
+    def _remember(self, key, entry):
+        # Caller holds self._lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _recall(self, key):
+        """Return (value, latency) for a fresh entry in memory, or None"""
+        # Caller holds self._lock
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        value, latency, created = entry
+        if time.time() - created > self.ttl(key[0]):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value, latency
+
+    def _read(self, key):
+        """Return (value, latency, created) for a fresh row on disk, or None"""
+        if self._conn is None:
+            return None
+        source, query = key
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, latency, created, size FROM results WHERE source = ? AND query = ?",
+                (source, query),
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl(source):
+                self._conn.execute("DELETE FROM results WHERE source = ? AND query = ?", (source, query))
+                self._conn.commit()
+                self._disk_bytes -= row[3]
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE results SET accessed = ? WHERE source = ? AND query = ?",
+                                   (now, source, query))
+                self._conn.commit()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _write(self, key, value, latency):
+        """Store a fetched value on disk, sweeping only when the size limit is crossed
+        or ``PRUNE_INTERVAL`` has passed"""
+        if self._conn is None:
+            return
+        now = time.time()
+        blob = json.dumps(value)
+        with self._db_lock:
+            old = self._conn.execute("SELECT size FROM results WHERE source = ? AND query = ?", key).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (source, query, value, latency, created, size, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key[0], key[1], blob, latency, now, len(blob), now),
+            )
+            self._conn.commit()
+            self._disk_bytes += len(blob) - (old[0] if old else 0)
+            full = self.max_bytes is not None and self._disk_bytes > self.max_bytes
+        if full or now - self._pruned > PRUNE_INTERVAL:
+            self.prune()
+
+    def prune(self) -> None:
+        """Evict expired rows, then least recently used rows above the size limit"""
+        if self._conn is None:
+            return
+        with self._db_lock:
+            now = self._pruned = time.time()
+            for source in {row[0] for row in self._conn.execute("SELECT DISTINCT source FROM results")}:
+                self._conn.execute("DELETE FROM results WHERE source = ? AND created < ?",
+                                   (source, now - self.ttl(source)))
+            (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+            if self.max_bytes is not None and total > self.max_bytes:
+                excess = total - int(self.max_bytes * PRUNE_TARGET)
+                for source, query, size in self._conn.execute(
+                    "SELECT source, query, size FROM results ORDER BY accessed ASC"
+                ).fetchall():
+                    if excess <= 0:
+                        break
+                    self._conn.execute("DELETE FROM results WHERE source = ? AND query = ?", (source, query))
+                    excess -= size
+                    total -= size
+            self._conn.commit()
+            self._disk_bytes = total
+
+    def get(self, source: str, query: str):
+        """Return a cached value without fetching, or None"""
+        key = (source, normalize_query(query))
+        with self._lock:
+            entry = self._recall(key)
+        if entry is not None:
+            return entry[0]
+        entry = self._read(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self._remember(key, entry)
+        return entry[0]
+
+    def put(self, source: str, query: str, value, latency: float = 0.0) -> None:
+        key = (source, normalize_query(query))
+        with self._lock:
+            self._remember(key, (value, latency, time.time()))
+        self._write(key, value, latency)
+
+    def _join(self, key, loop=None):
+        """Serve ``key`` from memory, or join or lead its flight.
+
+        Returns ``(entry, flight, leader, future)``; ``future`` is set for async waiters.
+        The leader looks on disk before fetching.
+        """
+        with self._lock:
+            entry = self._recall(key)
+            if entry is not None:
+                self.hits += 1
+                self.saved_latency += entry[1]
+                return entry, None, False, None
+            flight = self._inflight.get(key)
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                return None, flight, True, None
+            self.coalesced += 1
+            future = None
+            if loop is not None:
+                future = loop.create_future()
+                flight.waiters.append((loop, future))
+            return None, flight, False, future
+
+    def _finish(self, key, flight, value=None, error: BaseException = None, latency: float = 0.0,
+                created: float = None):
+        """Settle a flight; ``created`` is set when the value was read from disk"""
+        with self._lock:
+            if created is not None:
+                self.hits += 1
+                self.saved_latency += latency
+            else:
+                self.misses += 1
+            if error is None:
+                if created is None:
+                    self.fetch_latency += latency
+                self._remember(key, (value, latency, created or time.time()))
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+            flight.value = value
+            if isinstance(error, Exception):
+                flight.error = error
+            elif error is not None:
+                # Cancellation is the leader's own business, not the query's
+                flight.abandoned = True
+            waiters, flight.waiters = flight.waiters, []
+            flight.done.set()
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed
+                pass
+        if error is None and created is None:
+            self._write(key, value, latency)
+
+    def _result(self, flight):
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def get_or_fetch(self, source: str, query: str, fetch):
+        """Return the cached result for ``query`` or call ``fetch()`` exactly once.
+
+        Concurrent callers asking for the same normalized query, in any thread or event
+        loop, share a single fetch. Errors are propagated to every waiter and nothing is
+        cached. If the fetching caller is cancelled or interrupted, the waiters fetch again.
+        """
+        key = (source, normalize_query(query))
+        while True:
+            entry, flight, leader, _ = self._join(key)
+            if entry is not None:
+                return entry[0]
+            if leader:
+                break
+            flight.done.wait()
+            if not flight.abandoned:
+                return self._result(flight)
+
+        start = time.perf_counter()
+        try:
+            entry = self._read(key)
+            if entry is None:
+                value = fetch()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        if entry is not None:
+            self._finish(key, flight, entry[0], latency=entry[1], created=entry[2])
+            return entry[0]
+        self._finish(key, flight, value, latency=time.perf_counter() - start)
+        return value
+
+    async def aget_or_fetch(self, source: str, query: str, afetch):
+        """Async ``get_or_fetch``, sharing fetches with every other caller in the process"""
+        key = (source, normalize_query(query))
+        loop = asyncio.get_running_loop()
+        while True:
+            entry, flight, leader, future = self._join(key, loop)
+            if entry is not None:
+                return entry[0]
+            if leader:
+                break
+            await future
+            if not flight.abandoned:
+                return self._result(flight)
+
+        start = time.perf_counter()
+        try:
+            # SQLite calls block, so they run off the event loop
+            entry = await loop.run_in_executor(None, self._read, key) if self._conn is not None else None
+            if entry is None:
+                value = await afetch()
+        except BaseException as e:
+            self._finish(key, flight, error=e)
+            raise
+        if entry is not None:
+            self._finish(key, flight, entry[0], latency=entry[1], created=entry[2])
+            return entry[0]
+        self._finish(key, flight, value, latency=time.perf_counter() - start)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._db_lock:
+                    self._conn.execute("DELETE FROM results")
+                    self._conn.commit()
+                    self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit rate and latency saved by serving from cache or piggybacking on a fetch"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": ((self.hits + self.coalesced) / lookups) if lookups else 0.0,
+            "saved_latency": self.saved_latency,
+            "fetch_latency": self.fetch_latency,
+        }
+
+
+_retrieval_cache = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache():
+    """Return the process-wide retrieval cache, or None when disabled.
+
+    Configured with ``RESEARCH_RETRIEVAL_CACHE`` (set to ``0`` to disable),
+    ``RESEARCH_RETRIEVAL_CACHE_PATH``, ``RESEARCH_RETRIEVAL_CACHE_MAX_MB``,
+    ``RESEARCH_TAVILY_TTL`` and ``RESEARCH_WIKIPEDIA_TTL`` (seconds).
+    """
+    global _retrieval_cache
+    if os.getenv("RESEARCH_RETRIEVAL_CACHE", "1") == "0":
+        return None
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache(
+                path=os.getenv("RESEARCH_RETRIEVAL_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttls={
+                    "tavily": float(os.getenv("RESEARCH_TAVILY_TTL", DEFAULT_TTLS["tavily"])),
+                    "wikipedia": float(os.getenv("RESEARCH_WIKIPEDIA_TTL", DEFAULT_TTLS["wikipedia"])),
+                },
+                max_bytes=int(float(os.getenv("RESEARCH_RETRIEVAL_CACHE_MAX_MB", 256)) * 1024 * 1024),
+            )
+        return _retrieval_cache
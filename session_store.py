@@ -0,0 +1,236 @@
+"""Disk-backed storage for the bulky parts of Streamlit sessions.
+
+Session state used to hold every report twice, once wrapped in its chat message and
+once in ``last_report_content``, and the compiled graph of the last run with a
+``MemorySaver`` holding every checkpoint and interview transcript of that run. Nothing
+was released until the session ended, so the server's RSS grew with every report.
+
+Session state now keeps only references. Long chat messages and report bodies are
+written to a SQLite file, with a small in-memory LRU in front of it that is bounded
+both in total and per session. Runs checkpoint to a ``DurableSqliteSaver`` on the same
+file instead of a ``MemorySaver``, and a run's checkpoints are deleted once its report
+is stored. Sessions idle for longer than the TTL are removed from disk.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from checkpoint_store import SQLITE_CHECKPOINTS_AVAILABLE
+
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "research_ai", "sessions.sqlite3")
+
+# Seconds between updates of a session's last-access time
+TOUCH_INTERVAL = 60
+# Seconds between sweeps for expired sessions
+PRUNE_INTERVAL = 3600
+
+
+class SessionStore:
+    """Texts per session, kept in memory up to ``max_session_bytes`` per session and
+    ``max_memory_bytes`` in total, and on disk until the session is idle for ``ttl`` seconds"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, max_memory_bytes: int = 64 * 1024 * 1024,
+                 max_session_bytes: int = 4 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_session_bytes = max_session_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._session_bytes = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._checkpointer = None
+        self._pruned = 0.0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_texts ("
+            "session TEXT NOT NULL, ref TEXT NOT NULL, body TEXT NOT NULL, size INTEGER NOT NULL, "
+            "PRIMARY KEY (session, ref))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_threads (thread_id TEXT PRIMARY KEY, session TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (session TEXT PRIMARY KEY, accessed REAL NOT NULL)")
+        self._conn.commit()
+
+    def _remember(self, key: tuple, text: str):
+        size = len(text)
+        session = key[0]
+        with self._lock:
+            if key in self._memory:
+                self._forget(key)
+            if size > self.max_session_bytes:
+                return
+            self._memory[key] = text
+            self._memory_bytes += size
+            self._session_bytes[session] = self._session_bytes.get(session, 0) + size
+            if self._session_bytes[session] > self.max_session_bytes:
+                # Evict this session's least recently used texts first
+                for other in [k for k in self._memory if k[0] == session]:
+                    if self._session_bytes[session] <= self.max_session_bytes:
+                        break
+                    self._forget(other)
+            while self._memory_bytes > self.max_memory_bytes:
+                self._forget(next(iter(self._memory)))
+
+    def _forget(self, key: tuple):
+        # Caller holds self._lock
+        size = len(self._memory.pop(key))
+        self._memory_bytes -= size
+        self._session_bytes[key[0]] -= size
+        if not self._session_bytes[key[0]]:
+            del self._session_bytes[key[0]]
+
+    def _touch(self, session: str):
+        # Caller holds self._db_lock; the caller commits
+        now = time.time()
+        if now - self._touched.get(session, 0) < TOUCH_INTERVAL:
+            return
+        self._touched[session] = now
+        self._conn.execute("INSERT OR REPLACE INTO sessions (session, accessed) VALUES (?, ?)", (session, now))
+
+    def put(self, session: str, text: str, kind: str = "text") -> str:
+        """Store ``text`` for ``session`` and return the reference to keep in session state"""
+        ref = f"{kind}-{hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]}"
+        with self._db_lock:
+            self._conn.execute("INSERT OR REPLACE INTO session_texts (session, ref, body, size) VALUES (?, ?, ?, ?)",
+                               (session, ref, text, len(text)))
+            self._touch(session)
+            self._conn.commit()
+        self._remember((session, ref), text)
+        if time.time() - self._pruned > PRUNE_INTERVAL:
+            self.prune()
+        return ref
+
+    def get(self, session: str, ref: str):
+        """Text stored under ``ref``, or None once the session has expired"""
+        key = (session, ref)
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return text
+
+        with self._db_lock:
+            row = self._conn.execute("SELECT body FROM session_texts WHERE session = ? AND ref = ?", key).fetchone()
+            if row is not None:
+                self._touch(session)
+                self._conn.commit()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        with self._lock:
+            self.disk_hits += 1
+        return row[0]
+
+    def checkpointer(self):
+        """Checkpointer writing to the store's file, or None without langgraph-checkpoint-sqlite"""
+        if not SQLITE_CHECKPOINTS_AVAILABLE:
+            return None
+        from checkpoint_store import DurableSqliteSaver
+
+        with self._lock:
+            if self._checkpointer is None:
+                self._checkpointer = DurableSqliteSaver.open(self.path)
+            return self._checkpointer
+
+    def add_thread(self, session: str, thread_id: str) -> None:
+        """Record that ``thread_id`` checkpoints to this store on behalf of ``session``"""
+        with self._db_lock:
+            self._conn.execute("INSERT OR REPLACE INTO session_threads (thread_id, session) VALUES (?, ?)",
+                               (thread_id, session))
+            self._touch(session)
+            self._conn.commit()
+
+    def drop_thread(self, thread_id: str) -> None:
+        """Delete a finished run's checkpoints"""
+        checkpointer = self.checkpointer()
+        if checkpointer is not None:
+            checkpointer.delete_thread(thread_id)
+        with self._db_lock:
+            self._conn.execute("DELETE FROM session_threads WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def drop_session(self, session: str) -> None:
+        """Delete everything stored for ``session``"""
+        with self._db_lock:
+            threads = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM session_threads WHERE session = ?", (session,))]
+        for thread_id in threads:
+            self.drop_thread(thread_id)
+        with self._db_lock:
+            self._conn.execute("DELETE FROM session_texts WHERE session = ?", (session,))
+            self._conn.execute("DELETE FROM sessions WHERE session = ?", (session,))
+            self._conn.commit()
+            self._touched.pop(session, None)
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == session]:
+                self._forget(key)
+
+    def prune(self) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many were dropped"""
+        self._pruned = time.time()
+        with self._db_lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT session FROM sessions WHERE accessed < ?", (time.time() - self.ttl,))]
+        for session in expired:
+            self.drop_session(session)
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            sessions, = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM session_texts").fetchone()
+            threads, = self._conn.execute("SELECT COUNT(*) FROM session_threads").fetchone()
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "sessions": sessions,
+                "disk_entries": entries,
+                "disk_chars": size,
+                "threads": threads,
+            }
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Return the process-wide session store, or None when disabled.
+
+    Configured with ``RESEARCH_SESSION_STORE`` (set to ``0`` to keep everything in
+    session state), ``RESEARCH_SESSION_STORE_PATH``, ``RESEARCH_SESSION_MEMORY_MB``,
+    ``RESEARCH_SESSION_CAP_MB`` (memory per session) and ``RESEARCH_SESSION_TTL_HOURS``.
+    """
+    global _session_store
+    if os.getenv("RESEARCH_SESSION_STORE", "1") == "0":
+        return None
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore(
+                path=os.getenv("RESEARCH_SESSION_STORE_PATH", DEFAULT_STORE_PATH),
+                max_memory_bytes=int(float(os.getenv("RESEARCH_SESSION_MEMORY_MB", 64)) * 1024 * 1024),
+                max_session_bytes=int(float(os.getenv("RESEARCH_SESSION_CAP_MB", 4)) * 1024 * 1024),
+                ttl=float(os.getenv("RESEARCH_SESSION_TTL_HOURS", 168)) * 3600,
+            )
+        return _session_store
@@ -0,0 +1,200 @@
+"""Speculative first interview turns while the user reviews the analyst team.
+
+After team generation the graph waits at the ``human_feedback`` interrupt, often for
+half a minute or more, while the user reads the proposed analysts. ``speculate`` uses
+that time to run the start of each analyst's first interview turn in the background:
+the opening question, the planned search queries and both retrievals. The calls are
+the ones the interview will make, with the same prompts, so their results land in the
+response cache and the retrieval cache. When the team is approved unchanged, each
+interview starts with its first question, queries and retrieval already done; a
+retrieval still in flight is shared with the interview instead of repeated.
+
+Regenerating or cancelling the team cancels the speculation: queued analysts never
+start, and running ones stop before their next call. Each speculation is capped by
+``RESEARCH_SPECULATION_TOKENS`` (estimated prompt and response tokens) and
+``RESEARCH_SPECULATION_SEARCHES`` (web searches), and records whether its cost was used
+or wasted; ``speculation_stats`` has the process-wide totals.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import get_llm_cache
+from rate_limit import estimate_tokens
+from research_graph import SearchQueries, interview_opening, make_backends, question_messages, search_instructions
+from retrieval_cache import get_retrieval_cache
+
+RUNNING = "running"
+USED = "used"
+WASTED = "wasted"
+
+_stats = {"started": 0, "used": 0, "wasted": 0, "llm_calls": 0, "tokens": 0, "searches": 0,
+          "wasted_tokens": 0, "wasted_searches": 0}
+_stats_lock = threading.Lock()
+
+
+def _record(status: str, tokens: int, searches: int, llm_calls: int):
+    with _stats_lock:
+        _stats["llm_calls"] += llm_calls
+        _stats["tokens"] += tokens
+        _stats["searches"] += searches
+        if status == WASTED:
+            _stats["wasted_tokens"] += tokens
+            _stats["wasted_searches"] += searches
+
+
+class _Stop(Exception):
+    """Cancelled, or the next call would exceed the cost cap"""
+
+
+def _response_tokens(response) -> int:
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("output_tokens", 0)
+    text = response.model_dump_json() if hasattr(response, "model_dump_json") else str(getattr(response, "content", ""))
+    return len(text) // 4
+
+
+class Speculation:
+    """First interview turns for one proposed team, run on ``executor``"""
+
+    def __init__(self, topic: str, analysts: list, backends, executor, max_tokens: int, max_searches: int):
+        self.topic = topic
+        self.analysts = list(analysts)
+        self.backends = backends
+        self.max_tokens = max_tokens
+        self.max_searches = max_searches
+        self.status = RUNNING
+        self.tokens = 0
+        self.searches = 0
+        self.llm_calls = 0
+        # Analysts whose question, queries and retrievals all completed
+        self.prefetched = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = [executor.submit(self._prefetch, analyst) for analyst in self.analysts]
+        with _stats_lock:
+            _stats["started"] += 1
+
+    def _spend(self, tokens: int = 0, searches: int = 0, llm_calls: int = 0):
+        # Caller holds self._lock. Spending after the speculation was settled, by a call
+        # that was already running, goes straight to the totals under its status.
+        self.tokens += tokens
+        self.searches += searches
+        self.llm_calls += llm_calls
+        if self.status != RUNNING:
+            _record(self.status, tokens, searches, llm_calls)
+
+    def _charge_call(self, messages):
+        with self._lock:
+            if self._cancelled.is_set():
+                raise _Stop()
+            estimate = estimate_tokens(messages)
+            if self.tokens + estimate > self.max_tokens:
+                raise _Stop()
+            self._spend(tokens=estimate, llm_calls=1)
+
+    def _charge_search(self):
+        with self._lock:
+            if self._cancelled.is_set() or self.searches >= self.max_searches:
+                raise _Stop()
+            self._spend(searches=1)
+
+    def _invoke(self, messages, schema=None):
+        self._charge_call(messages)
+        response = self.backends.invoke(messages, schema)
+        with self._lock:
+            self._spend(tokens=_response_tokens(response))
+        return response
+
+    def _prefetch(self, analyst):
+        """The calls of the interview's first turn up to the expert's answer"""
+        try:
+            messages = [interview_opening(self.topic)]
+            question = self._invoke(question_messages({"analyst": analyst, "messages": messages}))
+            queries = self._invoke([search_instructions] + messages + [question], SearchQueries)
+            self._charge_search()
+            self.backends.search_web(queries.for_source("web"))
+            if self._cancelled.is_set():
+                return
+            self.backends.search_wikipedia(queries.for_source("encyclopedia"))
+            with self._lock:
+                self.prefetched += 1
+        except _Stop:
+            pass
+        except Exception as e:
+            # The interview makes the same calls again and handles their errors
+            print(f"Speculative prefetch for {analyst.name} failed: {e}")
+
+    @property
+    def done(self) -> bool:
+        return all(future.done() for future in self._futures)
+
+    def _settle(self, status: str):
+        with self._lock:
+            if self.status != RUNNING:
+                return False
+            self.status = status
+            with _stats_lock:
+                _stats[status] += 1
+            _record(status, self.tokens, self.searches, self.llm_calls)
+        return True
+
+    def commit(self):
+        """The team was approved unchanged: the interviews pick up the cached results.
+
+        Unfinished prefetches keep running; an interview that reaches the same call first
+        waits for the in-flight retrieval instead of repeating it.
+        """
+        self._settle(USED)
+
+    def cancel(self):
+        """The team changed or was dropped: stop, and count the cost spent as wasted"""
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+        self._settle(WASTED)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"status": self.status, "analysts": len(self.analysts), "prefetched": self.prefetched,
+                    "llm_calls": self.llm_calls, "tokens": self.tokens, "searches": self.searches}
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(os.getenv("RESEARCH_SPECULATION_WORKERS", "2")),
+                                           thread_name_prefix="speculation")
+        return _executor
+
+
+def speculate(topic: str, analysts: list, llm, tavily_search, wikipedia=None):
+    """Start prefetching the first interview turn of every analyst, or return None.
+
+    Disabled with ``RESEARCH_SPECULATION=0``, and whenever the response or retrieval
+    cache is off, since the interviews could not reuse the results.
+    """
+    if os.getenv("RESEARCH_SPECULATION", "1") == "0" or not analysts:
+        return None
+    if get_llm_cache() is None or get_retrieval_cache() is None:
+        return None
+    return Speculation(
+        topic, analysts, make_backends(llm, tavily_search, wikipedia), _get_executor(),
+        max_tokens=int(os.getenv("RESEARCH_SPECULATION_TOKENS", "12000")),
+        max_searches=int(os.getenv("RESEARCH_SPECULATION_SEARCHES", "6")),
+    )
+
+
+def speculation_stats() -> dict:
+    """Process-wide totals; ``wasted_*`` is the part spent on teams that were not approved.
+
+    Calls still running when a speculation is settled are added as they finish.
+    """
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,14 @@
+"""Tests must not read or fill the real caches, stores or limits"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ["RESEARCH_LLM_CACHE"] = "0"
+os.environ["RESEARCH_RETRIEVAL_CACHE"] = "0"
+os.environ["RESEARCH_ANTHROPIC_RPM"] = "1000000"
+os.environ["RESEARCH_ANTHROPIC_TPM"] = "1000000000"
+os.environ["RESEARCH_TAVILY_RPM"] = "1000000"
+for name in ("RESEARCH_CHECKPOINT_DB", "RESEARCH_TRACE", "RESEARCH_WIKIPEDIA_INDEX"):
+    os.environ.pop(name, None)
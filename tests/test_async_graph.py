@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from benchmarks.fakes import FakeChatModel, FakeTavilySearch, FakeWikipedia
+from research_graph import ConcurrencyLimit, build_research_graph, stream_graph, with_checkpointer
+
+
+def test_limit_holds_across_event_loops():
+    limit = ConcurrencyLimit(3)
+    active = peak = 0
+    lock = threading.Lock()
+
+    async def call():
+        nonlocal active, peak
+        async with limit:
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            with lock:
+                active -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    # Each thread drives its own loop, like stream_graph does per run
+    threads = [threading.Thread(target=asyncio.run, args=(run(),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak == 3
+    assert limit.active == 0 and not limit._waiters
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    limit = ConcurrencyLimit(1)
+
+    async def main():
+        await limit.acquire()
+        waiters = [asyncio.create_task(limit.acquire()) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        waiters[1].cancel()
+        await asyncio.gather(*waiters[:2], return_exceptions=True)
+        limit.release()
+        await asyncio.wait_for(waiters[2], 1)
+        limit.release()
+
+    asyncio.run(main())
+    assert limit.active == 0 and not limit._waiters
+
+
+def test_async_graph_writes_a_report():
+    llm = FakeChatModel(latency=0, max_analysts=2, response_words=20)
+    graph = with_checkpointer(build_research_graph(llm, FakeTavilySearch(latency=0), FakeWikipedia(latency=0),
+                                                   use_async=True, semaphore=ConcurrencyLimit(2)))
+    thread = {"configurable": {"thread_id": "async"}}
+    for _ in stream_graph(graph, {"topic": "Async research", "max_analysts": 2}, thread):
+        pass
+    graph.update_state(thread, {"human_analyst_feedback": None}, as_node="human_feedback")
+    for _ in stream_graph(graph, None, thread):
+        pass
+    state = graph.get_state(thread)
+    assert len(state.values["sections"]) == 2
+    assert state.values["final_report"].startswith("#")
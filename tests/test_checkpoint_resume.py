@@ -0,0 +1,114 @@
+import pytest
+
+from benchmarks.fakes import FakeChatModel, FakeStructuredModel, FakeTavilySearch, FakeWikipedia
+from checkpoint_store import SQLITE_CHECKPOINTS_AVAILABLE, incomplete_runs
+from research_graph import build_research_graph, stream_graph, with_checkpointer
+
+pytestmark = pytest.mark.skipif(not SQLITE_CHECKPOINTS_AVAILABLE, reason="langgraph-checkpoint-sqlite not installed")
+
+THREAD = {"configurable": {"thread_id": "research_1"}}
+OWNER = "a" * 32
+
+
+class CountingModel(FakeChatModel):
+    """Fake model that counts its calls and can fail while the report is written"""
+
+    def __init__(self, fail_report: bool = False):
+        super().__init__(latency=0, max_analysts=2, response_words=20)
+        self.fail_report = fail_report
+        self.calls = 0
+        self.structured_calls = 0
+
+    def invoke(self, messages, config=None, **kwargs):
+        self.calls += 1
+        if self.fail_report and messages[0].content.startswith("You are a technical writer"):
+            raise RuntimeError("process killed")
+        return super().invoke(messages, config, **kwargs)
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        model = self
+
+        class Counting(FakeStructuredModel):
+            def invoke(self, messages, config=None, **kwargs):
+                model.structured_calls += 1
+                return super().invoke(messages, config, **kwargs)
+
+        return Counting(self, schema, include_raw)
+
+
+def open_graph(path, llm):
+    from checkpoint_store import DurableSqliteSaver
+
+    saver = DurableSqliteSaver.open(path)
+    graph = with_checkpointer(build_research_graph(llm, FakeTavilySearch(latency=0), FakeWikipedia(latency=0)), saver)
+    return graph, saver
+
+
+def run(graph, run_input):
+    for _ in stream_graph(graph, run_input, THREAD, stream_mode="updates"):
+        pass
+
+
+def test_interrupted_run_resumes_without_repeating_interviews(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    graph, saver = open_graph(path, CountingModel(fail_report=True))
+    saver.set_owner("research_1", OWNER)
+    run(graph, {"topic": "Resumable research", "max_analysts": 2})
+    graph.update_state(THREAD, {"human_analyst_feedback": None}, as_node="human_feedback")
+    with pytest.raises(RuntimeError, match="process killed"):
+        run(graph, None)
+    saver.conn.close()
+
+    # A new process opens the same database
+    llm = CountingModel()
+    graph, saver = open_graph(path, llm)
+    runs = incomplete_runs(graph, saver, OWNER)
+    assert [r["thread"] for r in runs] == [THREAD]
+    assert runs[0]["topic"] == "Resumable research"
+    assert set(runs[0]["next"]) <= {"write_report", "write_introduction", "write_conclusion"}
+
+    run(graph, None)
+    state = graph.get_state(THREAD)
+    assert not state.next
+    assert len(state.values["sections"]) == 2
+    assert state.values["final_report"]
+    # Only the report writers ran again
+    assert llm.structured_calls == 0
+    assert 1 <= llm.calls <= 3
+    assert incomplete_runs(graph, saver, OWNER) == []
+    saver.conn.close()
+
+
+def test_run_waiting_for_feedback_is_listed(tmp_path):
+    graph, saver = open_graph(str(tmp_path / "checkpoints.sqlite3"), CountingModel())
+    saver.set_owner("research_1", OWNER)
+    run(graph, {"topic": "Awaiting review", "max_analysts": 2})
+    runs = incomplete_runs(graph, saver, OWNER)
+    assert [(r["topic"], r["next"]) for r in runs] == [("Awaiting review", ("human_feedback",))]
+    saver.conn.close()
+
+
+def test_runs_are_listed_only_to_their_owner_and_deleted_with_their_checkpoints(tmp_path):
+    graph, saver = open_graph(str(tmp_path / "checkpoints.sqlite3"), CountingModel())
+    saver.set_owner("research_1", OWNER)
+    run(graph, {"topic": "Private research", "max_analysts": 2})
+    assert incomplete_runs(graph, saver, "b" * 32) == []
+    assert len(incomplete_runs(graph, saver, OWNER)) == 1
+
+    saver.delete_thread("research_1")
+    assert incomplete_runs(graph, saver, OWNER) == []
+    assert saver.conn.execute("SELECT COUNT(*) FROM thread_owners").fetchone() == (0,)
+    assert saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone() == (0,)
+    saver.conn.close()
+
+
+def test_finished_runs_drop_their_checkpoints(tmp_path):
+    from jobs import Job, run_research
+
+    graph, saver = open_graph(str(tmp_path / "checkpoints.sqlite3"), CountingModel())
+    saver.set_owner("research_1", OWNER)
+    run(graph, {"topic": "Finished research", "max_analysts": 2})
+    assert run_research(Job("job"), graph, THREAD)
+    assert saver.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone() == (0,)
+    assert saver.thread_ids(owner=OWNER) == []
+    saver.conn.close()
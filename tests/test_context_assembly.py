@@ -0,0 +1,77 @@
+import context_assembly
+from context_assembly import PassageIndex, PassageIndexRegistry, assemble_context
+
+
+def blob(url: str, body: str) -> str:
+    return f'<Document href="{url}"/>\n{body}\n</Document>'
+
+
+SOLAR = ("Solar panels convert sunlight into electricity using photovoltaic cells made of silicon wafers. "
+         "Output depends on the angle of the panels, the weather and the amount of dust on the glass.")
+WIND = "Wind turbines turn the kinetic energy of moving air into electricity with large rotor blades."
+TIDES = "Tidal power stations capture energy from the rise and fall of ocean tides twice a day."
+
+
+def test_exact_and_near_duplicates_are_indexed_once():
+    index = PassageIndex()
+    index.update([
+        blob("https://a.com", SOLAR),
+        blob("https://b.com", SOLAR),
+        # One word differs
+        blob("https://c.com", SOLAR.replace("silicon", "crystalline")),
+        blob("https://d.com", WIND),
+    ])
+    assert [p.text for p in index.passages] == [SOLAR, WIND]
+
+
+def test_ranks_by_query_terms():
+    index = PassageIndex()
+    index.update([blob("https://a.com", SOLAR), blob("https://b.com", WIND), blob("https://c.com", TIDES)])
+    assert index.search("ocean tides", k=1)[0].text == TIDES
+    assert index.search("wind rotor blades", k=1)[0].text == WIND
+
+
+def test_updates_index_only_new_blobs():
+    index = PassageIndex()
+    context = [blob("https://a.com", SOLAR)]
+    index.update(context)
+    context = context + [blob("https://b.com", WIND), blob("https://a.com", SOLAR)]
+    assert index.extends(context)
+    index.update(context)
+    assert index.blob_count == 3
+    assert len(index) == 2
+    assert not index.extends(context[:2] + [blob("https://c.com", TIDES)])
+    assert not index.extends(context[:2])
+    # Every indexed blob is compared, not only the first and last
+    assert not index.extends([context[0], blob("https://c.com", TIDES), context[2]])
+    assert not index.update([context[0], blob("https://c.com", TIDES), context[2], context[1]])
+    assert index.blob_count == 3
+
+
+def test_registry_reuses_the_index_of_a_growing_context():
+    registry = PassageIndexRegistry()
+    context = [blob("https://a.com", SOLAR)]
+    index = registry.get("Ada", context)
+    assert registry.get("Ada", context + [blob("https://b.com", WIND)]) is index
+    assert registry.get("Grace", context) is not index
+    # A different history with the same first blob starts over
+    assert registry.get("Ada", context + [blob("https://c.com", TIDES)]) is not index
+
+
+def test_ranking_covers_only_the_callers_blobs(monkeypatch):
+    registry = PassageIndexRegistry()
+    monkeypatch.setattr(context_assembly, "passage_indexes", registry)
+    shared = [blob("https://a.com", SOLAR)]
+    index = registry.get("Ada", shared)
+    # A second run with the same history extends the index past the first run's context
+    assert registry.get("Ada", shared + [blob("https://b.com", WIND)]) is index
+    assert [p.text for p in index.rank("wind", blobs=len(shared))] == [SOLAR]
+    assert WIND not in assemble_context(shared, "wind", token_budget=1000, scope="Ada")
+
+
+def test_assembled_context_fits_the_budget_and_keeps_sources():
+    context = [blob("https://a.com", SOLAR), blob("https://b.com", WIND), blob("https://c.com", TIDES)]
+    assembled = assemble_context(context, "tidal energy from ocean tides", token_budget=40, scope="test budget")
+    assert assembled.startswith('<Document href="https://c.com"/>')
+    assert TIDES in assembled and WIND not in assembled
+    assert assemble_context(context, "anything", token_budget=0) is context
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from langgraph.errors import GraphInterrupt
+
+import research_graph
+from research_graph import Analyst, aisolated_interview, isolated_interview
+
+ANALYST = Analyst(affiliation="Institute", name="Ada", role="Economist", description="Labour markets")
+
+
+class FlakyInterview:
+    """Interview subgraph that fails ``failures`` times before it succeeds"""
+
+    def __init__(self, failures: int, error: Exception = None):
+        self.failures = failures
+        self.error = error or RuntimeError("overloaded")
+        self.calls = 0
+
+    def _run(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return {"sections": ["section"]}
+
+    def invoke(self, state, config):
+        return self._run()
+
+    async def ainvoke(self, state, config):
+        return self._run()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(research_graph, "backoff_delay", lambda attempt, error: 0)
+
+
+def test_retries_until_the_interview_succeeds():
+    interview = FlakyInterview(failures=1)
+    assert isolated_interview(interview, max_attempts=2)({"analyst": ANALYST}, {}) == {"sections": ["section"]}
+    assert interview.calls == 2
+
+
+def test_records_the_analyst_when_attempts_run_out():
+    interview = FlakyInterview(failures=5)
+    result = isolated_interview(interview, max_attempts=3)({"analyst": ANALYST}, {})
+    assert result == {"failed_analysts": [{"name": "Ada", "error": "RuntimeError: overloaded"}]}
+    assert interview.calls == 3
+
+
+@pytest.mark.parametrize("max_attempts", [0, -1])
+def test_at_least_one_attempt(max_attempts):
+    interview = FlakyInterview(failures=5)
+    result = isolated_interview(interview, max_attempts=max_attempts)({"analyst": ANALYST}, {})
+    assert result["failed_analysts"][0]["name"] == "Ada"
+    assert interview.calls == 1
+
+
+def test_interrupts_are_not_retried():
+    interview = FlakyInterview(failures=1, error=GraphInterrupt())
+    with pytest.raises(GraphInterrupt):
+        isolated_interview(interview, max_attempts=3)({"analyst": ANALYST}, {})
+    assert interview.calls == 1
+
+
+def test_async_retries_and_records_failures():
+    interview = FlakyInterview(failures=1)
+    conduct = aisolated_interview(interview, max_attempts=2)
+    assert asyncio.run(conduct({"analyst": ANALYST}, {})) == {"sections": ["section"]}
+
+    interview = FlakyInterview(failures=5)
+    conduct = aisolated_interview(interview, max_attempts=0)
+    assert asyncio.run(conduct({"analyst": ANALYST}, {}))["failed_analysts"][0]["name"] == "Ada"
+    assert interview.calls == 1
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import pytest
+
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobExecutor, QueueFullError
+
+
+def blocked(job, gate: threading.Event):
+    gate.wait(5)
+    return job.id
+
+
+def wait(job, status=None):
+    deadline = time.time() + 5
+    while not (job.status == status if status else job.done) and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_submit_raises_once_workers_and_queue_are_full():
+    executor = JobExecutor(workers=1, max_queued=1)
+    gate = threading.Event()
+    try:
+        running = executor.submit(blocked, gate)
+        queued = executor.submit(blocked, gate)
+        wait(running, RUNNING)
+        with pytest.raises(QueueFullError):
+            executor.submit(blocked, gate)
+        assert queued.status == QUEUED
+        assert executor.stats() == {"running": 1, "queued": 1, "capacity": 2}
+    finally:
+        gate.set()
+    assert wait(running).status == DONE and running.result == running.id
+    wait(queued)
+    # Finished jobs free their slots
+    assert wait(executor.submit(blocked, gate)).status == DONE
+
+
+def test_failures_are_kept_on_the_job():
+    executor = JobExecutor(workers=1, max_queued=0)
+
+    def failing(job):
+        raise RuntimeError("run failed")
+
+    job = wait(executor.submit(failing, topic="Broken"))
+    assert job.status == FAILED and isinstance(job.snapshot()["error"], RuntimeError)
+    assert executor.get(job.id) is job and job.topic == "Broken"
+
+
+def test_finished_jobs_are_forgotten_after_retention():
+    executor = JobExecutor(workers=1, max_queued=0, retention=60)
+    old = wait(executor.submit(lambda job: "report"))
+    recent = wait(executor.submit(lambda job: "report"))
+    old.finished -= 120
+    wait(executor.submit(lambda job: "next"))
+    assert executor.get(old.id) is None
+    assert executor.get(recent.id) is recent
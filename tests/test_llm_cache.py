@@ -0,0 +1,151 @@
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from llm_cache import CachedChatModel, MemoryResponseCache, TieredResponseCache, make_cache_key
+
+
+class Answer(BaseModel):
+    text: str
+
+
+class OtherAnswer(BaseModel):
+    text: str
+
+
+class CountingModel:
+    model = "counting-model"
+
+    def __init__(self, temperature=0):
+        self.temperature = temperature
+        self.calls = 0
+
+    def invoke(self, messages, config=None, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"reply {self.calls}")
+
+    def with_structured_output(self, schema, **kwargs):
+        model = self
+
+        class Structured:
+            def invoke(self, messages, config=None, **kwargs):
+                model.calls += 1
+                return schema(text=f"parsed {model.calls}")
+
+        return Structured()
+
+
+MESSAGES = [SystemMessage(content="You are an analyst"), HumanMessage(content="Summarize the topic")]
+
+
+def test_key_ignores_message_ids():
+    with_ids = [SystemMessage(content="You are an analyst", id="a"), HumanMessage(content="Summarize the topic", id="b")]
+    assert make_cache_key("m", 0, None, MESSAGES) == make_cache_key("m", 0, None, with_ids)
+
+
+def test_key_covers_model_temperature_schema_and_messages():
+    base = make_cache_key("m", 0, None, MESSAGES)
+    assert make_cache_key("other", 0, None, MESSAGES) != base
+    assert make_cache_key("m", 0.5, None, MESSAGES) != base
+    assert make_cache_key("m", 0, Answer, MESSAGES) != base
+    assert make_cache_key("m", 0, Answer, MESSAGES) != make_cache_key("m", 0, OtherAnswer, MESSAGES)
+    assert make_cache_key("m", 0, None, MESSAGES[:1]) != base
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryResponseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryResponseCache(max_age=60)
+    cache._store("old", 1, created=time.time() - 120)
+    assert cache.get("old") is None
+    assert len(cache) == 0
+
+
+def test_tiered_cache_serves_from_disk_after_restart(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    TieredResponseCache(path).put("key", {"content": "cached"})
+    cache = TieredResponseCache(path)
+    assert cache.get("key") == {"content": "cached"}
+    assert cache.get("key") == {"content": "cached"}
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+
+
+def test_tiered_cache_evicts_least_recently_used_rows_by_size(tmp_path):
+    value = "x" * 100
+    # Room for two values
+    cache = TieredResponseCache(str(tmp_path / "llm.sqlite3"), max_memory_entries=1, max_bytes=250)
+    cache.put("a", value)
+    time.sleep(0.01)
+    cache.put("b", value)
+    time.sleep(0.01)
+    # Reading "a" from disk makes "b" the least recently used row
+    cache.memory.clear()
+    assert cache.get("a") == value
+    time.sleep(0.01)
+    cache.put("c", value)
+    cache.memory.clear()
+    assert cache.get("b") is None
+    assert cache.get("a") == value and cache.get("c") == value
+    assert cache.stats()["disk_entries"] == 2
+
+
+def test_tiered_cache_drops_expired_rows(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    TieredResponseCache(path).put("key", "value")
+    time.sleep(0.05)
+    cache = TieredResponseCache(path, max_age=0.01)
+    assert cache.stats()["disk_entries"] == 0
+    assert cache.get("key") is None
+
+
+def test_cached_model_replays_deterministic_calls():
+    llm = CountingModel()
+    model = CachedChatModel(llm, MemoryResponseCache())
+    first = model.invoke(MESSAGES)
+    assert model.invoke(MESSAGES).content == first.content
+    assert model.with_structured_output(Answer).invoke(MESSAGES).text == "parsed 2"
+    assert model.with_structured_output(Answer).invoke(MESSAGES).text == "parsed 2"
+    assert llm.calls == 2
+
+
+def test_cached_model_skips_sampled_calls():
+    llm = CountingModel(temperature=0.7)
+    model = CachedChatModel(llm, MemoryResponseCache())
+    model.invoke(MESSAGES)
+    model.invoke(MESSAGES)
+    assert llm.calls == 2
+
+    llm = CountingModel(temperature=0.7)
+    model = CachedChatModel(llm, MemoryResponseCache(), cache_nondeterministic=True)
+    model.invoke(MESSAGES)
+    model.invoke(MESSAGES)
+    assert llm.calls == 1
+
+
+def test_tiered_cache_sweeps_only_when_full(tmp_path, monkeypatch):
+    cache = TieredResponseCache(str(tmp_path / "llm.sqlite3"), max_memory_entries=1, max_bytes=1000)
+    sweeps = []
+    prune = cache.prune
+    monkeypatch.setattr(cache, "prune", lambda: sweeps.append(1) or prune())
+    for n in range(8):
+        cache.put(f"key {n}", "x" * 100)
+    cache.put("key 0", "x" * 50)
+    assert not sweeps
+    (total,) = cache._conn.execute("SELECT SUM(size) FROM responses").fetchone()
+    assert cache._disk_bytes == total
+    # Crossing the limit sweeps down below it, leaving room for the next writes
+    cache.put("key 8", "x" * 300)
+    assert len(sweeps) == 1 and cache._disk_bytes <= 900
+    cache.put("key 9", "x" * 10)
+    assert len(sweeps) == 1
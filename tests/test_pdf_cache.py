@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from pdf_cache import PdfCache, make_pdf_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PdfCache(str(tmp_path / "pdf.sqlite3"))
+
+
+class Renderer:
+    def __init__(self, used="weasyprint", delay=0.0):
+        self.used = used
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return b"%PDF " + str(self.calls).encode(), self.used
+
+
+def test_concurrent_downloads_render_once(cache):
+    render = Renderer(delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render("report", "topic", "weasyprint", render)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert render.calls == 1
+    assert results == [b"%PDF 1"] * 4
+    assert cache.stats()["renders"] == 1
+    assert not cache._rendering
+
+
+def test_keys_cover_renderer_topic_and_content():
+    base = make_pdf_key("report", "topic", "weasyprint")
+    assert make_pdf_key("report", "topic", "reportlab") != base
+    assert make_pdf_key("report", "other", "weasyprint") != base
+    assert make_pdf_key("other", "topic", "weasyprint") != base
+    assert make_pdf_key("report", "topic", "weasyprint", fallback=True) != base
+
+
+def test_fallback_renders_are_reused_but_not_stored_as_expected(cache):
+    render = Renderer(used="reportlab")
+    assert cache.get_or_render("report", "topic", "weasyprint", render) == b"%PDF 1"
+    assert cache.get_or_render("report", "topic", "weasyprint", render) == b"%PDF 1"
+    assert render.calls == 1
+    assert cache.get(make_pdf_key("report", "topic", "weasyprint")) is None
+
+
+def test_failed_renders_release_the_key(cache):
+    def failing():
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_render("report", "topic", "weasyprint", failing)
+    assert not cache._rendering
+    assert cache.get_or_render("report", "topic", "weasyprint", Renderer()) == b"%PDF 1"
+
+
+def test_disk_survives_restart_and_is_pruned_only_when_full(tmp_path, monkeypatch):
+    path = str(tmp_path / "pdf.sqlite3")
+    PdfCache(path).put("a", b"x" * 100)
+    cache = PdfCache(path, max_memory_bytes=0, max_bytes=1000)
+    assert cache.get("a") == b"x" * 100
+    sweeps = []
+    prune = cache.prune
+    monkeypatch.setattr(cache, "prune", lambda: sweeps.append(1) or prune())
+    for n in range(8):
+        cache.put(f"key {n}", b"x" * 100)
+    assert not sweeps and cache._disk_bytes == 900
+    cache.put("key 8", b"x" * 300)
+    assert len(sweeps) == 1 and cache._disk_bytes <= 900
+    assert cache.get("a") is None
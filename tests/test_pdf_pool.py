@@ -0,0 +1,23 @@
+import multiprocessing
+import time
+
+import pytest
+
+import report_pdf
+from report_pdf import PdfRenderError, PdfRenderPool
+
+
+def hang(content, topic, title):
+    # Runs in a worker process
+    time.sleep(60)
+
+
+def test_timed_out_render_leaves_no_worker_behind(monkeypatch):
+    monkeypatch.setattr(report_pdf, "_render_part", hang)
+    pool = PdfRenderPool(workers=2, timeout=0.5)
+    start = time.monotonic()
+    with pytest.raises(PdfRenderError):
+        pool.render("# Report\n\nText", "topic")
+    assert time.monotonic() - start < 30
+    assert pool._pool is None
+    assert not multiprocessing.active_children()
@@ -0,0 +1,62 @@
+import json
+
+from benchmarks.fakes import FakeChatModel, FakeTavilySearch, FakeWikipedia
+from progress import INTERVIEW_NODE, PROGRESS_STREAM_MODE, ProgressTracker, describe_analyst
+from research_graph import build_research_graph, stream_graph, with_checkpointer
+
+THREAD = {"configurable": {"thread_id": "research_progress"}}
+
+
+def run_tracked(tracker):
+    llm = FakeChatModel(latency=0, max_analysts=2, response_words=20)
+    graph = with_checkpointer(build_research_graph(llm, FakeTavilySearch(latency=0), FakeWikipedia(latency=0)))
+    for _ in stream_graph(graph, {"topic": "Tracked research", "max_analysts": 2}, THREAD):
+        pass
+    graph.update_state(THREAD, {"human_analyst_feedback": None}, as_node="human_feedback")
+    for namespace, mode, event in stream_graph(graph, None, THREAD, subgraphs=True,
+                                               stream_mode=["updates", PROGRESS_STREAM_MODE]):
+        if mode == PROGRESS_STREAM_MODE:
+            tracker.feed(namespace, event)
+    tracker.close()
+
+
+def test_tracker_follows_each_interview_to_the_end():
+    tracker = ProgressTracker(run_id="research_progress")
+    run_tracked(tracker)
+    snapshot = tracker.snapshot()
+    assert snapshot["stage"] == ""
+    assert len(snapshot["analysts"]) == 2
+    for analyst in snapshot["analysts"]:
+        # Interviews default to two question/answer turns
+        assert analyst["status"] == "done" and analyst["turns"] == 2
+        assert describe_analyst(analyst).startswith(f"{analyst['name']}: done after 2 turns")
+    assert snapshot["timings"][INTERVIEW_NODE]["count"] == 2
+    assert snapshot["timings"]["answer_question"]["count"] == 4
+    assert snapshot["timings"]["finalize_report"]["count"] == 1
+
+
+def test_log_has_one_start_and_end_per_node(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    tracker = ProgressTracker(run_id="research_progress", log_path=str(path))
+    run_tracked(tracker)
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    starts = [record for record in records if record["event"] == "start"]
+    ends = [record for record in records if record["event"] == "end"]
+    assert len(starts) == len(ends) > 0
+    assert {record["run"] for record in records} == {"research_progress"}
+    answers = [record for record in ends if record["node"] == "answer_question"]
+    assert sorted(record["turn"] for record in answers) == [1, 1, 2, 2]
+    assert all(record["analyst"] for record in answers)
+
+
+def test_failed_node_marks_the_interview_as_retrying():
+    tracker = ProgressTracker()
+    analyst = type("Analyst", (), {"name": "Ada"})()
+    tracker.feed((), {"id": "t1", "name": INTERVIEW_NODE, "input": {"analyst": analyst}})
+    namespace = (f"{INTERVIEW_NODE}:t1",)
+    tracker.feed(namespace, {"id": "q1", "name": "ask_question", "input": {"messages": ["topic"]}})
+    assert tracker.stage() == "Conducting expert interviews"
+    tracker.feed(namespace, {"id": "q1", "name": "ask_question", "error": "timed out", "result": []})
+    progress, = tracker.snapshot()["analysts"]
+    assert progress["status"] == "retrying"
+    assert describe_analyst(progress).startswith("Ada: turn 1, retrying after an error")
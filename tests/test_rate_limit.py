@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+
+import rate_limit
+from rate_limit import (ProviderLimiter, RateLimitError, RetriesExhaustedError, acall_with_retry, backoff_delay,
+                        call_with_retry)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+class Flaky:
+    def __init__(self, errors: list):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rate_limit, "backoff_delay", lambda attempt, error: 0)
+
+
+@pytest.fixture
+def limiter():
+    return ProviderLimiter("test", requests_per_minute=1000000)
+
+
+def test_retries_retryable_errors(limiter):
+    fn = Flaky([StatusError(429), StatusError(529)])
+    assert call_with_retry(limiter, fn, max_retries=2) == "ok"
+    stats = limiter.stats()
+    assert fn.calls == 3
+    assert stats["retries"] == 2 and stats["throttled"] == 1
+    assert stats["rate_scale"] < 1.0
+
+
+def test_gives_up_after_max_retries(limiter):
+    fn = Flaky([StatusError(429)] * 5)
+    with pytest.raises(RateLimitError) as raised:
+        call_with_retry(limiter, fn, max_retries=1)
+    assert raised.value.attempts == 2 and fn.calls == 2
+    assert limiter.stats()["retries"] == 1
+
+
+def test_exhausted_server_errors_are_not_rate_limits(limiter):
+    fn = Flaky([StatusError(503)] * 5)
+    with pytest.raises(RetriesExhaustedError) as raised:
+        call_with_retry(limiter, fn, max_retries=1)
+    assert not isinstance(raised.value, RateLimitError)
+    assert raised.value.cause.status_code == 503 and raised.value.attempts == 2
+    assert limiter.stats()["throttled"] == 0
+
+    async def afn():
+        return fn()
+
+    fn = Flaky([TimeoutError("request timed out")] * 5)
+    with pytest.raises(RetriesExhaustedError) as raised:
+        asyncio.run(acall_with_retry(limiter, afn, max_retries=1))
+    assert not isinstance(raised.value, RateLimitError)
+
+
+def test_other_errors_are_not_retried(limiter):
+    fn = Flaky([StatusError(400)])
+    with pytest.raises(StatusError):
+        call_with_retry(limiter, fn, max_retries=3)
+    assert fn.calls == 1
+
+
+def test_async_retries(limiter):
+    fn = Flaky([StatusError(429)])
+
+    async def afn():
+        return fn()
+
+    assert asyncio.run(acall_with_retry(limiter, afn, max_retries=1)) == "ok"
+    assert limiter.stats()["retries"] == 1
+
+
+def test_retries_are_counted_across_threads(limiter):
+    def worker():
+        for _ in range(200):
+            call_with_retry(limiter, Flaky([StatusError(503)]), max_retries=1)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert limiter.stats()["retries"] == 800
+
+
+def test_backoff_honors_retry_after():
+    assert backoff_delay(0, StatusError(429, {"retry-after": "7"})) >= 7
+    assert backoff_delay(0, StatusError(429, {"retry-after-ms": "2500"})) >= 2.5
+    assert 0.5 <= backoff_delay(0, StatusError(429)) <= 1.0
@@ -0,0 +1,54 @@
+from benchmarks.fakes import FakeChatModel, FakeStructuredModel
+from research_graph import Analyst, Perspectives, make_backends, replace_analysts
+
+
+def analyst(name: str) -> Analyst:
+    return Analyst(affiliation=f"{name} Institute", name=name, role=f"{name} role", description=f"{name} focus")
+
+
+TEAM = [analyst("Ada"), analyst("Grace"), analyst("Alan")]
+
+
+class TeamModel(FakeChatModel):
+    """Fake model that generates ``count`` new analysts and records the prompts it saw"""
+
+    def __init__(self, count: int):
+        super().__init__(latency=0)
+        self.count = count
+        self.prompts = []
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        model = self
+
+        class Generated(FakeStructuredModel):
+            def _parsed(self, messages):
+                model.prompts.append(messages[0].content)
+                return Perspectives(analysts=[analyst(f"New {i}") for i in range(model.count)])
+
+        return Generated(self, schema, include_raw)
+
+
+def test_pinned_analysts_keep_their_places():
+    llm = TeamModel(count=2)
+    team = replace_analysts(make_backends(llm, None), "Solar power", TEAM, pinned={1}, feedback="More economists")
+    assert team[1] is TEAM[1]
+    assert [member.name for member in team] == ["New 0", "Grace", "New 1"]
+    prompt, = llm.prompts
+    kept, replaced = prompt.split("These analysts are being replaced:")
+    assert "Name: Grace" in kept and "Name: Ada" not in kept
+    assert "Name: Ada" in replaced and "Name: Alan" in replaced and "Name: Grace" not in replaced
+    assert "More economists" in replaced and "exactly 2 new analysts" in replaced
+    assert TEAM == [analyst("Ada"), analyst("Grace"), analyst("Alan")]
+
+
+def test_fully_pinned_team_skips_the_model():
+    llm = TeamModel(count=3)
+    team = replace_analysts(make_backends(llm, None), "Solar power", TEAM, pinned={0, 1, 2})
+    assert team == TEAM and team is not TEAM
+    assert not llm.prompts
+
+
+def test_unfilled_slots_keep_their_analysts():
+    llm = TeamModel(count=1)
+    team = replace_analysts(make_backends(llm, None), "Solar power", TEAM, pinned=set())
+    assert [member.name for member in team] == ["New 0", "Grace", "Alan"]
@@ -0,0 +1,60 @@
+from report_blocks import CITATION, HEADING, LIST, PARAGRAPH, parse_report, plain_text
+from report_pdf import report_html
+
+REPORT = """# Solar power
+
+## Introduction
+Panels are **cheap** and *getting cheaper* [1], see [the survey](https://a.com/survey).
+Output drops when panels are < 20° from the sun & dusty: https://b.com/angle.
+
+- Silicon cells
+- Thin film with *perovskite*
+  layers on top
+1. Install
+2) Maintain
+
+---
+
+[1] https://example.com/prices
+[2] Solar survey https://example.com/survey
+
+*Research completed using multi-agent AI analysis with real-time web search.*
+"""
+
+
+def test_blocks_cover_headings_paragraphs_lists_and_citations():
+    blocks = parse_report(REPORT)
+    assert [(block.kind, block.level) for block in blocks[:2]] == [(HEADING, 1), (HEADING, 2)]
+    assert blocks[2].kind == PARAGRAPH
+    assert [(block.kind, block.ordered, len(block.items)) for block in blocks[3:5]] == [(LIST, False, 2), (LIST, True, 2)]
+    assert blocks[3].items[1] == "Thin film with <i>perovskite</i> layers on top"
+    assert [block.kind for block in blocks[5:]] == [CITATION, CITATION]
+    assert blocks[5].text == '[1] <a href="https://example.com/prices">https://example.com/prices</a>'
+
+
+def test_inline_markup_is_converted_and_text_escaped():
+    paragraph = parse_report(REPORT)[2].text
+    assert paragraph.startswith("Panels are <b>cheap</b> and <i>getting cheaper</i> [1], "
+                                'see <a href="https://a.com/survey">the survey</a>.')
+    assert "&lt; 20° from the sun &amp; dusty" in paragraph
+    assert paragraph.endswith('<a href="https://b.com/angle">https://b.com/angle</a>.')
+
+
+def test_footer_and_separators_are_dropped():
+    text = plain_text(parse_report(REPORT))
+    assert "Research completed" not in text and "---" not in text
+
+
+def test_plain_text_keeps_link_targets_without_markup():
+    text = plain_text(parse_report(REPORT))
+    assert "Panels are cheap and getting cheaper [1], see the survey (https://a.com/survey)." in text
+    assert "< 20° from the sun & dusty: https://b.com/angle." in text
+    assert "- Silicon cells\n- Thin film with perovskite layers on top\n1. Install\n2. Maintain" in text
+    assert "*" not in text and "<a" not in text
+
+
+def test_html_uses_the_blocks():
+    document = report_html(REPORT, "Solar <power>")
+    assert "<title>Research Report: Solar &lt;power&gt;</title>" in document
+    assert "<ul><li>Silicon cells</li>" in document and "<ol><li>Install</li><li>Maintain</li></ol>" in document
+    assert '<p class="sources">[2] Solar survey <a href="https://example.com/survey">' in document
@@ -0,0 +1,190 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from retrieval_cache import RetrievalCache, normalize_query
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RetrievalCache(str(tmp_path / "retrieval.sqlite3"))
+
+
+def test_normalized_queries_share_an_entry(cache):
+    assert normalize_query("  What is  RLHF? ") == "what is rlhf"
+    calls = []
+    assert cache.get_or_fetch("tavily", "What is RLHF?", lambda: calls.append(1) or ["result"]) == ["result"]
+    assert cache.get_or_fetch("tavily", "what is rlhf", lambda: calls.append(1) or ["other"]) == ["result"]
+    assert cache.get_or_fetch("wikipedia", "what is rlhf", lambda: calls.append(1) or ["other"]) == ["other"]
+    assert len(calls) == 2
+    assert cache.stats()["hits"] == 1
+
+
+def test_results_expire_per_source(tmp_path):
+    cache = RetrievalCache(str(tmp_path / "retrieval.sqlite3"), ttls={"tavily": 0.01})
+    cache.put("tavily", "query", ["web"])
+    cache.put("wikipedia", "query", ["article"])
+    time.sleep(0.05)
+    assert cache.get("tavily", "query") is None
+    assert cache.get("wikipedia", "query") == ["article"]
+
+
+def test_memory_tier_is_bounded_and_disk_survives_restart(tmp_path):
+    path = str(tmp_path / "retrieval.sqlite3")
+    cache = RetrievalCache(path, max_memory_entries=2)
+    for n in range(5):
+        cache.put("tavily", f"query {n}", [n])
+    assert len(cache._memory) == 2
+    assert RetrievalCache(path).get("tavily", "query 0") == [0]
+
+
+def test_disk_is_pruned_by_size(tmp_path):
+    value = ["x" * 100]
+    cache = RetrievalCache(str(tmp_path / "retrieval.sqlite3"), max_bytes=250)
+    for n in range(4):
+        cache.put("tavily", f"query {n}", value)
+        time.sleep(0.01)
+    (rows,) = cache._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+    assert rows == 2
+    cache._memory.clear()
+    assert cache.get("tavily", "query 0") is None
+    assert cache.get("tavily", "query 3") == value
+
+
+def test_files_without_size_columns_are_migrated(tmp_path):
+    path = str(tmp_path / "retrieval.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (source TEXT NOT NULL, query TEXT NOT NULL, value TEXT NOT NULL, "
+                 "latency REAL NOT NULL, created REAL NOT NULL, PRIMARY KEY (source, query))")
+    conn.execute("INSERT INTO results VALUES ('wikipedia', 'query', '[1]', 0.5, ?)", (time.time(),))
+    conn.commit()
+    conn.close()
+    assert RetrievalCache(path).get("wikipedia", "query") == [1]
+
+
+def test_concurrent_callers_share_one_fetch(cache):
+    calls = []
+    started = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return ["shared"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("tavily", "q", fetch)))
+               for _ in range(3)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [["shared"]] * 3
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 2
+
+
+def test_async_callers_on_different_loops_share_one_fetch(cache):
+    calls = []
+
+    async def afetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return ["shared"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(cache.aget_or_fetch("tavily", "q", afetch))))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [["shared"]] * 3
+    assert len(calls) == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(cache):
+    async def main():
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("search failed")
+
+        results = await asyncio.gather(*(cache.aget_or_fetch("tavily", "q", failing) for _ in range(2)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        async def working():
+            return ["ok"]
+
+        assert await cache.aget_or_fetch("tavily", "q", working) == ["ok"]
+
+    asyncio.run(main())
+
+
+def test_waiters_fetch_themselves_when_the_leader_is_cancelled(cache):
+    async def main():
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def fast():
+            return ["waiter"]
+
+        leader = asyncio.create_task(cache.aget_or_fetch("tavily", "q", slow))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.aget_or_fetch("tavily", "q", fast))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await asyncio.wait_for(waiter, 1) == ["waiter"]
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+
+
+def test_disk_writes_do_not_block_memory_lookups(cache):
+    cache.put("tavily", "cached", ["memory"])
+    with cache._db_lock:
+        writer = threading.Thread(target=cache.put, args=("tavily", "slow", ["disk"]))
+        writer.start()
+        time.sleep(0.05)
+        # The writer waits on SQLite but the memory tier stays available
+        assert cache._lock.acquire(timeout=1)
+        cache._lock.release()
+        assert cache.get("tavily", "cached") == ["memory"]
+    writer.join()
+    assert cache.get("tavily", "slow") == ["disk"]
+
+
+def test_async_disk_lookups_run_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "retrieval.sqlite3")
+    RetrievalCache(path).put("wikipedia", "q", ["article"])
+    cache = RetrievalCache(path)
+    threads = []
+    read = cache._read
+    cache._read = lambda key: threads.append(threading.get_ident()) or read(key)
+
+    async def afetch():
+        raise AssertionError("served from disk")
+
+    assert asyncio.run(cache.aget_or_fetch("wikipedia", "q", afetch)) == ["article"]
+    assert threads and threads[0] != threading.get_ident()
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 0
+
+
+def test_disk_is_swept_only_when_full(tmp_path, monkeypatch):
+    cache = RetrievalCache(str(tmp_path / "retrieval.sqlite3"), max_bytes=1000)
+    sweeps = []
+    prune = cache.prune
+    monkeypatch.setattr(cache, "prune", lambda: sweeps.append(1) or prune())
+    for n in range(8):
+        cache.put("tavily", f"query {n}", ["x" * 100])
+    assert not sweeps
+    (total,) = cache._conn.execute("SELECT SUM(size) FROM results").fetchone()
+    assert cache._disk_bytes == total
+    cache.put("tavily", "query 8", ["x" * 300])
+    assert len(sweeps) == 1 and cache._disk_bytes <= 900
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+
+import session_store
+from checkpoint_store import SQLITE_CHECKPOINTS_AVAILABLE
+from session_store import SessionStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+
+def test_texts_are_kept_on_disk_past_the_memory_cap(path):
+    store = SessionStore(path, max_memory_bytes=250, max_session_bytes=1000)
+    refs = [store.put("a", str(n) * 100, kind="report") for n in range(3)]
+    assert refs[0].startswith("report-")
+    assert store.stats()["memory_bytes"] == 200
+    # The least recently used text was evicted from memory but not from disk
+    assert store.get("a", refs[0]) == "0" * 100
+    assert store.disk_hits == 1
+    assert store.get("a", refs[0]) == "0" * 100
+    assert store.memory_hits == 1
+
+
+def test_one_session_cannot_evict_the_others(path):
+    store = SessionStore(path, max_memory_bytes=1000, max_session_bytes=250)
+    quiet = store.put("quiet", "q" * 100)
+    for n in range(5):
+        store.put("busy", str(n) * 100)
+    assert store._session_bytes == {"quiet": 100, "busy": 200}
+    assert store.get("quiet", quiet) == "q" * 100 and store.memory_hits == 1
+    # Texts over the per-session cap stay on disk only
+    big = store.put("quiet", "x" * 300)
+    assert store._session_bytes["quiet"] == 100
+    assert store.get("quiet", big) == "x" * 300 and store.disk_hits == 1
+
+
+def test_sessions_are_isolated(path):
+    store = SessionStore(path)
+    ref = store.put("a", "report")
+    assert store.get("b", ref) is None
+
+
+def test_idle_sessions_are_pruned(path):
+    store = SessionStore(path, ttl=3600)
+    old = store.put("old", "stale report")
+    new = store.put("new", "fresh report")
+    store._conn.execute("UPDATE sessions SET accessed = ? WHERE session = 'old'", (time.time() - 7200,))
+    assert store.prune() == 1
+    assert store.get("old", old) is None
+    assert store.get("new", new) == "fresh report"
+    assert store.stats()["sessions"] == 1
+
+
+def test_put_prunes_once_per_interval(path, monkeypatch):
+    store = SessionStore(path)
+    sweeps = []
+    monkeypatch.setattr(store, "prune", lambda: sweeps.append(1))
+    store._pruned = time.time()
+    store.put("a", "one")
+    assert not sweeps
+    store._pruned -= session_store.PRUNE_INTERVAL + 1
+    store.put("a", "two")
+    assert sweeps == [1]
+
+
+@pytest.mark.skipif(not SQLITE_CHECKPOINTS_AVAILABLE, reason="langgraph-checkpoint-sqlite not installed")
+def test_dropping_a_session_deletes_its_checkpoints(path):
+    store = SessionStore(path)
+    checkpointer = store.checkpointer()
+    config = {"configurable": {"thread_id": "research_1", "checkpoint_ns": ""}}
+    checkpointer.put(config, empty_checkpoint(), {}, {})
+    store.add_thread("a", "research_1")
+    ref = store.put("a", "report")
+    store.drop_session("a")
+    assert checkpointer.get_tuple(config) is None
+    assert store.get("a", ref) is None
+    assert store.stats()["threads"] == 0 and not store._memory
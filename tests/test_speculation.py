@@ -0,0 +1,121 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from research_graph import Analyst, SearchQueries
+from speculation import USED, WASTED, Speculation, speculation_stats
+
+ANALYSTS = [Analyst(affiliation="Institute", name=f"Analyst {i}", role="Role", description="Focus") for i in range(2)]
+
+
+class GatedBackends:
+    """Backends whose model calls wait for ``gate`` so a test can settle mid-call"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.calls = 0
+        self.searches = []
+
+    def invoke(self, messages, schema=None):
+        self.calls += 1
+        self.gate.wait(5)
+        if schema is SearchQueries:
+            return SearchQueries(web_query="web query", encyclopedia_query="encyclopedia query")
+        return AIMessage(content="What changed?", usage_metadata={"input_tokens": 10, "output_tokens": 7,
+                                                                  "total_tokens": 17})
+
+    def search_web(self, query):
+        self.searches.append(("web", query))
+
+    def search_wikipedia(self, query):
+        self.searches.append(("wikipedia", query))
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def start(executor, backends, max_tokens=100000, max_searches=10):
+    return Speculation("Topic", ANALYSTS, backends, executor, max_tokens=max_tokens, max_searches=max_searches)
+
+
+def wait(speculation):
+    for future in speculation._futures:
+        future.result(5)
+
+
+def delta(before: dict) -> dict:
+    after = speculation_stats()
+    return {key: after[key] - before[key] for key in after}
+
+
+def test_prefetches_the_first_turn_of_every_analyst(executor):
+    backends = GatedBackends()
+    backends.gate.set()
+    speculation = start(executor, backends)
+    wait(speculation)
+    snapshot = speculation.snapshot()
+    assert snapshot["prefetched"] == 2
+    assert snapshot["llm_calls"] == backends.calls == 4
+    assert sorted(backends.searches) == [("web", "web query")] * 2 + [("wikipedia", "encyclopedia query")] * 2
+
+
+def test_cost_spent_after_commit_is_counted(executor):
+    before = speculation_stats()
+    backends = GatedBackends()
+    speculation = start(executor, backends)
+    # Both analysts are waiting on their first model call
+    while backends.calls < 2:
+        time.sleep(0.01)
+    speculation.commit()
+    backends.gate.set()
+    wait(speculation)
+
+    snapshot = speculation.snapshot()
+    assert snapshot["status"] == USED
+    change = delta(before)
+    assert change["used"] == 1 and change["wasted"] == 0
+    assert change["tokens"] == snapshot["tokens"] > 0
+    assert change["llm_calls"] == snapshot["llm_calls"] == 4
+    assert change["searches"] == snapshot["searches"] == 2
+    assert change["wasted_tokens"] == 0
+
+
+def test_cancel_stops_prefetches_and_counts_late_cost_as_wasted(executor):
+    before = speculation_stats()
+    backends = GatedBackends()
+    speculation = start(executor, backends)
+    while backends.calls < 2:
+        time.sleep(0.01)
+    speculation.cancel()
+    backends.gate.set()
+    wait(speculation)
+
+    snapshot = speculation.snapshot()
+    assert snapshot["status"] == WASTED
+    # The running calls finish, but nothing starts after them
+    assert backends.calls == 2 and backends.searches == []
+    change = delta(before)
+    assert change["wasted"] == 1
+    assert change["wasted_tokens"] == change["tokens"] == snapshot["tokens"] > 0
+
+
+def test_caps_stop_calls_before_they_are_made(executor):
+    backends = GatedBackends()
+    backends.gate.set()
+    speculation = start(executor, backends, max_searches=1)
+    wait(speculation)
+    assert speculation.snapshot()["searches"] == 1
+    assert speculation.snapshot()["prefetched"] == 1
+
+    backends = GatedBackends()
+    speculation = start(executor, backends, max_tokens=1)
+    wait(speculation)
+    assert backends.calls == 0
+    assert speculation.snapshot()["tokens"] == 0
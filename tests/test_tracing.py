@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+import tracing
+from benchmarks.fakes import FakeChatModel, FakeTavilySearch, FakeWikipedia
+from research_graph import build_research_graph, stream_graph, with_checkpointer
+
+THREAD = {"configurable": {"thread_id": "research_traced"}}
+
+
+@pytest.fixture
+def trace_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.jsonl")
+    monkeypatch.setenv("RESEARCH_TRACE", path)
+    monkeypatch.setattr(tracing, "_tracer", None)
+    return path
+
+
+def run_traced():
+    llm = FakeChatModel(latency=0, max_analysts=2, response_words=20)
+    graph = with_checkpointer(build_research_graph(llm, FakeTavilySearch(latency=0), FakeWikipedia(latency=0)))
+    for _ in stream_graph(graph, {"topic": "Traced research", "max_analysts": 2}, THREAD):
+        pass
+    graph.update_state(THREAD, {"human_analyst_feedback": None}, as_node="human_feedback")
+    for _ in stream_graph(graph, None, THREAD):
+        pass
+
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("RESEARCH_TRACE", raising=False)
+    assert tracing.get_tracer() is None
+    assert tracing.traced_node("node", len, None) is len
+
+
+def test_interview_spans_nest_under_their_interview(trace_path):
+    run_traced()
+    spans = tracing.load_spans(trace_path)["research_traced"]
+    interviews = {span["span_id"]: span for span in spans if span["name"] == "conduct_interview"}
+    assert len(interviews) == 2
+    answers = [span for span in spans if span["name"] == "answer_question"]
+    assert len(answers) == 4 and all(span["parent_id"] in interviews for span in answers)
+    for interview in interviews.values():
+        analyst = interview["attributes"]["analyst"]
+        turns = sorted(span["attributes"]["turn"] for span in answers if span["attributes"]["analyst"] == analyst)
+        assert turns == [1, 2]
+
+
+def test_counters_cover_model_calls_and_retrievals(trace_path):
+    run_traced()
+    spans = tracing.load_spans(trace_path)["research_traced"]
+    totals = {}
+    for span in spans:
+        for name, value in span["counters"].items():
+            totals[name] = totals.get(name, 0) + value
+    assert totals["llm_calls"] == totals["llm_requests"] > 0
+    assert totals["input_tokens"] > 0 and totals["output_tokens"] > 0
+    assert totals["retrievals"] > 0 and totals["payload_chars"] > 0
+    answer = next(span for span in spans if span["name"] == "answer_question")
+    assert answer["counters"]["llm_calls"] == 1
+
+
+def test_failed_spans_record_the_error(trace_path):
+    tracer = tracing.get_tracer()
+
+    def failing(state):
+        raise ValueError("bad state")
+
+    with pytest.raises(ValueError):
+        tracing.traced_node("failing", failing, tracer)({}, {"configurable": {"thread_id": "research_failed"}})
+    span, = tracing.load_spans(trace_path)["research_failed"]
+    assert span["error"] == "ValueError: bad state"
+
+
+def test_report_shows_the_critical_path(trace_path):
+    run_traced()
+    out = io.StringIO()
+    tracing.report(trace_path, out=out)
+    text = out.getvalue()
+    assert text.startswith("Run research_traced:")
+    path = text.split("Critical path:")[1].split("Slowest")[0]
+    assert "finalize_report" in path and "conduct_interview [" in path
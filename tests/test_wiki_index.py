@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from wiki_index import LocalWikipedia, ingest, iter_dump
+
+SAMPLE_DUMP = os.path.join(os.path.dirname(__file__), "fixtures", "sample_dump.xml")
+
+
+@pytest.fixture
+def wiki(tmp_path):
+    ingest(SAMPLE_DUMP, str(tmp_path))
+    wiki = LocalWikipedia(str(tmp_path))
+    yield wiki
+    wiki.close()
+
+
+def test_dump_skips_redirects_and_other_namespaces():
+    titles = [title for title, _ in iter_dump(SAMPLE_DUMP)]
+    assert titles == ["Transformer (deep learning architecture)", "Recurrent neural network", "Photosynthesis"]
+
+
+def test_dump_text_is_stripped_of_markup():
+    text = dict(iter_dump(SAMPLE_DUMP))["Photosynthesis"]
+    assert text.startswith("Photosynthesis is the process")
+    assert "{{" not in text and "wikitable" not in text and "[[" not in text
+
+
+def test_search_ranks_by_terms(wiki):
+    assert len(wiki) == 3
+    docs = wiki.search("multi-head attention", k=2)
+    assert [doc["metadata"]["title"] for doc in docs] == ["Transformer (deep learning architecture)"]
+
+
+def test_exact_title_wins(wiki):
+    docs = wiki.search("Recurrent neural network", k=2)
+    assert docs[0]["metadata"]["title"] == "Recurrent neural network"
+    assert docs[0]["metadata"]["source"] == "https://en.wikipedia.org/wiki/Recurrent_neural_network"
+    assert docs[0]["page_content"].startswith("A recurrent neural network (RNN)")
+
+
+def test_max_articles_and_rebuild(tmp_path):
+    assert ingest(SAMPLE_DUMP, str(tmp_path), max_articles=1) == 1
+    # Ingesting again replaces the previous index instead of appending to it
+    assert ingest(SAMPLE_DUMP, str(tmp_path)) == 3
+    wiki = LocalWikipedia(str(tmp_path))
+    try:
+        assert wiki.search("photosynthesis")[0]["metadata"]["title"] == "Photosynthesis"
+    finally:
+        wiki.close()
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LocalWikipedia(str(tmp_path))
@@ -0,0 +1,391 @@
+"""Per-node tracing with token accounting, exported as structured spans.
+
+Set ``RESEARCH_TRACE`` to enable. Every node of the research and analyst feedback graphs
+then records one span per execution:
+- start, end and duration;
+- the run (thread id) and the parent span, so interview nodes nest under their
+  ``conduct_interview`` span;
+- the analyst and interview turn;
+- counters for LLM requests, model calls made after the response cache, input and
+  output tokens from the Anthropic usage metadata, retrievals, fetches that missed the
+  retrieval cache, and retrieved payload size.
+
+``RESEARCH_TRACE=1`` exports over OTLP/HTTP when the OpenTelemetry SDK is installed and
+a collector answers at ``OTEL_EXPORTER_OTLP_ENDPOINT`` (default ``http://localhost:4318``),
+and otherwise appends JSONL to ``DEFAULT_TRACE_PATH``. Any other value is taken as a
+JSONL path. Summarize a JSONL trace with:
+
+    python tracing.py report traces.jsonl [--run research_123] [--top 10]
+"""
+import argparse
+import asyncio
+import atexit
+import contextvars
+import hashlib
+import inspect
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from langchain_core.runnables import RunnableConfig
+
+DEFAULT_TRACE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "research_ai", "traces.jsonl")
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318"
+
+# Interview nodes that belong to a question/answer turn
+TURN_NODES = ("ask_question", "plan_queries", "search_web", "search_wikipedia", "answer_question")
+
+_current_span = contextvars.ContextVar("research_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent=None, attributes: dict = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes or {}
+        self.counters = defaultdict(int)
+        self.start = time.time()
+        self.end = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.end - self.start,
+            "attributes": self.attributes,
+            "counters": dict(self.counters),
+            "error": self.error,
+        }
+
+
+def add(**counters):
+    """Add to the counters of the span the caller runs in; a no-op when not tracing"""
+    span = _current_span.get()
+    if span is None:
+        return
+    for name, value in counters.items():
+        span.counters[name] += value
+
+
+def record_llm_call(response):
+    """Count one model call and its token usage on the current span"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    add(llm_calls=1, input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+
+
+class JsonlExporter:
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def shutdown(self):
+        pass
+
+
+class OtlpExporter:
+    """Hands finished spans to an OpenTelemetry batch processor with an OTLP/HTTP exporter"""
+
+    def __init__(self, endpoint: str):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        self.resource = Resource.create({"service.name": "research-ai"})
+        self.processor = BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint.rstrip("/") + "/v1/traces"))
+
+    def export(self, span: Span):
+        from opentelemetry.sdk.trace import ReadableSpan
+        from opentelemetry.trace import SpanContext, Status, StatusCode, TraceFlags
+
+        trace_id = int(hashlib.blake2b(span.trace_id.encode("utf-8"), digest_size=16).hexdigest(), 16)
+        context = SpanContext(trace_id, int(span.span_id, 16), is_remote=False, trace_flags=TraceFlags(1))
+        parent = None
+        if span.parent_id:
+            parent = SpanContext(trace_id, int(span.parent_id, 16), is_remote=False, trace_flags=TraceFlags(1))
+        attributes = {"research.run": span.trace_id}
+        attributes.update({f"research.{k}": v for k, v in span.attributes.items() if v is not None})
+        attributes.update({f"research.{k}": v for k, v in span.counters.items()})
+        status = Status(StatusCode.ERROR, span.error) if span.error else Status(StatusCode.OK)
+        self.processor.on_end(ReadableSpan(
+            name=span.name, context=context, parent=parent, resource=self.resource, attributes=attributes,
+            start_time=int(span.start * 1e9), end_time=int(span.end * 1e9), status=status,
+        ))
+
+    def shutdown(self):
+        self.processor.shutdown()
+
+
+class Tracer:
+    def __init__(self, exporter):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, name: str, trace_id: str, attributes: dict = None):
+        span = Span(name, trace_id, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+            self.exporter.export(span)
+
+    def node_span(self, name: str, state, config):
+        """Span for one node execution, labelled with the run, analyst and turn"""
+        trace_id = ((config or {}).get("configurable") or {}).get("thread_id", "")
+        attributes = {}
+        analyst = state.get("analyst") if isinstance(state, dict) else None
+        if analyst is not None:
+            attributes["analyst"] = analyst.name
+            if name in TURN_NODES:
+                answers = [m for m in state.get("messages", []) if getattr(m, "name", None) == "expert"]
+                attributes["turn"] = len(answers) + 1
+        return self.span(name, trace_id, attributes)
+
+
+def _count_result(result):
+    # Retrieval nodes add formatted documents to the interview context
+    if isinstance(result, dict) and result.get("context"):
+        add(payload_chars=sum(len(blob) for blob in result["context"]))
+
+
+def traced_node(name: str, fn, tracer):
+    """Wrap a graph node so each execution is recorded as a span; returns ``fn`` when not tracing"""
+    if tracer is None:
+        return fn
+    takes_config = len(inspect.signature(fn).parameters) > 1
+
+    if asyncio.iscoroutinefunction(fn):
+        async def node(state, config: RunnableConfig):
+            with tracer.node_span(name, state, config):
+                result = await (fn(state, config) if takes_config else fn(state))
+                _count_result(result)
+                return result
+    else:
+        def node(state, config: RunnableConfig):
+            with tracer.node_span(name, state, config):
+                result = fn(state, config) if takes_config else fn(state)
+                _count_result(result)
+                return result
+    node.__name__ = getattr(fn, "__name__", name)
+    node.__doc__ = fn.__doc__
+    return node
+
+
+class _TracedStructuredModel:
+    def __init__(self, runnable):
+        self.runnable = runnable
+
+    @staticmethod
+    def _parsed(result):
+        # include_raw keeps the AIMessage (and its usage) next to the parsed object
+        if isinstance(result, dict) and "parsed" in result:
+            record_llm_call(result.get("raw"))
+            if result.get("parsing_error") is not None:
+                raise result["parsing_error"]
+            return result["parsed"]
+        record_llm_call(None)
+        return result
+
+    def invoke(self, messages, config=None, **kwargs):
+        return self._parsed(self.runnable.invoke(messages, config, **kwargs))
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        return self._parsed(await self.runnable.ainvoke(messages, config, **kwargs))
+
+
+class TracedChatModel:
+    """Chat model wrapper that counts calls and token usage on the current span.
+
+    Sits behind the response cache, so it only sees calls that reach the provider.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+
+    def invoke(self, messages, config=None, **kwargs):
+        response = self.llm.invoke(messages, config, **kwargs)
+        record_llm_call(response)
+        return response
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        response = await self.llm.ainvoke(messages, config, **kwargs)
+        record_llm_call(response)
+        return response
+
+    def with_structured_output(self, schema, **kwargs):
+        kwargs.setdefault("include_raw", True)
+        return _TracedStructuredModel(self.llm.with_structured_output(schema, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def _collector_available(endpoint: str) -> bool:
+    url = urlparse(endpoint)
+    try:
+        with socket.create_connection((url.hostname or "localhost", url.port or 4318), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def _make_exporter(setting: str):
+    if setting != "1":
+        return JsonlExporter(setting)
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT)
+    try:
+        if _collector_available(endpoint):
+            return OtlpExporter(endpoint)
+    except ImportError:
+        pass
+    return JsonlExporter(DEFAULT_TRACE_PATH)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer, or None when ``RESEARCH_TRACE`` is unset"""
+    global _tracer
+    setting = os.getenv("RESEARCH_TRACE", "")
+    if setting in ("", "0"):
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(_make_exporter(setting))
+            atexit.register(_tracer.exporter.shutdown)
+        return _tracer
+
+
+# Report tool
+
+def load_spans(path: str) -> dict:
+    """Spans from a JSONL trace, grouped by run"""
+    runs = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                runs[span["trace_id"]].append(span)
+    return runs
+
+
+def critical_path(spans: list) -> list:
+    """(depth, span) pairs on the longest chain of sequential spans, descending into children.
+
+    At each level, start from the span that ended last and step back to whichever span
+    ended last before it started.
+    """
+    children = defaultdict(list)
+    ids = {span["span_id"] for span in spans}
+    for span in spans:
+        children[span["parent_id"] if span["parent_id"] in ids else None].append(span)
+
+    def chain(level):
+        path = []
+        current = max(level, key=lambda s: s["end"])
+        while current is not None:
+            path.append(current)
+            # Spans within the 1ms tolerance could precede each other; an earlier start breaks the cycle
+            before = [s for s in level if s["end"] <= current["start"] + 1e-3 and s["start"] < current["start"]]
+            current = max(before, key=lambda s: s["end"]) if before else None
+        return path[::-1]
+
+    def walk(level, depth):
+        result = []
+        for span in chain(level):
+            result.append((depth, span))
+            if children[span["span_id"]]:
+                result.extend(walk(children[span["span_id"]], depth + 1))
+        return result
+
+    return walk(children[None], 0) if children[None] else []
+
+
+def _label(span: dict) -> str:
+    attributes = span.get("attributes") or {}
+    label = span["name"]
+    if attributes.get("analyst"):
+        label += f" [{attributes['analyst']}"
+        label += f" turn {attributes['turn']}]" if attributes.get("turn") else "]"
+    return label
+
+
+def _usage(span: dict) -> str:
+    counters = span.get("counters") or {}
+    usage = []
+    if counters.get("llm_calls"):
+        usage.append(f"{counters.get('input_tokens', 0)} in / {counters.get('output_tokens', 0)} out tokens")
+    if counters.get("payload_chars"):
+        usage.append(f"{counters['payload_chars']} chars retrieved")
+    return ", ".join(usage)
+
+
+def report(path: str, run: str = None, top: int = 10, out=sys.stdout):
+    runs = load_spans(path)
+    for trace_id, spans in runs.items():
+        if run and trace_id != run:
+            continue
+        wall = max(s["end"] for s in spans) - min(s["start"] for s in spans)
+        totals = defaultdict(int)
+        # Counters land on the innermost running span, so summing never double counts
+        for span in spans:
+            for name, value in (span.get("counters") or {}).items():
+                totals[name] += value
+        print(f"Run {trace_id}: {len(spans)} spans, {wall:.2f}s wall clock, "
+              f"{totals['llm_calls']}/{totals['llm_requests']} LLM requests hit the API, "
+              f"{totals['input_tokens']} input / {totals['output_tokens']} output tokens, "
+              f"{totals['retrieval_fetches']}/{totals['retrievals']} retrievals fetched", file=out)
+
+        print("\n  Critical path:", file=out)
+        for depth, span in critical_path(spans):
+            print(f"  {'  ' * depth}{span['duration']:8.3f}s  {_label(span)}  {_usage(span)}", file=out)
+
+        print(f"\n  Slowest {top} spans:", file=out)
+        for span in sorted(spans, key=lambda s: -s["duration"])[:top]:
+            error = f"  ERROR {span['error']}" if span.get("error") else ""
+            print(f"    {span['duration']:8.3f}s  {_label(span)}  {_usage(span)}{error}", file=out)
+        print(file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize research run traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="Critical path and slowest spans per run")
+    report_parser.add_argument("path", help="JSONL trace written with RESEARCH_TRACE")
+    report_parser.add_argument("--run", help="Only this run (thread id)")
+    report_parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    report(args.path, args.run, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Offline Wikipedia backend for search_wikipedia.
+
+``python wiki_index.py ingest <dump> <index_dir>`` turns a MediaWiki XML dump
+(``.xml`` or ``.xml.bz2``) or a JSONL file of ``{"title": ..., "text": ...}`` records into:
+
+- ``articles.bin``: article texts concatenated as UTF-8, opened with mmap at query time
+- ``offsets.bin``: start/end byte offsets of each article, also opened with mmap
+- ``index.sqlite3``: article titles and an inverted title/keyword index
+
+``LocalWikipedia(index_dir).search(query)`` then answers queries in milliseconds and
+returns documents in the same shape WikipediaLoader produces. Opening an index reads
+nothing up front; each query looks up only the postings of its own terms.
+"""
+import argparse
+import bz2
+import json
+import math
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from xml.etree.ElementTree import iterparse
+
+# Matches WikipediaLoader's default doc_content_chars_max
+MAX_DOC_CHARS = 4000
+TITLE_WEIGHT = 5
+MAX_INDEXED_TERMS = 200
+# Start and end offset of one article in offsets.bin
+_OFFSETS = struct.Struct("QQ")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was
+were what when where which who why will with how does do did can about into than then
+""".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric tokens without stopwords"""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def strip_wikitext(text: str) -> str:
+    """Reduce MediaWiki markup to readable plain text"""
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.DOTALL)
+    text = re.sub(r"<ref[^>]*/>", "", text)
+    text = re.sub(r"<ref[^>]*>.*?</ref>", "", text, flags=re.DOTALL)
+    # Templates can nest, so peel them from the inside out
+    previous = None
+    while previous != text:
+        previous = text
+        text = re.sub(r"\{\{[^{}]*\}\}", "", text)
+    text = re.sub(r"\{\|.*?\|\}", "", text, flags=re.DOTALL)
+    text = re.sub(r"\[\[(?:File|Image|Category):[^\]]*\]\]", "", text)
+    text = re.sub(r"\[\[[^\]|]*\|([^\]]*)\]\]", r"\1", text)
+    text = re.sub(r"\[\[([^\]]*)\]\]", r"\1", text)
+    text = re.sub(r"\[https?://\S+ ([^\]]*)\]", r"\1", text)
+    text = re.sub(r"'{2,}", "", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"^=+\s*(.*?)\s*=+$", r"\1", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _open(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_dump(path: str):
+    """Yield (title, text) pairs from a MediaWiki XML dump or a JSONL file"""
+    if path.endswith(".jsonl") or path.endswith(".jsonl.bz2"):
+        with _open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["title"], record["text"]
+        return
+
+    with _open(path) as f:
+        title, text, redirect = None, None, False
+        events = iterparse(f, events=("start", "end"))
+        _, root = next(events)
+        for event, elem in events:
+            if event != "end":
+                continue
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "title":
+                title = elem.text
+            elif tag == "redirect":
+                redirect = True
+            elif tag == "text":
+                text = elem.text or ""
+            elif tag == "page":
+                if title and text and not redirect and ":" not in title:
+                    yield title, strip_wikitext(text)
+                title, text, redirect = None, None, False
+                # Drop the finished page from the tree so memory stays flat over the dump
+                root.clear()
+
+
+def ingest(dump_path: str, index_dir: str, max_articles: int = None) -> int:
+    """Build an index directory from a dump. Returns the number of articles stored."""
+    os.makedirs(index_dir, exist_ok=True)
+    db_path = os.path.join(index_dir, "index.sqlite3")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE titles (doc_id INTEGER PRIMARY KEY, title TEXT NOT NULL, title_lower TEXT NOT NULL)")
+    conn.execute("CREATE TABLE postings (term TEXT NOT NULL, doc_id INTEGER NOT NULL, weight INTEGER NOT NULL)")
+    count = 0
+    position = 0
+
+    with open(os.path.join(index_dir, "articles.bin"), "wb") as out, \
+            open(os.path.join(index_dir, "offsets.bin"), "wb") as offsets:
+        for doc_id, (title, text) in enumerate(iter_dump(dump_path)):
+            if max_articles is not None and doc_id >= max_articles:
+                break
+            data = text.encode("utf-8")
+            out.write(data)
+            offsets.write(_OFFSETS.pack(position, position + len(data)))
+            position += len(data)
+            conn.execute("INSERT INTO titles VALUES (?, ?, ?)", (doc_id, title, title.lower()))
+
+            # Title terms count for more than body terms; only the strongest body terms are kept
+            weights = Counter(tokenize(text)).most_common(MAX_INDEXED_TERMS)
+            weights = Counter(dict(weights))
+            for term in tokenize(title):
+                weights[term] += TITLE_WEIGHT
+            conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                             ((term, doc_id, weight) for term, weight in weights.items()))
+            count += 1
+
+    # Indexed after loading, which is much faster than keeping the index up to date per row
+    conn.execute("CREATE INDEX postings_term ON postings (term)")
+    conn.execute("CREATE INDEX titles_lower ON titles (title_lower)")
+    conn.commit()
+    conn.close()
+    return count
+
+
+class LocalWikipedia:
+    """Read-only view over an ingested index with memory-mapped article and offset stores"""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        db_path = os.path.join(index_dir, "index.sqlite3")
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No index at {index_dir}; build it with 'python wiki_index.py ingest'")
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._db_lock = threading.Lock()
+
+        self._files = []
+        self._offsets = self._map("offsets.bin")
+        self._articles = self._map("articles.bin")
+        self._count = len(self._offsets) // _OFFSETS.size
+
+    def _map(self, name: str):
+        f = open(os.path.join(self.index_dir, name), "rb")
+        self._files.append(f)
+        size = os.fstat(f.fileno()).st_size
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return self._count
+
+    def article(self, doc_id: int) -> str:
+        start, end = _OFFSETS.unpack_from(self._offsets, doc_id * _OFFSETS.size)
+        return self._articles[start:end].decode("utf-8")
+
+    def title(self, doc_id: int) -> str:
+        with self._db_lock:
+            return self._conn.execute("SELECT title FROM titles WHERE doc_id = ?", (doc_id,)).fetchone()[0]
+
+    def rank(self, query: str, k: int = 2) -> list:
+        """Return up to ``k`` document ids ranked by TF-IDF over the inverted index"""
+        n = max(self._count, 1)
+        scores = defaultdict(float)
+        with self._db_lock:
+            for term in set(tokenize(query)):
+                postings = self._conn.execute("SELECT doc_id, weight FROM postings WHERE term = ?", (term,)).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + n / len(postings))
+                for doc_id, weight in postings:
+                    scores[doc_id] += (1 + math.log(weight)) * idf
+
+            # An exact title match always wins
+            exact = self._conn.execute("SELECT doc_id FROM titles WHERE title_lower = ? LIMIT 1",
+                                       (query.strip().lower(),)).fetchone()
+        if exact is not None:
+            scores[exact[0]] += float("inf")
+
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+    def search(self, query: str, k: int = 2, max_chars: int = MAX_DOC_CHARS) -> list:
+        """Return documents shaped like WikipediaLoader output (as plain dicts)"""
+        docs = []
+        for doc_id in self.rank(query, k):
+            title = self.title(doc_id)
+            text = self.article(doc_id)
+            docs.append({
+                "page_content": text[:max_chars],
+                "metadata": {
+                    "title": title,
+                    "summary": text.split("\n\n", 1)[0],
+                    "source": "https://en.wikipedia.org/wiki/" + title.replace(" ", "_"),
+                },
+            })
+        return docs
+
+    def close(self):
+        for mapped in (self._offsets, self._articles):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        for f in self._files:
+            f.close()
+        self._conn.close()
+
+
+_local_wikipedia = None
+
+
+def get_local_wikipedia():
+    """Return the offline index named by ``RESEARCH_WIKIPEDIA_INDEX``, or None"""
+    global _local_wikipedia
+    index_dir = os.getenv("RESEARCH_WIKIPEDIA_INDEX")
+    if not index_dir:
+        return None
+    if _local_wikipedia is None or _local_wikipedia.index_dir != index_dir:
+        _local_wikipedia = LocalWikipedia(index_dir)
+    return _local_wikipedia
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query an offline Wikipedia index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Build an index from a dump")
+    ingest_parser.add_argument("dump", help="MediaWiki XML dump (.xml/.xml.bz2) or JSONL file")
+    ingest_parser.add_argument("index_dir")
+    ingest_parser.add_argument("--max-articles", type=int, default=None)
+
+    search_parser = commands.add_parser("search", help="Query an index")
+    search_parser.add_argument("index_dir")
+    search_parser.add_argument("query")
+    search_parser.add_argument("-k", type=int, default=2)
+
+    args = parser.parse_args(argv)
+    if args.command == "ingest":
+        start = time.perf_counter()
+        count = ingest(args.dump, args.index_dir, args.max_articles)
+        print(f"Indexed {count} articles in {time.perf_counter() - start:.1f}s")
+    else:
+        wiki = LocalWikipedia(args.index_dir)
+        start = time.perf_counter()
+        docs = wiki.search(args.query, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for doc in docs:
+            print(f'{doc["metadata"]["title"]} <{doc["metadata"]["source"]}>')
+        print(f"{len(docs)} results in {elapsed:.2f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()